@@ -1,16 +1,23 @@
 "use client"
-import { useState } from "react"
+import { useCallback, useState } from "react"
 import { MapProvider } from "@/components/map-provider"
 import { MainMap } from "@/components/main-map"
 import { Sidebar } from "@/components/sidebar"
 import { Header } from "@/components/header"
 import { TimelineControl } from "@/components/timeline-control"
 import { SpeciesProvider } from "@/contexts/species-context"
+import type { PredictionResult } from "@/lib/api-service"
 
 export default function HomePage() {
   const [currentYear, setCurrentYear] = useState(2010)
   const [isPlaying, setIsPlaying] = useState(false)
   const [showHeatmap, setShowHeatmap] = useState(false)
+  const [timelinePredictions, setTimelinePredictions] = useState<PredictionResult[] | null>(null)
+
+  // Stable identity: the timeline re-emits a frame whenever this callback changes
+  const handleFrameChange = useCallback((_year: number, predictions: PredictionResult[]) => {
+    setTimelinePredictions(predictions)
+  }, [])
 
   const handleYearChange = (year: number | ((prev: number) => number)) => {
     if (typeof year === "function") {
@@ -34,6 +41,7 @@ export default function HomePage() {
               currentYear={currentYear}
               isPlaying={isPlaying}
               showHeatmap={showHeatmap}
+              timelinePredictions={timelinePredictions}
               onHeatmapToggle={() => setShowHeatmap(!showHeatmap)}
             />
             <Sidebar showHeatmap={showHeatmap} onHeatmapToggle={() => setShowHeatmap(!showHeatmap)} />
@@ -42,6 +50,7 @@ export default function HomePage() {
               onYearChange={handleYearChange}
               isPlaying={isPlaying}
               onPlayToggle={handlePlayToggle}
+              onFrameChange={handleFrameChange}
             />
           </MapProvider>
         </div>
@@ -2,68 +2,322 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-from utils.preprocessing import load_and_prepare_data
-from utils.prediction import train_and_predict, predict_species_presence
-from routes import bp as api_blueprint
+from utils.preprocessing import load_and_prepare_data, occurrence_source_version
+from utils.prediction import fit_model, get_feature_columns, train_species_model, predict_points, predict_species_presence
+from utils.backends import MODEL_BACKENDS, describe_model, resolve_backend
+from utils.compact_model import export_model, load_compact_model, save_compact_model
+from utils.model_store import load_model_entries, save_model_entry
+from utils.preprocessing import get_enhanced_species_habitat_preferences
+from utils.rasters import (
+    RESOLUTIONS, load_raster, nested_list, precompute_rasters, raster_records, raster_window,
+    resolution_key, richness_layers, window_axes
+)
+from utils.temporal import DEFAULT_TIMELINE_RESOLUTION, fit_temporal_model, precompute_timeline, timeline_key, timeline_window
+from utils.metrics import init_request_metrics, render_prometheus, timed_stage
+from utils.compression import init_response_compression
+from utils.payload import encode_coordinates, encode_cube, encode_points, parse_payload_options
+from utils.profiling import annotate_profile, init_request_profiling, job_profile_requested, profile_run
+from utils.geo import bbox_mask
+from utils.cache import TTLCache
+from utils.hotspots import DEFAULT_HOTSPOT_THRESHOLD, extract_hotspots, grid_from_points
+from utils.jobs import JobQueue
+from utils.export import (
+    EXTENSIONS, MIMETYPES, POINT_FORMATS, RASTER_FORMATS, csv_chunks, geojson_chunks, geotiff_chunks,
+    gzip_chunks, netcdf_chunks, raster_frames
+)
+from utils.ingest import INGEST_DIR, ingest_into_models, mark_processed, pending_drop_files, read_drop_file, records_to_frame
+from database import db, init_database
+from routes import (
+    bp as api_blueprint, append_occurrence_records, load_occurrence_data, loading_response, occurrence_data_for_request,
+    occurrence_frames
+)
+import routes
 import pandas as pd
 import numpy as np
 import pickle
 import os
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:3000", "https://your-frontend-domain.com"])
+init_request_metrics(app)
+init_request_profiling(app)
+init_response_compression(app)
+init_database(app)
 
 trained_models = {}  
 model_data = {}
+# Backend chosen per model key via /train, reused by later (re)trainings
+model_backends = {}
 last_training_time = None
+ingest_lock = threading.Lock()
+# Largest batch served by /predict/point in one request
+MAX_POINT_BATCH = 1000
+# Largest species x lat x lon cube returned by /predict/batch
+MAX_CUBE_CELLS = 2000000
+# Most species in one /predict/batch request; each untrained one is fitted in the request
+MAX_BATCH_SPECIES = 25
+DEFAULT_CUBE_RESOLUTION = 0.25
+# Compute study-area prediction rasters right after each training
+PRECOMPUTE_RASTERS = os.environ.get('FISHY_PRECOMPUTE_RASTERS', '1') == '1'
+# Pickle trained entries so a restarted server restores them instead of retraining
+PERSIST_MODELS = os.environ.get('FISHY_PERSIST_MODELS', '1') == '1'
+preload_lock = threading.Lock()
+preloaded = False
+# Background warm-up when run directly: 'none', 'data' (dataset, FASTA catalog
+# and persisted models) or 'model' (also trains the general model if needed)
+WARMUP_MODE = os.environ.get('FISHY_WARMUP', 'model')
+warmup_state = {'status': 'idle', 'started_at': None, 'finished_at': None, 'error': None}
+process_started = time.time()
+# Training runs in a bounded pool so request threads stay free for serving
+TRAINING_WORKERS = int(os.environ.get('FISHY_TRAINING_WORKERS', 1))
+training_jobs = JobQueue(max_workers=TRAINING_WORKERS, name='training')
+training_locks = {}
+# One raster or timeline computation per model key at a time
+raster_locks = {}
+# (model key, model version, grid, threshold, min cells) -> ranked hotspots
+hotspot_cache = TTLCache(ttl_seconds=int(os.environ.get('FISHY_HOTSPOT_CACHE_TTL', 3600)), max_entries=256)
 
-def ensure_model_trained(selected_species=None):
+def ensure_model_trained(selected_species=None, force=False, profile=False):
     """Ensure the model is trained and ready for predictions"""
+    model_key = selected_species or 'general'
+    
+    # One training run per model key at a time; concurrent callers wait for it
+    # and then find the model trained
+    with training_locks.setdefault(model_key, threading.Lock()):
+        if force or model_key not in trained_models or last_training_time is None:
+            train_model_entry(selected_species, profile)
+    
+    return model_key in trained_models
+
+def train_model_entry(selected_species=None, profile=False):
+    """Train a model and install it under its key; the key is dropped if training fails"""
     global trained_models, model_data, last_training_time
     
     model_key = selected_species or 'general'
     
-  
-    if model_key not in trained_models or last_training_time is None:
-        print(f"Training model for species: {selected_species or 'general'}...")
-        try:
-    
+    print(f"Training model for species: {selected_species or 'general'}...")
+    try:
+
+        profile_training = profile or os.environ.get('FISHY_PROFILE_TRAINING') == '1'
+        with timed_stage('training_run', species=model_key), \
+                (profile_run(f'train-{model_key}', species=model_key) if profile_training else nullcontext({})) as profile_meta:
             presence_df, full_df, lat_range, lon_range, fasta_species = load_and_prepare_data(selected_species)
             
-            result_df = train_and_predict(presence_df, full_df, lat_range, lon_range, selected_species)
-          
-            model_data[model_key] = {
-                'presence_df': presence_df,
-                'full_df': full_df,
-                'lat_range': lat_range,
-                'lon_range': lon_range,
-                'predictions': result_df,
-                'fasta_species': fasta_species,
-                'selected_species': selected_species
-            }
-            
-            trained_models[model_key] = True
-            last_training_time = datetime.now()
-            
-            print(f"Model trained successfully for {selected_species or 'general'} at {last_training_time}")
-            print(f"Training data: {len(presence_df)} presence records, {len(full_df)} total records")
-            print(f"Prediction grid: {len(result_df)} points")
-            print(f"FASTA species available: {len(fasta_species)}")
+            backend = resolve_backend(selected_species, model_backends.get(model_key))
+            training = train_species_model(presence_df, full_df, lat_range, lon_range, selected_species, backend)
+            result_df = training['predictions']
             
-        except Exception as e:
-            print(f"Error training model: {e}")
-            if model_key in trained_models:
-                del trained_models[model_key]
-            if model_key in model_data:
-                del model_data[model_key]
+            profile_meta.update({
+                'presence_records': len(presence_df),
+                'total_records': len(full_df),
+                'prediction_points': len(result_df)
+            })
+        annotate_profile(**profile_meta)
+      
+        model_data[model_key] = {
+            'presence_df': presence_df,
+            'full_df': full_df,
+            'lat_range': lat_range,
+            'lon_range': lon_range,
+            'predictions': result_df,
+            'fasta_species': fasta_species,
+            'selected_species': selected_species,
+            'model': training['model'],
+            'feature_columns': training['feature_columns'],
+            'imputer': training['imputer'],
+            'accuracy': training['accuracy'],
+            'backend': backend,
+            'model_stats': training['model_stats'],
+            'rows_since_retrain': 0,
+            'trained_at': datetime.now().isoformat(),
+            'source_version': occurrence_source_version()
+        }
+        store_compact_model(model_key)
+        if PRECOMPUTE_RASTERS:
+            store_prediction_rasters(model_key)
+        persist_model_entry(model_key)
+        
+        trained_models[model_key] = True
+        last_training_time = datetime.now()
+        
+        print(f"Model trained successfully for {selected_species or 'general'} at {last_training_time}")
+        print(f"Training data: {len(presence_df)} presence records, {len(full_df)} total records")
+        print(f"Prediction grid: {len(result_df)} points")
+        print(f"FASTA species available: {len(fasta_species)}")
+        
+    except Exception as e:
+        print(f"Error training model: {e}")
+        if model_key in trained_models:
+            del trained_models[model_key]
+        if model_key in model_data:
+            del model_data[model_key]
+
+def store_compact_model(model_key):
+    """Flatten the fitted model into node arrays for serving and persist them"""
+    data = model_data[model_key]
+    compact = export_model(data.get('model'), data.get('feature_columns'))
+    data['compact_model'] = compact
+    if compact is None:
+        return
     
-    return model_key in trained_models
+    try:
+        path = save_compact_model(compact, model_key)
+        print(f"Exported compact model ({compact.n_trees} trees, {compact.nbytes} bytes) to {path}")
+    except OSError as e:
+        print(f"Error saving compact model for {model_key}: {e}")
+    
+    if data.get('model_stats') is not None:
+        sample = data['full_df'][compact.feature_columns].head(2500)
+        stats = describe_model(compact, sample, 0.0)
+        stats.pop('fit_seconds')
+        stats['array_bytes'] = compact.nbytes
+        data['model_stats']['compact'] = stats
+
+def persist_model_entry(model_key):
+    """Pickle a trained entry so the next server start can restore it"""
+    if not PERSIST_MODELS:
+        return
+    try:
+        save_model_entry(model_key, model_data[model_key])
+    except Exception as e:
+        print(f"Error persisting model entry for {model_key}: {e}")
+
+def store_prediction_rasters(model_key, resolutions=None):
+    """Precompute the study-area rasters for a trained model"""
+    data = model_data[model_key]
+    if data.get('model') is None:
+        return {}
+    try:
+        summary = precompute_rasters(
+            model_key, data['model'], data['feature_columns'], data['selected_species'],
+            resolutions, model_version=data.get('trained_at')
+        )
+        data['rasters'] = summary
+        return summary
+    except Exception as e:
+        print(f"Error precomputing rasters for {model_key}: {e}")
+        return {}
+
+def parse_resolution(value):
+    """A configured raster resolution, or None when the training grid is wanted"""
+    if value in (None, ''):
+        return None
+    resolution = float(value)
+    if resolution_key(resolution) not in {resolution_key(r) for r in RESOLUTIONS}:
+        raise ValueError(f"Unsupported resolution {value}. Available: {', '.join(resolution_key(r) for r in RESOLUTIONS)}")
+    return resolution
+
+def parse_probability_threshold(value):
+    """A probability threshold in [0, 1]"""
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid threshold {value!r}; expected a number between 0 and 1")
+    if not 0 <= threshold <= 1:
+        raise ValueError("threshold must be between 0 and 1")
+    return threshold
+
+def species_raster(model_key, resolution):
+    """Raster and metadata of the current model, (re)computing it first if missing or stale
+
+    A raster is stamped with the trained_at of the model it came from, so one
+    left over from before a retrain, an ingest or a restart is never served.
+    """
+    model_version = model_data[model_key].get('trained_at')
+    raster, meta = load_raster(model_key, resolution)
+    if raster is not None and meta.get('model_version') == model_version:
+        return raster, meta
+    
+    with raster_locks.setdefault(model_key, threading.Lock()):
+        raster, meta = load_raster(model_key, resolution)
+        if raster is None or meta.get('model_version') != model_version:
+            store_prediction_rasters(model_key, [resolution])
+            raster, meta = load_raster(model_key, resolution)
+    if raster is None or meta.get('model_version') != model_version:
+        return None, None
+    return raster, meta
+
+def raster_predictions(model_key, resolution, lat_range=None, lon_range=None):
+    """Predictions read from the precomputed raster, computing it first if needed"""
+    raster, meta = species_raster(model_key, resolution)
+    if raster is None:
+        return None
+    return raster_records(raster, meta, lat_range, lon_range)
 
 app.register_blueprint(api_blueprint)
 
+def preload_state():
+    """Load the dataset, FASTA catalog and persisted models into this process
+
+    Run in the gunicorn master before it forks, so every worker starts with
+    them already in (copy-on-write shared) memory.
+    """
+    global preloaded, last_training_time
+    
+    with preload_lock:
+        if preloaded:
+            return
+        with app.app_context(), timed_stage('preload'):
+            load_occurrence_data()
+            restored = load_model_entries(occurrence_source_version()) if PERSIST_MODELS else {}
+            for model_key, entry in restored.items():
+                if model_key in model_data:
+                    continue
+                entry['compact_model'] = (
+                    load_compact_model(model_key) or
+                    export_model(entry.get('model'), entry.get('feature_columns'))
+                )
+                model_data[model_key] = entry
+                model_backends.setdefault(model_key, entry.get('backend'))
+                trained_models[model_key] = True
+        if restored:
+            last_training_time = datetime.now()
+            print(f"Restored {len(restored)} persisted model(s): {', '.join(sorted(restored))}")
+        preloaded = True
+
+def create_app(preload=False):
+    """The WSGI application, optionally with data and models loaded up front
+
+    Routes keep their state in module globals, so this always returns the same
+    app; preloading only fills that state once per process.
+    """
+    if preload:
+        preload_state()
+    return app
+
+def after_fork():
+    """Drop database connections inherited from the master; each worker opens its own"""
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+def warm_up(mode=WARMUP_MODE):
+    """Load data and models, and with them the heavy libraries, ahead of the first request"""
+    warmup_state.update(status='warming', started_at=datetime.now().isoformat(), error=None)
+    try:
+        preload_state()
+        if mode == 'model' and not ensure_model_trained():
+            raise RuntimeError("General model training failed")
+        warmup_state['status'] = 'ready'
+    except Exception as e:
+        print(f"Error during warm-up: {e}")
+        warmup_state.update(status='failed', error=str(e))
+    warmup_state['finished_at'] = datetime.now().isoformat()
+
+def start_warmup(mode=WARMUP_MODE):
+    """Warm up in a daemon thread so the server accepts requests immediately"""
+    if mode == 'none':
+        return None
+    thread = threading.Thread(target=warm_up, args=(mode,), name='warmup', daemon=True)
+    thread.start()
+    print(f"Warming up in the background ({mode})")
+    return thread
+
 @app.route("/")
 def home():
     return {
@@ -73,6 +327,34 @@ def home():
         "last_training": last_training_time.isoformat() if last_training_time else None
     }
 
+@app.route("/health", methods=["GET"])
+def health():
+    """Readiness: 200 once the dataset is loaded and any warm-up has finished, 503 before"""
+    data_loaded = routes.occurrence_data is not None
+    load_failure = routes.load_failure
+    if warmup_state['status'] in ('warming', 'failed'):
+        status = warmup_state['status']
+    elif load_failure is not None and not data_loaded:
+        status = 'failed'
+    else:
+        status = 'ready' if data_loaded else 'starting'
+    return jsonify({
+        "status": status,
+        "uptime_seconds": round(time.time() - process_started, 3),
+        "data_loaded": data_loaded,
+        "load_error": load_failure[0] if load_failure is not None else None,
+        "trained_models": list(trained_models.keys()),
+        "warmup": warmup_state
+    }), 200 if status == 'ready' else 503
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Expose stage timings and request latency histograms in Prometheus text format"""
+    body = render_prometheus({
+        'fishy_trained_models': ('Number of species models currently trained.', len(trained_models))
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 @app.route("/train", methods=["POST"])
 def train_model():
     """Manually trigger model training"""
@@ -84,22 +366,22 @@ def train_model():
         
         print(f"Starting model training for species: {selected_species or 'general'}...")
         
-        model_key = selected_species or 'general'
-        
-        # Force retrain
-        if model_key in trained_models:
-            del trained_models[model_key]
-        if model_key in model_data:
-            del model_data[model_key]
+        # Force retrain; the current model keeps serving until the new one is ready
+        try:
+            job, conflict = submit_training(selected_species, data.get('backend'))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        if conflict is not None:
+            return conflict
+        if data.get('async'):
+            return job_accepted(job)
         
-        # Train the model
-        if ensure_model_trained(selected_species):
+        job = training_jobs.wait(job['id'])
+        if job['status'] == 'succeeded':
             return jsonify({
                 "status": "success",
                 "message": f"Model trained successfully for {selected_species or 'general'}",
-                "species": selected_species,
-                "training_time": last_training_time.isoformat(),
-                "data_points": len(model_data[model_key]['predictions']) if model_key in model_data else 0
+                **job['result']
             })
         else:
             return jsonify({
@@ -113,6 +395,71 @@ def train_model():
             "message": f"Training failed: {str(e)}"
         }), 500
 
+def submit_training(selected_species=None, requested_backend=None):
+    """Queue a training run; returns (job, None), or (job, 409 response) on a backend conflict
+
+    A request for the same backend, or for none, shares the species' active run.
+    One asking for another backend is refused rather than silently dropped.
+    """
+    model_key = selected_species or 'general'
+    backend = resolve_backend(selected_species, requested_backend) if requested_backend else None
+    job, created = training_jobs.submit(
+        model_key, 'train', run_training, selected_species, backend=backend, profile=job_profile_requested()
+    )
+    if created or backend is None:
+        return job, None
+    active_backend = job['params'].get('backend') or resolve_backend(selected_species, model_backends.get(model_key))
+    if active_backend == backend:
+        return job, None
+    return job, (jsonify({
+        "status": "error",
+        "message": f"A {active_backend} training run for {model_key} is already queued or running; retry with {backend} once it has finished",
+        "job": job
+    }), 409)
+
+def run_training(selected_species=None, backend=None, profile=False):
+    """Training job body: retrain a model and summarize it"""
+    model_key = selected_species or 'general'
+    if backend:
+        model_backends[model_key] = backend
+    if not ensure_model_trained(selected_species, force=True, profile=profile):
+        raise RuntimeError(f"Failed to train model for {model_key}")
+    data = model_data[model_key]
+    return {
+        "species": selected_species,
+        "training_time": last_training_time.isoformat(),
+        "data_points": len(data['predictions']),
+        "backend": data.get('backend'),
+        "model_stats": data.get('model_stats')
+    }
+
+def job_accepted(job):
+    """202 response pointing at the job status endpoint"""
+    response = jsonify({"status": "accepted", "job": job})
+    response.status_code = 202
+    response.headers['Location'] = f"/jobs/{job['id']}"
+    return response
+
+@app.route("/jobs", methods=["GET"])
+def list_jobs():
+    """Recent background jobs, newest first"""
+    return jsonify({"jobs": training_jobs.list()})
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Status and result of a background job"""
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Unknown job {job_id}"}), 404
+    return jsonify(job)
+
+def prediction_payload(predictions, options):
+    """The predictions (and their encoding header) of a /predict response"""
+    if options is None:
+        return {"predictions": predictions.to_dict(orient="records")}
+    encoding, rows = encode_points(predictions, options)
+    return {"encoding": encoding, "predictions": rows}
+
 @app.route("/predict", methods=["POST", "GET"])
 def predict():
     """Get predictions from trained model"""
@@ -120,9 +467,19 @@ def predict():
         # Get species parameter
         if request.method == "GET":
             selected_species = request.args.get('species')
+            requested_resolution = request.args.get('resolution')
+            payload_options = request.args
         else:
             data = request.json or {}
             selected_species = data.get('species')
+            requested_resolution = data.get('resolution')
+            payload_options = data
+        
+        try:
+            resolution = parse_resolution(requested_resolution)
+            payload_options = parse_payload_options(payload_options)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
         
         model_key = selected_species or 'general'
         
@@ -137,16 +494,19 @@ def predict():
         if request.method == "GET":
             region = request.args.get('region')
             
-            predictions = model_data[model_key]['predictions'].copy()
-            
-            # Convert to JSON-serializable format
-            result = predictions.to_dict(orient="records")
+            predictions = None
+            if resolution is not None:
+                predictions = raster_predictions(model_key, resolution)
+            if predictions is None:
+                predictions = model_data[model_key]['predictions'].copy()
+                resolution = None
             
             return jsonify({
                 "status": "success",
-                "predictions": result,
-                "total_points": len(result),
+                **prediction_payload(predictions, payload_options),
+                "total_points": len(predictions),
                 "species": selected_species,
+                "resolution": resolution,
                 "lat_range": model_data[model_key]['lat_range'],
                 "lon_range": model_data[model_key]['lon_range']
             })
@@ -156,22 +516,26 @@ def predict():
         lat_range = tuple(data.get("lat_range", model_data[model_key]['lat_range']))
         lon_range = tuple(data.get("lon_range", model_data[model_key]['lon_range']))
         
-        # Get predictions for specified range
-        predictions = model_data[model_key]['predictions']
-        
-        # Filter predictions within specified ranges
-        filtered_predictions = predictions[
-            (predictions['decimalLatitude'] >= lat_range[0]) &
-            (predictions['decimalLatitude'] <= lat_range[1]) &
-            (predictions['decimalLongitude'] >= lon_range[0]) &
-            (predictions['decimalLongitude'] <= lon_range[1])
-        ]
+        filtered_predictions = None
+        if resolution is not None:
+            # The raster window is cut by index, no per-point filtering needed
+            filtered_predictions = raster_predictions(model_key, resolution, lat_range, lon_range)
+        if filtered_predictions is None:
+            resolution = None
+            # Get predictions for specified range
+            predictions = model_data[model_key]['predictions']
+            
+            # Filter predictions within specified ranges
+            filtered_predictions = predictions[
+                bbox_mask(predictions['decimalLatitude'], predictions['decimalLongitude'], lat_range, lon_range)
+            ]
         
         return jsonify({
             "status": "success",
-            "predictions": filtered_predictions.to_dict(orient="records"),
+            **prediction_payload(filtered_predictions, payload_options),
             "total_points": len(filtered_predictions),
             "species": selected_species,
+            "resolution": resolution,
             "lat_range": lat_range,
             "lon_range": lon_range
         })
@@ -182,19 +546,426 @@ def predict():
             "message": f"Prediction failed: {str(e)}"
         }), 500
 
+@app.route("/predict/precompute", methods=["POST"])
+def precompute_predictions():
+    """Train (if needed) and precompute prediction rasters for every species at every resolution"""
+    try:
+        data = request.json or {}
+        species_list = data.get('species') or list(get_enhanced_species_habitat_preferences().keys())
+        if isinstance(species_list, str):
+            species_list = [species_list]
+        try:
+            resolutions = [parse_resolution(r) for r in data.get('resolutions') or RESOLUTIONS]
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        results = {}
+        for species in species_list:
+            model_key = species or 'general'
+            if not ensure_model_trained(species):
+                results[model_key] = {'status': 'error', 'message': 'Model training failed'}
+                continue
+            summary = store_prediction_rasters(model_key, resolutions)
+            results[model_key] = {'status': 'success' if summary else 'error', 'rasters': summary}
+        
+        return jsonify({
+            "status": "success",
+            "resolutions": [resolution_key(r) for r in resolutions],
+            "results": results
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Precompute failed: {str(e)}"
+        }), 500
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """Stacked species x lat x lon probabilities for an area, with richness and argmax layers"""
+    try:
+        data = request.json or {}
+        species_list = data.get('species') or []
+        if isinstance(species_list, str):
+            species_list = [species_list]
+        if not species_list:
+            return jsonify({"error": "A list of species is required"}), 400
+        if len(species_list) > MAX_BATCH_SPECIES:
+            return jsonify({"error": f"At most {MAX_BATCH_SPECIES} species per request"}), 400
+        
+        try:
+            resolution = parse_resolution(data.get('resolution'))
+            threshold = parse_probability_threshold(data.get('threshold', 0.5))
+            payload_options = parse_payload_options(data)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        if resolution is None:
+            resolution = DEFAULT_CUBE_RESOLUTION
+        lat_range = tuple(data['lat_range']) if data.get('lat_range') else None
+        lon_range = tuple(data['lon_range']) if data.get('lon_range') else None
+        
+        # The window size is known from the study grid, so oversized requests
+        # are rejected before any model is trained
+        window_lats, window_lons = window_axes(resolution, lat_range, lon_range)
+        if len(window_lats) == 0 or len(window_lons) == 0:
+            return jsonify({"error": "The requested area contains no grid cells"}), 400
+        if len(species_list) * len(window_lats) * len(window_lons) > MAX_CUBE_CELLS:
+            return jsonify({
+                "error": f"Requested cube exceeds {MAX_CUBE_CELLS} cells; narrow the area or use a coarser resolution"
+            }), 400
+        
+        # Every species shares the study grid and its covariate samples, so each
+        # missing raster costs one model pass and the cube is a stack of windows
+        windows = []
+        failed = []
+        lats = lons = None
+        for species in species_list:
+            model_key = species or 'general'
+            raster = None
+            if ensure_model_trained(species):
+                raster, meta = species_raster(model_key, resolution)
+            if raster is None:
+                failed.append(species)
+                continue
+            lats, lons, values = raster_window(raster, meta, lat_range, lon_range)
+            windows.append((species, values))
+        
+        if not windows:
+            return jsonify({
+                "status": "error",
+                "message": "No predictions available for the requested species",
+                "failed_species": failed
+            }), 500
+        
+        cube = np.stack([values for _, values in windows]).astype(np.float32)
+        layers = richness_layers(cube, threshold)
+        
+        return jsonify({
+            "status": "success",
+            "species": [species for species, _ in windows],
+            "failed_species": failed,
+            "resolution": resolution,
+            "threshold": threshold,
+            "shape": list(cube.shape),
+            "encoding": payload_options,
+            "lats": encode_coordinates(lats, payload_options),
+            "lons": encode_coordinates(lons, payload_options),
+            "probabilities": encode_cube(cube, payload_options),
+            "richness": nested_list(layers['richness']),
+            "expected_richness": nested_list(layers['expected_richness']),
+            "argmax": nested_list(layers['argmax'])
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Batch prediction failed: {str(e)}"
+        }), 500
+
+def species_timeline(model_key, resolution):
+    """Year x lat x lon cube for a trained model, fitting the year-aware model first if needed"""
+    data = model_data[model_key]
+    cube, meta = load_raster(timeline_key(model_key), resolution)
+    if cube is not None and meta.get('model_version') == data.get('trained_at'):
+        return cube, meta
+    
+    # Per model key, so timelines of other species and ingests are not held up
+    with raster_locks.setdefault(timeline_key(model_key), threading.Lock()):
+        cube, meta = load_raster(timeline_key(model_key), resolution)
+        model_version = data.get('trained_at')
+        if cube is not None and meta.get('model_version') == model_version:
+            return cube, meta
+        temporal = data.get('temporal') or fit_temporal_model(
+            data['full_df'], data['feature_columns'], data['selected_species'], data.get('backend')
+        )
+        # An ingest during the fit replaces the model; the cube is then stamped
+        # with the old version and recomputed on the next request
+        if data.get('trained_at') == model_version:
+            data['temporal'] = temporal
+        precompute_timeline(model_key, temporal, data['selected_species'], resolution, model_version)
+    return load_raster(timeline_key(model_key), resolution)
+
+@app.route("/predict/timeline", methods=["GET"])
+def predict_timeline():
+    """Time-indexed stack of prediction rasters from a year-aware model"""
+    try:
+        selected_species = request.args.get('species')
+        model_key = selected_species or 'general'
+        try:
+            resolution = parse_resolution(request.args.get('resolution', DEFAULT_TIMELINE_RESOLUTION))
+            start_year = request.args.get('start_year', type=int)
+            end_year = request.args.get('end_year', type=int)
+            lat_range = tuple(float(v) for v in request.args['lat_range'].split(',')) if request.args.get('lat_range') else None
+            lon_range = tuple(float(v) for v in request.args['lon_range'].split(',')) if request.args.get('lon_range') else None
+            payload_options = parse_payload_options(request.args)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        if not ensure_model_trained(selected_species):
+            return jsonify({
+                "error": "Model not trained",
+                "message": f"Please train the model first for species: {model_key}"
+            }), 500
+        if model_data[model_key].get('model') is None:
+            return jsonify({"status": "error", "message": "No fitted model for this species"}), 500
+        
+        cube, meta = species_timeline(model_key, resolution)
+        years, lats, lons, values = timeline_window(cube, meta, start_year, end_year, lat_range, lon_range)
+        
+        return jsonify({
+            "status": "success",
+            "species": selected_species,
+            "resolution": resolution,
+            "years": years.tolist(),
+            "shape": list(values.shape),
+            "encoding": payload_options,
+            "lats": encode_coordinates(lats, payload_options),
+            "lons": encode_coordinates(lons, payload_options),
+            "probabilities": encode_cube(values, payload_options),
+            "accuracy": model_data[model_key]['temporal']['accuracy'] if 'temporal' in model_data[model_key] else None
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Timeline prediction failed: {str(e)}"
+        }), 500
+
+@app.route("/predict/hotspots", methods=["GET"])
+def predict_hotspots():
+    """Ranked connected regions of high predicted probability"""
+    try:
+        selected_species = request.args.get('species')
+        model_key = selected_species or 'general'
+        try:
+            resolution = parse_resolution(request.args.get('resolution'))
+            threshold = float(request.args.get('threshold', DEFAULT_HOTSPOT_THRESHOLD))
+            min_cells = int(request.args.get('min_cells', 1))
+            limit = int(request.args.get('limit', 50))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        if not 0 < threshold <= 1:
+            return jsonify({"status": "error", "message": "threshold must be in (0, 1]"}), 400
+        if min_cells < 1:
+            return jsonify({"status": "error", "message": "min_cells must be at least 1"}), 400
+        if limit < 0:
+            return jsonify({"status": "error", "message": "limit must not be negative"}), 400
+        
+        if not ensure_model_trained(selected_species):
+            return jsonify({
+                "error": "Model not trained",
+                "message": f"Please train the model first for species: {model_key}"
+            }), 500
+        if model_data[model_key].get('model') is None:
+            return jsonify({"status": "error", "message": "No fitted model for this species"}), 500
+        
+        data = model_data[model_key]
+        raster = meta = None
+        if resolution is not None:
+            raster, meta = species_raster(model_key, resolution)
+        if raster is None:
+            resolution = None
+        model_version = meta.get('model_version') if meta else data.get('trained_at')
+        
+        def compute():
+            if raster is not None:
+                lats, lons, values = raster_window(raster, meta)
+            else:
+                predictions = data['predictions']
+                lats, lons, values = grid_from_points(
+                    predictions['decimalLatitude'], predictions['decimalLongitude'], predictions['prediction']
+                )
+            return extract_hotspots(lats, lons, values, threshold, min_cells)
+        
+        try:
+            hotspots = hotspot_cache.get_or_compute(
+                (model_key, model_version, resolution, threshold, min_cells), compute
+            )
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        return jsonify({
+            "status": "success",
+            "species": selected_species,
+            "resolution": resolution,
+            "threshold": threshold,
+            "model_version": model_version,
+            "total_hotspots": len(hotspots),
+            "hotspots": hotspots[:limit]
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Hotspot extraction failed: {str(e)}"
+        }), 500
+
+OCCURRENCE_EXPORT_COLUMNS = [
+    'gbifID', 'scientificName', 'species', 'decimalLatitude', 'decimalLongitude', 'year',
+    'depth', 'individualCount', 'stateProvince', 'locality'
+]
+
+def timeline_frames(lats, lons, values, years):
+    """Raster frames of a year x lat x lon cube with a year column"""
+    for year, layer in zip(years, values):
+        for frame in raster_frames(lats, lons, layer):
+            frame.insert(0, 'year', int(year))
+            yield frame
+
+@app.route("/export", methods=["GET"])
+def export():
+    """Stream predictions, a timeline or occurrence records as CSV, GeoJSON, GeoTIFF or NetCDF"""
+    try:
+        dataset = request.args.get('dataset', 'predictions')
+        export_format = request.args.get('format', 'csv')
+        selected_species = request.args.get('species')
+        model_key = selected_species or 'general'
+        try:
+            formats = POINT_FORMATS if dataset == 'occurrences' else RASTER_FORMATS
+            if dataset not in ('predictions', 'timeline', 'occurrences'):
+                raise ValueError(f"Unknown dataset '{dataset}'. Available: predictions, timeline, occurrences")
+            if dataset == 'timeline':
+                formats = ('csv', 'geojson', 'netcdf')
+            if export_format not in formats:
+                raise ValueError(f"Format '{export_format}' is not available for {dataset}. Available: {', '.join(formats)}")
+            resolution = None
+            if dataset != 'occurrences':
+                default_resolution = DEFAULT_TIMELINE_RESOLUTION if dataset == 'timeline' else DEFAULT_CUBE_RESOLUTION
+                resolution = parse_resolution(request.args.get('resolution') or default_resolution)
+            lat_range = tuple(float(v) for v in request.args['lat_range'].split(',')) if request.args.get('lat_range') else None
+            lon_range = tuple(float(v) for v in request.args['lon_range'].split(',')) if request.args.get('lon_range') else None
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        
+        metadata = {
+            "dataset": dataset,
+            "species": selected_species,
+            "generated": datetime.now().isoformat()
+        }
+        
+        if dataset == 'occurrences':
+            if occurrence_data_for_request() is None:
+                return loading_response()
+            frames = occurrence_frames(
+                species=selected_species,
+                year=request.args.get('year', type=int),
+                region=request.args.get('region'),
+                center_lat=request.args.get('lat', type=float),
+                center_lon=request.args.get('lon', type=float),
+                radius_km=request.args.get('radius_km', type=float)
+            )
+            if export_format == 'csv':
+                chunks = csv_chunks(
+                    (frame.reindex(columns=OCCURRENCE_EXPORT_COLUMNS) for frame in frames), OCCURRENCE_EXPORT_COLUMNS
+                )
+            else:
+                properties = [c for c in OCCURRENCE_EXPORT_COLUMNS if c not in ('decimalLatitude', 'decimalLongitude')]
+                chunks = geojson_chunks(
+                    (frame.reindex(columns=OCCURRENCE_EXPORT_COLUMNS) for frame in frames),
+                    'decimalLatitude', 'decimalLongitude', properties, metadata
+                )
+            filename = f"occurrences_{selected_species or 'all'}"
+        else:
+            window_lats, window_lons = window_axes(resolution, lat_range, lon_range)
+            if len(window_lats) == 0 or len(window_lons) == 0:
+                return jsonify({"status": "error", "message": "The requested area contains no grid cells"}), 400
+            if not ensure_model_trained(selected_species):
+                return jsonify({
+                    "error": "Model not trained",
+                    "message": f"Please train the model first for species: {model_key}"
+                }), 500
+            if model_data[model_key].get('model') is None:
+                return jsonify({"status": "error", "message": "No fitted model for this species"}), 500
+            
+            metadata.update({"resolution": resolution, "model_version": model_data[model_key].get('trained_at')})
+            if dataset == 'timeline':
+                cube, meta = species_timeline(model_key, resolution)
+                years, lats, lons, values = timeline_window(
+                    cube, meta, request.args.get('start_year', type=int), request.args.get('end_year', type=int),
+                    lat_range, lon_range
+                )
+                if len(years) == 0:
+                    return jsonify({"status": "error", "message": "No timeline years in the requested range"}), 400
+                if export_format == 'netcdf':
+                    chunks = netcdf_chunks(values, lats, lons, leading=('year', years), attrs=metadata)
+                elif export_format == 'csv':
+                    chunks = csv_chunks(timeline_frames(lats, lons, values, years), ['year', 'latitude', 'longitude', 'probability'])
+                else:
+                    chunks = geojson_chunks(timeline_frames(lats, lons, values, years), 'latitude', 'longitude', ['year', 'probability'], metadata)
+            else:
+                raster, meta = species_raster(model_key, resolution)
+                if raster is None:
+                    return jsonify({"status": "error", "message": "Prediction raster unavailable"}), 500
+                lats, lons, values = raster_window(raster, meta, lat_range, lon_range)
+                if export_format == 'geotiff':
+                    chunks = geotiff_chunks(values, float(lats[0]), float(lons[0]), resolution)
+                elif export_format == 'netcdf':
+                    chunks = netcdf_chunks(values, lats, lons, attrs=metadata)
+                elif export_format == 'csv':
+                    chunks = csv_chunks(raster_frames(lats, lons, values), ['latitude', 'longitude', 'probability'])
+                else:
+                    chunks = geojson_chunks(raster_frames(lats, lons, values), 'latitude', 'longitude', ['probability'], metadata)
+            filename = f"{dataset}_{model_key}_{resolution_key(resolution)}"
+        
+        filename += f".{EXTENSIONS[export_format]}"
+        mimetype = MIMETYPES[export_format]
+        if request.args.get('gzip') in ('1', 'true'):
+            chunks = gzip_chunks(chunks)
+            filename += '.gz'
+            mimetype = 'application/gzip'
+        
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+        
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Export failed: {str(e)}"
+        }), 500
+
+def parse_point(point):
+    """(lat, lon) of a point object or [lat, lon] pair; both must be finite numbers"""
+    if isinstance(point, dict):
+        lat, lon = point.get('latitude'), point.get('longitude')
+    elif isinstance(point, (list, tuple)) and len(point) == 2:
+        lat, lon = point
+    else:
+        raise ValueError(f"Invalid point {point!r}; expected an object with latitude and longitude or a [lat, lon] pair")
+    for value in (lat, lon):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value):
+            raise ValueError(f"Invalid point {point!r}; latitude and longitude must be finite numbers")
+    return float(lat), float(lon)
+
 @app.route("/predict/point", methods=["POST"])
 def predict_point():
-    """Predict species presence at a specific point"""
+    """Predict species presence at a specific point, or a small batch of points"""
     try:
         data = request.json
         lat = data.get('latitude')
         lon = data.get('longitude')
+        points = data.get('points')
         species = data.get('species', 'chanos_chanos')
         
-        if lat is None or lon is None:
+        if points is None and (lat is None or lon is None):
             return jsonify({
                 "error": "Latitude and longitude required"
             }), 400
+        if points is not None and not isinstance(points, list):
+            return jsonify({
+                "error": "points must be a list"
+            }), 400
+        if points is not None and len(points) > MAX_POINT_BATCH:
+            return jsonify({
+                "error": f"At most {MAX_POINT_BATCH} points per request"
+            }), 400
+        if points is not None:
+            try:
+                coordinates = [parse_point(p) for p in points]
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
         
         model_key = species or 'general'
         
@@ -203,8 +974,34 @@ def predict_point():
                 "error": "Model not trained for this species"
             }), 500
         
-        # Use the prediction function
-        probability = predict_species_presence(lat, lon, species)
+        entry = model_data[model_key]
+        # The flattened node arrays answer small batches without sklearn's per-call overhead
+        model = entry.get('compact_model') or entry.get('model')
+        
+        if points is not None:
+            lats = [lat for lat, _ in coordinates]
+            lons = [lon for _, lon in coordinates]
+            if model is None:
+                probabilities = [predict_species_presence(a, o, species) for a, o in zip(lats, lons)]
+            else:
+                probabilities = predict_points(lats, lons, species, model, entry['feature_columns'], entry['imputer']).tolist()
+            return jsonify({
+                "status": "success",
+                "species": species,
+                "predictions": [
+                    {
+                        "latitude": a,
+                        "longitude": o,
+                        "probability": p,
+                        "prediction": "present" if p > 0.5 else "absent"
+                    }
+                    for a, o, p in zip(lats, lons, probabilities)
+                ]
+            })
+        
+        probability = predict_species_presence(
+            lat, lon, species, model, entry.get('feature_columns'), entry.get('imputer')
+        )
         
         return jsonify({
             "status": "success",
@@ -241,7 +1038,10 @@ def model_status():
                     "prediction_points": len(data['predictions']),
                     "lat_range": data['lat_range'],
                     "lon_range": data['lon_range'],
-                    "fasta_species_count": len(data['fasta_species'])
+                    "fasta_species_count": len(data['fasta_species']),
+                    "backend": data.get('backend'),
+                    "accuracy": data.get('accuracy'),
+                    "model": data.get('model_stats')
                 }
             })
         else:
@@ -266,21 +1066,24 @@ def retrain_model():
     try:
         data = request.json or {}
         selected_species = data.get('species')
-        model_key = selected_species or 'general'
         
-        # Clear existing model
-        if model_key in trained_models:
-            del trained_models[model_key]
-        if model_key in model_data:
-            del model_data[model_key]
+        # Retrain; the current model keeps serving until the new one is ready
+        try:
+            job, conflict = submit_training(selected_species, data.get('backend'))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        if conflict is not None:
+            return conflict
+        if data.get('async'):
+            return job_accepted(job)
         
-        # Retrain
-        if ensure_model_trained(selected_species):
+        job = training_jobs.wait(job['id'])
+        if job['status'] == 'succeeded':
             return jsonify({
                 "status": "success",
                 "message": f"Model retrained successfully for {selected_species or 'general'}",
                 "species": selected_species,
-                "training_time": last_training_time.isoformat()
+                "training_time": job['result']['training_time']
             })
         else:
             return jsonify({
@@ -294,6 +1097,138 @@ def retrain_model():
             "message": f"Retraining failed: {str(e)}"
         }), 500
 
+@app.route("/model/compare", methods=["POST"])
+def compare_models():
+    """Fit every backend on a species' training data and report accuracy, fit time, latency and size"""
+    try:
+        data = request.json or {}
+        selected_species = data.get('species')
+        model_key = selected_species or 'general'
+        backends = data.get('backends') or list(MODEL_BACKENDS)
+        
+        unknown = [b for b in backends if b not in MODEL_BACKENDS]
+        if unknown:
+            return jsonify({
+                "status": "error",
+                "message": f"Unknown model backends: {', '.join(unknown)}. Available: {', '.join(MODEL_BACKENDS)}"
+            }), 400
+        
+        if not ensure_model_trained(selected_species):
+            return jsonify({
+                "error": "Model not trained",
+                "message": f"Please train the model first for species: {model_key}"
+            }), 500
+        
+        full_df = model_data[model_key]['full_df']
+        feature_columns = model_data[model_key]['feature_columns'] or get_feature_columns(full_df)
+        results = {}
+        for backend in backends:
+            with timed_stage('model_compare', species=model_key, backend=backend):
+                _, _, _, stats = fit_model(full_df, feature_columns, selected_species, backend=backend)
+            results[backend] = stats
+        
+        return jsonify({
+            "status": "success",
+            "species": selected_species,
+            "active_backend": model_data[model_key].get('backend'),
+            "training_records": len(full_df),
+            "results": results
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Model comparison failed: {str(e)}"
+        }), 500
+
+def ingest_frame(raw_df):
+    """Append new occurrence records to the dataset and fold them into trained models"""
+    global last_training_time
+    
+    appended = append_occurrence_records(raw_df)
+    with ingest_lock:
+        results = ingest_into_models(raw_df, model_data)
+    updated = [key for key, r in results.items() if r['action'] in ('warm_start', 'retrain')]
+    for model_key in updated:
+        model_data[model_key]['trained_at'] = datetime.now().isoformat()
+        model_data[model_key].pop('temporal', None)
+        store_compact_model(model_key)
+        if PRECOMPUTE_RASTERS:
+            store_prediction_rasters(model_key)
+        persist_model_entry(model_key)
+    if updated:
+        last_training_time = datetime.now()
+    return appended, results
+
+def scan_ingest_directory():
+    """Ingest every CSV/TSV file waiting in the drop directory"""
+    processed = []
+    for path in pending_drop_files():
+        try:
+            appended, results = ingest_frame(read_drop_file(path))
+            mark_processed(path)
+            processed.append({'file': os.path.basename(path), 'appended_records': appended, 'models': results})
+        except Exception as e:
+            print(f"Error ingesting {path}: {e}")
+            processed.append({'file': os.path.basename(path), 'error': str(e)})
+    return processed
+
+def start_ingest_watcher(interval_seconds):
+    """Poll the drop directory in a daemon thread"""
+    def watch():
+        while True:
+            time.sleep(interval_seconds)
+            if pending_drop_files():
+                scan_ingest_directory()
+    
+    threading.Thread(target=watch, name='ingest-watcher', daemon=True).start()
+    print(f"Watching {INGEST_DIR} for new occurrence files every {interval_seconds}s")
+
+@app.route("/ingest", methods=["POST"])
+def ingest():
+    """Append new GBIF occurrence records and incrementally update trained models"""
+    try:
+        data = request.json or {}
+        records = data.get('records') or []
+        if not records:
+            return jsonify({
+                "error": "No records provided"
+            }), 400
+        
+        appended, results = ingest_frame(records_to_frame(records))
+        
+        return jsonify({
+            "status": "success",
+            "appended_records": appended,
+            "models": results
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Ingest failed: {str(e)}"
+        }), 500
+
+@app.route("/ingest/scan", methods=["POST"])
+def ingest_scan():
+    """Ingest files waiting in the drop directory"""
+    try:
+        return jsonify({
+            "status": "success",
+            "directory": INGEST_DIR,
+            "files": scan_ingest_directory()
+        })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Ingest scan failed: {str(e)}"
+        }), 500
+
 @app.route("/available-species", methods=["GET"])
 def available_species():
     """Get list of available species for training"""
@@ -331,6 +1266,10 @@ def available_species():
 
 if __name__ == "__main__":
     print("Starting Marine Biodiversity API...")
-    print("Training general model on startup...")
-    ensure_model_trained()
+    # With the debug reloader only the serving child process warms up and
+    # watches the drop directory, so two processes never ingest the same file
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warmup()
+        if os.environ.get('FISHY_INGEST_POLL_SECONDS'):
+            start_ingest_watcher(int(os.environ['FISHY_INGEST_POLL_SECONDS']))
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -0,0 +1,18 @@
+"""ASGI entry point.
+
+    cd backend && uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+Requests run on a pool of FISHY_ASGI_THREADS threads, so metadata endpoints
+keep answering while a dataset load or a training job is in progress; training
+itself runs on the bounded training pool (FISHY_TRAINING_WORKERS).
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import create_app, start_warmup
+
+ASGI_THREADS = int(os.environ.get('FISHY_ASGI_THREADS', 16))
+
+application = WSGIMiddleware(create_app(), workers=ASGI_THREADS)
+start_warmup()
@@ -0,0 +1,156 @@
+"""Mixed-traffic load test against a running backend.
+
+Sends weighted metadata, prediction and occurrence requests from concurrent
+clients for a fixed duration and reports requests per second and latency
+percentiles per endpoint. With --train, a training job is started first so the
+numbers show how the server holds up while a model is being fitted:
+
+    cd backend && uvicorn asgi:application --port 5000
+    python backend/benchmarks/load_test.py --url http://localhost:5000 --duration 30 --train
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from synthetic import BENCHMARK_SPECIES
+
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+# (name, weight, method, path, body)
+TRAFFIC = [
+    ('species', 30, 'GET', '/api/species', None),
+    ('regions', 20, 'GET', '/api/regions', None),
+    ('model_status', 20, 'GET', '/model/status', None),
+    ('predict_point', 15, 'POST', '/predict/point', {'latitude': -6.9, 'longitude': 107.6}),
+    ('occurrence_data', 10, 'GET', f'/api/occurrence-data?species={BENCHMARK_SPECIES}&limit=200', None),
+    ('health', 5, 'GET', '/health', None),
+]
+
+
+def send(base_url, method, path, body, timeout):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(
+        base_url + path, data=data, method=method, headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+def client(base_url, deadline, timeout, seed, samples, lock):
+    rng = random.Random(seed)
+    names = [t[0] for t in TRAFFIC]
+    weights = [t[1] for t in TRAFFIC]
+    routes = {t[0]: t[2:] for t in TRAFFIC}
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        method, path, body = routes[name]
+        start = time.perf_counter()
+        try:
+            ok = send(base_url, method, path, body, timeout) < 500
+        except urllib.error.HTTPError as e:
+            ok = e.code < 500
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            samples.append((name, elapsed, ok))
+
+
+def start_training(base_url, timeout):
+    """Start an asynchronous training job; returns its id or None"""
+    try:
+        request = urllib.request.Request(
+            base_url + '/train', method='POST', headers={'Content-Type': 'application/json'},
+            data=json.dumps({'species': BENCHMARK_SPECIES, 'async': True}).encode()
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())['job']['id']
+    except Exception as e:
+        print(f'Could not start training job: {e}')
+        return None
+
+
+def summarize(samples, duration):
+    def describe(latencies, errors):
+        latencies = sorted(latencies)
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': round(len(latencies) / duration, 2),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+            'p95_ms': round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2) if latencies else None,
+            'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        }
+
+    endpoints = {}
+    for name, _, _, _, _ in TRAFFIC:
+        rows = [s for s in samples if s[0] == name]
+        endpoints[name] = describe([s[1] for s in rows], sum(1 for s in rows if not s[2]))
+    return {
+        'total': describe([s[1] for s in samples], sum(1 for s in samples if not s[2])),
+        'endpoints': endpoints,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mixed-traffic load test for the Fishy backend')
+    parser.add_argument('--url', default='http://localhost:5000', help='base URL of the running server')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of traffic')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout in seconds')
+    parser.add_argument('--train', action='store_true', help='start a training job before the traffic')
+    parser.add_argument('--label', default=datetime.now().strftime('load-%Y%m%d-%H%M%S'),
+                        help='name of the results file')
+    parser.add_argument('--output-dir', default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    job_id = start_training(base_url, args.timeout) if args.train else None
+
+    samples = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for i in range(args.concurrency):
+            pool.submit(client, base_url, deadline, args.timeout, i, samples, lock)
+    duration = time.perf_counter() - start
+
+    summary = summarize(samples, duration)
+    print(f"{'endpoint':<18} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for name, row in list(summary['endpoints'].items()) + [('total', summary['total'])]:
+        print(f"{name:<18} {row['requests']:>9} {row['errors']:>7} {row['rps']:>9} "
+              f"{row['p50_ms'] or '-':>9} {row['p95_ms'] or '-':>9} {row['max_ms'] or '-':>9}")
+    if job_id:
+        print(f'Training job {job_id} was running during the test; see {base_url}/jobs/{job_id}')
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f'{args.label}.json')
+    with open(output_path, 'w') as f:
+        json.dump({
+            'label': args.label,
+            'created': datetime.now().isoformat(),
+            'url': base_url,
+            'duration': duration,
+            'concurrency': args.concurrency,
+            'training_job': job_id,
+            'summary': summary,
+        }, f, indent=2)
+    print(f'\nResults written to {output_path}')
+
+
+if __name__ == '__main__':
+    main()
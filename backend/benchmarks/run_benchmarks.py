@@ -0,0 +1,256 @@
+"""Benchmark suite for the training and serving hot paths.
+
+Runs each benchmark against synthetic occurrence datasets of increasing size and
+stores the timings as JSON so results can be compared between releases without
+network access:
+
+    python backend/benchmarks/run_benchmarks.py --sizes 1000,10000 --label v0.2
+    python backend/benchmarks/run_benchmarks.py --compare backend/benchmarks/results/v0.1.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from synthetic import BENCHMARK_SPECIES, generate_feature_frame, write_occurrence_file
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the pipeline's progress prints while timing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def use_workdir(workdir):
+    """Keep models, features, the occurrence store and drop files out of backend/data"""
+    os.environ['FISHY_MODEL_DIR'] = os.path.join(workdir, 'models')
+    os.environ['FISHY_FEATURE_DIR'] = os.path.join(workdir, 'features')
+    os.environ['FISHY_DATABASE_PATH'] = os.path.join(workdir, 'fishy.sqlite')
+    os.environ['FISHY_SHORE_DISTANCE_PATH'] = os.path.join(workdir, 'distance_to_shore.npy')
+    os.environ['FISHY_INGEST_DIR'] = os.path.join(workdir, 'ingest')
+    os.environ['FISHY_INGESTED_PATH'] = os.path.join(workdir, 'ingested_occurrences.tsv')
+
+
+def use_occurrence_file(n_rows, workdir):
+    """Point the data loaders at a synthetic occurrence file with n_rows records"""
+    path = os.path.join(workdir, f'occurrence_{n_rows}.tsv')
+    if not os.path.exists(path):
+        write_occurrence_file(n_rows, path)
+    os.environ['FISHY_OCCURRENCE_PATH'] = path
+    return path
+
+
+def setup_load_and_prepare_data(n_rows, workdir):
+    from utils.preprocessing import load_and_prepare_data, read_occurrence_csv
+    use_occurrence_file(n_rows, workdir)
+    # The export is memoized per process and prepared features are stored; re-read
+    # it and skip the store so every run includes parsing and preparation
+    return lambda: (read_occurrence_csv(reload=True), load_and_prepare_data(BENCHMARK_SPECIES, use_feature_store=False))
+
+
+def setup_generate_intelligent_absence_data(n_rows, workdir):
+    from utils.preprocessing import generate_intelligent_absence_data, get_enhanced_species_habitat_preferences
+    presence_df = generate_feature_frame(n_rows)
+    habitat_prefs = get_enhanced_species_habitat_preferences()
+    return lambda: generate_intelligent_absence_data(presence_df, BENCHMARK_SPECIES, habitat_prefs)
+
+
+def setup_add_derived_features(n_rows, workdir):
+    from utils.preprocessing import add_derived_features, get_enhanced_species_habitat_preferences
+    df = generate_feature_frame(n_rows)
+    habitat_prefs = get_enhanced_species_habitat_preferences()
+    return lambda: add_derived_features(df.copy(), BENCHMARK_SPECIES, habitat_prefs)
+
+
+def setup_train_and_predict(n_rows, workdir):
+    from utils.prediction import train_and_predict
+    full_df = generate_feature_frame(n_rows)
+    presence_df = full_df[full_df['label'] == 1]
+    lat_range = (full_df['decimalLatitude'].min(), full_df['decimalLatitude'].max())
+    lon_range = (full_df['decimalLongitude'].min(), full_df['decimalLongitude'].max())
+    return lambda: train_and_predict(presence_df, full_df, lat_range, lon_range, BENCHMARK_SPECIES)
+
+
+def setup_generate_prediction_grid(n_rows, workdir):
+    from utils.backends import build_classifier
+    from utils.prediction import generate_prediction_grid
+    feature_columns = ['decimalLatitude', 'decimalLongitude', 'temperature', 'depth', 'salinity']
+    full_df = generate_feature_frame(n_rows)
+    model = build_classifier()
+    model.fit(full_df[feature_columns], full_df['label'])
+    return lambda: generate_prediction_grid((-11, 6), (95, 141), model, feature_columns, BENCHMARK_SPECIES)
+
+
+def setup_predict_route(n_rows, workdir):
+    import app as backend_app
+    use_occurrence_file(n_rows, workdir)
+    backend_app.trained_models.clear()
+    backend_app.model_data.clear()
+    backend_app.ensure_model_trained(BENCHMARK_SPECIES)
+    client = backend_app.app.test_client()
+    return lambda: check_response(client.get(f'/predict?species={BENCHMARK_SPECIES}'))
+
+
+def setup_occurrence_data_route(n_rows, workdir):
+    import app as backend_app
+    import routes
+    use_occurrence_file(n_rows, workdir)
+    routes.occurrence_data = None
+    routes.load_occurrence_data()
+    client = backend_app.app.test_client()
+    return lambda: check_response(client.get(f'/api/occurrence-data?species={BENCHMARK_SPECIES}&limit=1000'))
+
+
+def check_response(response):
+    if response.status_code != 200:
+        raise RuntimeError(f'HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}')
+    return response
+
+
+BENCHMARKS = {
+    'load_and_prepare_data': setup_load_and_prepare_data,
+    'generate_intelligent_absence_data': setup_generate_intelligent_absence_data,
+    'add_derived_features': setup_add_derived_features,
+    'train_and_predict': setup_train_and_predict,
+    'generate_prediction_grid': setup_generate_prediction_grid,
+    'route_predict': setup_predict_route,
+    'route_occurrence_data': setup_occurrence_data_route,
+}
+
+
+def time_benchmark(setup, n_rows, workdir, repeat):
+    """Run setup once, then time the returned callable `repeat` times"""
+    with quiet():
+        target = setup(n_rows, workdir)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            target()
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def environment_info():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+def run(benchmarks, sizes, repeat, budget):
+    results = []
+    with tempfile.TemporaryDirectory(prefix='fishy-bench-') as workdir:
+        # Module-level paths are read on import, so redirect them before any setup imports app
+        use_workdir(workdir)
+        for name in benchmarks:
+            over_budget = False
+            for n_rows in sizes:
+                entry = {'benchmark': name, 'rows': n_rows, 'repeat': repeat}
+                if over_budget:
+                    entry['status'] = 'skipped'
+                    print(f'{name:<36} {n_rows:>9}  skipped (previous size exceeded {budget}s budget)')
+                    results.append(entry)
+                    continue
+
+                try:
+                    times = time_benchmark(BENCHMARKS[name], n_rows, workdir, repeat)
+                except Exception as e:
+                    entry.update({'status': 'error', 'error': str(e)})
+                    print(f'{name:<36} {n_rows:>9}  error: {e}')
+                    results.append(entry)
+                    continue
+
+                entry.update({
+                    'status': 'ok',
+                    'times': times,
+                    'min': min(times),
+                    'median': statistics.median(times),
+                    'mean': statistics.mean(times),
+                })
+                print(f"{name:<36} {n_rows:>9}  min {entry['min']:.4f}s  median {entry['median']:.4f}s")
+                results.append(entry)
+                over_budget = entry['min'] > budget
+    return results
+
+
+def compare(results, baseline_path):
+    """Print the median ratio of each benchmark against a previous results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {
+        (r['benchmark'], r['rows']): r for r in baseline['results'] if r.get('status') == 'ok'
+    }
+    print(f'\nComparison against {baseline_path} ({baseline.get("label")}):')
+    for entry in results:
+        old = previous.get((entry['benchmark'], entry['rows']))
+        if entry.get('status') != 'ok' or old is None:
+            continue
+        ratio = entry['median'] / old['median'] if old['median'] else float('inf')
+        flag = '  REGRESSION' if ratio > 1.1 else ''
+        print(f"{entry['benchmark']:<36} {entry['rows']:>9}  {old['median']:.4f}s -> {entry['median']:.4f}s  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Fishy backend hot paths')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='comma-separated dataset sizes (rows)')
+    parser.add_argument('--only', default=','.join(BENCHMARKS),
+                        help='comma-separated benchmark names to run')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark and size')
+    parser.add_argument('--budget', type=float, default=120.0,
+                        help='skip larger sizes once a run takes longer than this many seconds')
+    parser.add_argument('--label', default=datetime.now().strftime('%Y%m%d-%H%M%S'),
+                        help='name of the results file')
+    parser.add_argument('--output-dir', default=RESULTS_DIR)
+    parser.add_argument('--compare', help='previous results JSON to compare against')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    benchmarks = [b for b in args.only.split(',') if b]
+    unknown = [b for b in benchmarks if b not in BENCHMARKS]
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(unknown)}')
+
+    results = run(benchmarks, sizes, args.repeat, args.budget)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_path = os.path.join(args.output_dir, f'{args.label}.json')
+    with open(output_path, 'w') as f:
+        json.dump({
+            'label': args.label,
+            'created': datetime.now().isoformat(),
+            'environment': environment_info(),
+            'results': results,
+        }, f, indent=2)
+    print(f'\nResults written to {output_path}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+# Species with FASTA data plus a few occurrence-only species, weighted so the
+# selected benchmark species makes up roughly half of every dataset.
+SPECIES = [
+    ('Thunnus albacares', 'Thunnus albacares (Bonnaterre, 1788)', 'Scombridae'),
+    ('Chanos chanos', 'Chanos chanos (Forsskål, 1775)', 'Chanidae'),
+    ('Rastrelliger kanagurta', 'Rastrelliger kanagurta (Cuvier, 1816)', 'Scombridae'),
+    ('Lutjanus campechanus', 'Lutjanus campechanus (Poey, 1860)', 'Lutjanidae'),
+    ('Euthynnus affinis', 'Euthynnus affinis (Cantor, 1849)', 'Scombridae'),
+    ('Siganus canaliculatus', 'Siganus canaliculatus (Park, 1797)', 'Siganidae'),
+    ('Caesio cuning', 'Caesio cuning (Bloch, 1791)', 'Caesionidae'),
+    ('Chromis viridis', 'Chromis viridis (Cuvier, 1830)', 'Pomacentridae'),
+]
+SPECIES_WEIGHTS = [0.5, 0.1, 0.1, 0.06, 0.06, 0.06, 0.06, 0.06]
+
+REGIONS = [
+    ('Jawa Barat', -6.9, 107.6),
+    ('Bali', -8.4, 115.2),
+    ('Sulawesi Utara', 1.2, 124.8),
+    ('Maluku', -3.2, 128.2),
+    ('Papua', -2.5, 140.7),
+    ('Aceh', 5.5, 95.3),
+    ('Nusa Tenggara Timur', -9.5, 121.0),
+    ('Kalimantan Timur', 0.5, 117.1),
+]
+
+BENCHMARK_SPECIES = 'Thunnus_albacares'
+
+
+def generate_occurrence_frame(n_rows, seed=42):
+    """Generate a GBIF-shaped occurrence frame clustered around Indonesian regions"""
+    rng = np.random.default_rng(seed)
+
+    species_idx = rng.choice(len(SPECIES), size=n_rows, p=SPECIES_WEIGHTS)
+    region_idx = rng.integers(0, len(REGIONS), size=n_rows)
+    region_lat = np.array([r[1] for r in REGIONS])[region_idx]
+    region_lon = np.array([r[2] for r in REGIONS])[region_idx]
+
+    lat = np.clip(region_lat + rng.normal(0, 1.5, n_rows), -11, 6)
+    lon = np.clip(region_lon + rng.normal(0, 2.0, n_rows), 95, 141)
+
+    return pd.DataFrame({
+        'gbifID': np.arange(1, n_rows + 1, dtype=np.int64) + 4000000000,
+        'species': np.array([s[0] for s in SPECIES])[species_idx],
+        'scientificName': np.array([s[1] for s in SPECIES])[species_idx],
+        'family': np.array([s[2] for s in SPECIES])[species_idx],
+        'countryCode': 'ID',
+        'stateProvince': np.array([r[0] for r in REGIONS])[region_idx],
+        'locality': 'synthetic',
+        'decimalLatitude': lat.round(5),
+        'decimalLongitude': lon.round(5),
+        'year': rng.integers(1990, 2024, size=n_rows),
+        'depth': rng.uniform(0, 200, size=n_rows).round(1),
+        'individualCount': rng.integers(1, 20, size=n_rows),
+    })
+
+
+def write_occurrence_file(n_rows, path, seed=42):
+    """Write a synthetic occurrence export in the same tab-separated layout as GBIF"""
+    generate_occurrence_frame(n_rows, seed).to_csv(path, sep='\t', index=False)
+    return path
+
+
+def generate_feature_frame(n_rows, seed=42):
+    """Generate a labelled presence/absence frame with environmental columns"""
+    rng = np.random.default_rng(seed)
+    frame = generate_occurrence_frame(n_rows, seed)[['decimalLatitude', 'decimalLongitude', 'species', 'scientificName', 'year']]
+    frame['temperature'] = rng.normal(27, 1.5, n_rows)
+    frame['depth'] = rng.uniform(0, 200, n_rows)
+    frame['salinity'] = rng.normal(34, 1.0, n_rows)
+    frame['label'] = rng.integers(0, 2, n_rows)
+    return frame
@@ -0,0 +1,37 @@
+import os
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+
+db = SQLAlchemy()
+
+# Local SQLite file shared by every worker; no database server is needed
+DATABASE_PATH = os.environ.get(
+    'FISHY_DATABASE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'occurrences.sqlite')
+)
+
+def _configure_connection(dbapi_connection, connection_record):
+    """Per-connection pragmas: WAL lets readers run alongside a rebuild"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-32000")
+    cursor.close()
+
+def init_database(app):
+    """Bind the SQLAlchemy extension to the occurrence database"""
+    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{DATABASE_PATH}")
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_pre_ping': True,
+        'connect_args': {'check_same_thread': False, 'timeout': 30},
+    })
+    db.init_app(app)
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', _configure_connection)
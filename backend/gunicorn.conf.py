@@ -0,0 +1,32 @@
+import gc
+import os
+
+# Load the dataset and persisted models once in the master, then fork the
+# workers from it: they share those pages copy-on-write instead of each one
+# fetching the CSV and training on its own.
+#
+#   cd backend && gunicorn -c gunicorn.conf.py
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = "app:create_app(preload=True)"
+preload_app = True
+bind = os.environ.get('FISHY_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('FISHY_WORKERS', 4))
+threads = int(os.environ.get('FISHY_THREADS', 1))
+# Training a model on a cold worker can take minutes
+timeout = int(os.environ.get('FISHY_WORKER_TIMEOUT', 300))
+
+# No collections while the master builds the preloaded state; a collection
+# would only touch (and later un-share) pages that are about to be frozen.
+gc.disable()
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's reach, then resume
+    gc.freeze()
+    gc.enable()
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+def post_fork(server, worker):
+    import app
+    app.after_fork()
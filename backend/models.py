@@ -1,10 +1,35 @@
-from backend.database import db
+from database import db
 
 class SpeciesOccurrence(db.Model):
     __tablename__ = 'occurrences'
 
     id = db.Column(db.Integer, primary_key=True)
+    gbif_id = db.Column(db.BigInteger)
     species_name = db.Column(db.String(100), nullable=False)
+    scientific_name = db.Column(db.String(200))
+    family = db.Column(db.String(100))
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
-    year = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer)
+    state_province = db.Column(db.String(100))
+    locality = db.Column(db.String(255))
+    depth = db.Column(db.Float)
+    individual_count = db.Column(db.Integer)
+    # Normalized names (lowercase, underscores as spaces) the filters match as
+    # indexed prefix ranges
+    species_key = db.Column(db.String(100))
+    scientific_key = db.Column(db.String(200))
+    region_key = db.Column(db.String(100))
+
+    __table_args__ = (
+        db.Index('ix_occurrences_species_key_year', 'species_key', 'year'),
+        db.Index('ix_occurrences_scientific_key', 'scientific_key'),
+        db.Index('ix_occurrences_year', 'year'),
+        db.Index('ix_occurrences_region_key', 'region_key'),
+    )
+
+class StoreMetadata(db.Model):
+    __tablename__ = 'store_metadata'
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.String(255))
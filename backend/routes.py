@@ -1,10 +1,31 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, has_app_context, jsonify, request
+import os
+import threading
+import time
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import requests
-from io import StringIO
-from utils.preprocessing import load_fasta_species, get_enhanced_species_habitat_preferences
+from utils.preprocessing import (
+    load_fasta_species, get_enhanced_species_habitat_preferences, read_occurrence_csv, append_ingested_occurrences,
+    compact_frame
+)
+from utils.metrics import timed_stage
+from utils.profiling import annotate_profile
+from utils.seeding import dataset_fingerprint, derive_seed, make_rng
+from utils.cache import TTLCache
+from utils.jobs import JobQueue
+from utils.binning import (
+    BIN_SHAPES, MAX_BIN_SIZE, MIN_BIN_SIZE, matching_species_codes, occurrence_bin_counts, summarize_bins
+)
+from utils.geo import radius_mask
+from utils.density import (
+    DEFAULT_DENSITY_RESOLUTION, MAX_DENSITY_RESOLUTION, MIN_DENSITY_RESOLUTION, STUDY_LAT_RANGE, STUDY_LON_RANGE,
+    binned_kde
+)
+from utils.payload import encode_coordinates, encode_cube, parse_payload_options
+from utils.occurrence_store import (
+    append_to_store, iter_occurrences, name_key, query_occurrences, store_ready, sync_occurrence_store
+)
 
 
 bp = Blueprint("api", __name__, url_prefix="/api")
@@ -14,39 +35,115 @@ occurrence_data = None
 regions_data = None
 species_data = None
 fasta_species_data = None
+occurrence_version = None
+# Serializes loads so concurrent first requests share one read of the export
+load_lock = threading.RLock()
+# Request handlers start the first load here and answer 503 until it finishes,
+# instead of holding their thread (and load_lock) through the download
+load_jobs = JobQueue(max_workers=1, name='occurrence-load')
+LOAD_RETRY_AFTER_SECONDS = 5
+# (error, time) of the last failed load. Requests answer 500 with the error and
+# only start another load once the backoff has passed.
+load_failure = None
+LOAD_FAILURE_BACKOFF_SECONDS = int(os.environ.get('FISHY_LOAD_FAILURE_BACKOFF', 60))
+
+HABITAT_PREFS = get_enhanced_species_habitat_preferences()
+
+# (region, species, dataset version) -> environmental summary
+ENVIRONMENTAL_CACHE_TTL = int(os.environ.get('FISHY_ENVIRONMENTAL_CACHE_TTL', 3600))
+environmental_cache = TTLCache(ttl_seconds=ENVIRONMENTAL_CACHE_TTL, max_entries=4096)
+
+# (shape, size, dataset version) -> per-bin counts of the whole dataset
+bin_cache = TTLCache(ttl_seconds=ENVIRONMENTAL_CACHE_TTL, max_entries=64)
+# (filters, grid, bandwidth, dataset version) -> smoothed density grid
+density_cache = TTLCache(ttl_seconds=ENVIRONMENTAL_CACHE_TTL, max_entries=128)
+
+# Serve /occurrence-data from the shared SQLite store instead of the in-memory frame
+USE_OCCURRENCE_STORE = os.environ.get('FISHY_OCCURRENCE_STORE', '1') == '1'
+
+def reload_occurrence_data():
+    """Drop the loaded dataset and every cache derived from it, then load it again"""
+    global occurrence_data, regions_data, species_data, occurrence_version
+    
+    # Fetch first: the current dataset keeps serving while the export downloads
+    read_occurrence_csv(reload=True)
+    load_fasta_species(reload=True)
+    with load_lock:
+        occurrence_data = None
+        regions_data = None
+        species_data = None
+        occurrence_version = None
+        environmental_cache.clear()
+        bin_cache.clear()
+        density_cache.clear()
+        return load_occurrence_data()
 
 def load_occurrence_data():
     """Load occurrence data from the provided CSV URL"""
-    global occurrence_data, regions_data, species_data, fasta_species_data
+    # The frame is published before its catalog is built, so a load still in
+    # progress is detected by the missing catalog
+    if occurrence_data is not None and species_data is not None:
+        return occurrence_data
+    
+    with load_lock:
+        if occurrence_data is not None:
+            return occurrence_data
+        return _load_occurrence_data()
+
+def _load_in_app_context(app):
+    with app.app_context():
+        load_occurrence_data()
+
+def occurrence_data_for_request():
+    """The loaded dataset, or None after starting its load in the background"""
+    global load_failure
     
-    if occurrence_data is not None:
+    if occurrence_data is not None and species_data is not None:
         return occurrence_data
+    if load_failure is not None:
+        if time.time() - load_failure[1] < LOAD_FAILURE_BACKOFF_SECONDS:
+            return None
+        load_failure = None
+    load_jobs.submit('occurrences', 'load', _load_in_app_context, current_app._get_current_object())
+    return None
+
+def loading_response():
+    """503 telling the client to retry once the dataset has loaded, or 500 if the last load failed"""
+    if load_failure is not None:
+        return jsonify({"error": f"Occurrence data failed to load: {load_failure[0]}"}), 500
+    response = jsonify({
+        "error": "Occurrence data is loading",
+        "retry_after": LOAD_RETRY_AFTER_SECONDS
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(LOAD_RETRY_AFTER_SECONDS)
+    return response
+
+def _load_occurrence_data():
+    """Read, filter and index the export; called with load_lock held"""
+    global occurrence_data, regions_data, species_data, fasta_species_data, occurrence_version, load_failure
     
+    load_failure = None
     try:
 
-        fasta_species_data = load_fasta_species()
+        with timed_stage('load_fasta'):
+            fasta_species_data = load_fasta_species()
 
-        url = "https://hebbkx1anhila5yf.public.blob.vercel-storage.com/occurrence-q4D1BSg6qEE6PpgihdkwFSFmjxw9rs.csv"
-        print(f"Loading data from: {url}")
-        
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        
-        df = pd.read_csv(StringIO(response.text))
+        with timed_stage('load_occurrences'):
+            df = read_occurrence_csv()
         print(f"Raw data loaded: {len(df)} records")
      
-        df = df[
-            (df['countryCode'] == 'ID') &
-            (df['decimalLatitude'].notna()) &
-            (df['decimalLongitude'].notna()) &
-            (df['decimalLatitude'] >= -11) &
-            (df['decimalLatitude'] <= 6) &
-            (df['decimalLongitude'] >= 95) &
-            (df['decimalLongitude'] <= 141)
-        ]
+        df = filter_occurrence_frame(df)
         
         occurrence_data = df
-        process_regions_and_species()
+        occurrence_version = dataset_fingerprint(df)
+        environmental_cache.clear()
+        bin_cache.clear()
+        density_cache.clear()
+        with timed_stage('catalog_build', rows=len(df)):
+            process_regions_and_species()
+        sync_store()
+        occurrence_data = compact_frame(occurrence_data)
         
         print(f"Filtered data: {len(occurrence_data)} occurrence records")
         print(f"Processed: {len(regions_data)} regions, {len(species_data)} species")
@@ -55,9 +152,72 @@ def load_occurrence_data():
         
     except Exception as e:
         print(f"Error loading occurrence data: {e}")
+        # Nothing half-built stays published; requests report the error until
+        # the backoff has passed and then load again
+        occurrence_data = None
+        load_failure = (str(e), time.time())
         fasta_species_data = load_fasta_species()
         return pd.DataFrame()
 
+def sync_store():
+    """Bring the SQLite store up to the loaded dataset version; False if it is unavailable"""
+    if not USE_OCCURRENCE_STORE or occurrence_data is None or not has_app_context():
+        return False
+    try:
+        if not store_ready(occurrence_version):
+            sync_occurrence_store(occurrence_data, occurrence_version)
+        return True
+    except Exception as e:
+        print(f"Error syncing occurrence store: {e}")
+        return False
+
+def filter_occurrence_frame(df):
+    """Keep Indonesian records with coordinates inside the study area"""
+    country_ok = df['countryCode'] == 'ID' if 'countryCode' in df.columns else True
+    return df[
+        country_ok &
+        (df['decimalLatitude'].notna()) &
+        (df['decimalLongitude'].notna()) &
+        (df['decimalLatitude'] >= -11) &
+        (df['decimalLatitude'] <= 6) &
+        (df['decimalLongitude'] >= 95) &
+        (df['decimalLongitude'] <= 141)
+    ]
+
+def append_occurrence_records(df):
+    """Append newly ingested records to the loaded dataset and refresh everything derived from it"""
+    global occurrence_data, occurrence_version
+    
+    with load_lock:
+        load_occurrence_data()
+        new_records = filter_occurrence_frame(df)
+        base = occurrence_data if occurrence_data is not None else pd.DataFrame()
+        if 'gbifID' in new_records.columns and 'gbifID' in base.columns:
+            new_records = new_records[~new_records['gbifID'].isin(base['gbifID'])]
+        if len(new_records) == 0:
+            return 0
+    
+        # Written to the ingest log first, so training and the next restart read them too
+        append_ingested_occurrences(new_records)
+        occurrence_data = pd.concat([base, new_records], ignore_index=True)
+        previous_version = occurrence_version
+        occurrence_version = dataset_fingerprint(occurrence_data)
+        environmental_cache.clear()
+        bin_cache.clear()
+        density_cache.clear()
+        if USE_OCCURRENCE_STORE and has_app_context():
+            try:
+                if store_ready(previous_version):
+                    append_to_store(new_records, occurrence_version)
+                else:
+                    sync_store()
+            except Exception as e:
+                print(f"Error appending to occurrence store: {e}")
+        with timed_stage('catalog_build', rows=len(occurrence_data)):
+            process_regions_and_species()
+        occurrence_data = compact_frame(occurrence_data)
+        return len(new_records)
+
 def process_regions_and_species():
     """Process regions and species from occurrence data"""
     global regions_data, species_data, fasta_species_data
@@ -69,7 +229,7 @@ def process_regions_and_species():
     
     try:
         # Process regions
-        region_groups = occurrence_data.groupby('stateProvince').agg({
+        region_groups = occurrence_data.groupby('stateProvince', observed=True).agg({
             'decimalLatitude': 'mean',
             'decimalLongitude': 'mean',
             'gbifID': 'count'
@@ -77,18 +237,28 @@ def process_regions_and_species():
         
         region_groups = region_groups[region_groups['gbifID'] >= 5] 
         region_groups = region_groups.sort_values('gbifID', ascending=False)
+        region_groups = region_groups[region_groups['stateProvince'].notna()]
         
-        regions_data = []
-        for _, row in region_groups.iterrows():
-            if pd.notna(row['stateProvince']):
-                regions_data.append({
-                    'id': row['stateProvince'].lower().replace(' ', '-').replace(',', ''),
-                    'name': row['stateProvince'],
-                    'coordinates': [row['decimalLatitude'], row['decimalLongitude']],
-                    'occurrenceCount': int(row['gbifID'])
-                })
+        region_names = region_groups['stateProvince'].astype(str)
+        region_ids = region_names.str.lower().str.replace(' ', '-', regex=False).str.replace(',', '', regex=False)
+
+        regions_data = [
+            {
+                'id': region_id,
+                'name': name,
+                'coordinates': [lat, lon],
+                'occurrenceCount': int(count)
+            }
+            for region_id, name, lat, lon, count in zip(
+                region_ids.tolist(),
+                region_names.tolist(),
+                region_groups['decimalLatitude'].tolist(),
+                region_groups['decimalLongitude'].tolist(),
+                region_groups['gbifID'].tolist()
+            )
+        ]
  
-        species_groups = occurrence_data.groupby('species').agg({
+        species_groups = occurrence_data.groupby('species', observed=True).agg({
             'scientificName': 'first',
             'family': 'first',
             'gbifID': 'count'
@@ -96,52 +266,59 @@ def process_regions_and_species():
         
         species_groups = species_groups[species_groups['gbifID'] >= 10]  
         species_groups = species_groups.sort_values('gbifID', ascending=False)
+        species_groups['scientificName'] = species_groups['scientificName'].astype(object).fillna(species_groups['species'].astype(object))
+        species_groups['family'] = species_groups['family'].astype(object).fillna('Unknown')
+
+        # Index occurrence counts by lower-cased binomial of both the species and
+        # scientificName columns; groups are sorted by count so the first key wins,
+        # matching the old "first str.contains hit" lookup in a single pass.
+        occurrence_counts = {}
+        for column in ('species', 'scientificName'):
+            binomials = species_groups[column].str.lower().str.split().str[:2].str.join(' ')
+            for binomial, count in zip(binomials.tolist(), species_groups['gbifID'].tolist()):
+                occurrence_counts.setdefault(binomial, count)
         
         species_data = []
        
         if fasta_species_data:
             for species_id, fasta_info in fasta_species_data.items():
-             
-                occurrence_count = 0
                 scientific_name = fasta_info['scientific_name']
-                
-                matching_occurrence = species_groups[
-                    species_groups['species'].str.contains(scientific_name, case=False, na=False) |
-                    species_groups['scientificName'].str.contains(scientific_name, case=False, na=False)
-                ]
-                
-                if not matching_occurrence.empty:
-                    occurrence_count = matching_occurrence.iloc[0]['gbifID']
+                occurrence_count = int(occurrence_counts.get(scientific_name.lower(), 0))
                 
                 species_data.append({
                     'id': species_id,
                     'scientificName': scientific_name,
                     'commonName': fasta_info['common_name'],
                     'family': 'Marine Fish',  # Default family
-                    'occurrenceCount': int(occurrence_count),
+                    'occurrenceCount': occurrence_count,
                     'sequenceCount': fasta_info['sequence_count'],
                     'hasFastaData': True,
                     'hasOccurrenceData': occurrence_count > 0
                 })
-      
-        for _, row in species_groups.iterrows():
-            if pd.notna(row['species']):
-                species_scientific = row['scientificName'] or row['species']
-                species_id = species_scientific.lower().replace(' ', '_')
-             
-                already_added = any(s['id'] == species_id for s in species_data)
-                
-                if not already_added:
-                    species_data.append({
-                        'id': species_id,
-                        'scientificName': species_scientific,
-                        'commonName': get_common_name(row['species']),
-                        'family': row['family'] or 'Unknown',
-                        'occurrenceCount': int(row['gbifID']),
-                        'sequenceCount': 0,
-                        'hasFastaData': False,
-                        'hasOccurrenceData': True
-                    })
+
+        seen_ids = {s['id'] for s in species_data}
+        occurrence_ids = species_groups['scientificName'].str.lower().str.replace(' ', '_', regex=False)
+
+        for species_id, species_scientific, species, family, count in zip(
+            occurrence_ids.tolist(),
+            species_groups['scientificName'].tolist(),
+            species_groups['species'].tolist(),
+            species_groups['family'].tolist(),
+            species_groups['gbifID'].tolist()
+        ):
+            if species_id in seen_ids:
+                continue
+            seen_ids.add(species_id)
+            species_data.append({
+                'id': species_id,
+                'scientificName': species_scientific,
+                'commonName': get_common_name(species),
+                'family': family,
+                'occurrenceCount': int(count),
+                'sequenceCount': 0,
+                'hasFastaData': False,
+                'hasOccurrenceData': True
+            })
    
         species_data.sort(key=lambda x: (not x['hasFastaData'], -x['occurrenceCount']))
                 
@@ -170,7 +347,8 @@ def get_common_name(scientific_name):
 def get_fasta_species():
     """Get all species that have FASTA data available"""
     try:
-        load_occurrence_data()  
+        if occurrence_data_for_request() is None:
+            return loading_response()
         
         if fasta_species_data is None:
             return jsonify([])
@@ -195,7 +373,8 @@ def get_fasta_species():
 def get_species_details(species_id):
     """Get detailed information about a specific species"""
     try:
-        load_occurrence_data()
+        if occurrence_data_for_request() is None:
+            return loading_response()
         
         fasta_info = None
         if fasta_species_data and species_id in fasta_species_data:
@@ -225,8 +404,7 @@ def get_species_details(species_id):
                 }
         
         # Get habitat preferences
-        habitat_prefs = get_species_habitat_preferences()
-        habitat_info = habitat_prefs.get(species_id, {})
+        habitat_info = HABITAT_PREFS.get(species_id, {})
         
         result = {
             'id': species_id,
@@ -247,7 +425,9 @@ def get_species_details(species_id):
 def get_occurrence_data():
     """Get occurrence data filtered by species and year"""
     try:
-        data = load_occurrence_data()
+        data = occurrence_data_for_request()
+        if data is None:
+            return loading_response()
         
         if len(data) == 0:
             return jsonify([])
@@ -256,59 +436,285 @@ def get_occurrence_data():
         year = request.args.get('year', type=int)
         region = request.args.get('region')
         limit = request.args.get('limit', type=int, default=1000)
+        center_lat = request.args.get('lat', type=float)
+        center_lon = request.args.get('lon', type=float)
+        radius_km = request.args.get('radius_km', type=float)
+        
+        filtered_data = None
+        matched = None
+        if USE_OCCURRENCE_STORE and sync_store():
+            try:
+                filtered_data, matched = query_occurrences(
+                    species=species,
+                    year=year,
+                    region_name=region.replace('-', ' ').title() if region else None,
+                    center_lat=center_lat,
+                    center_lon=center_lon,
+                    radius_km=radius_km,
+                    limit=limit
+                )
+            except Exception as e:
+                print(f"Occurrence store query failed, using in-memory data: {e}")
+                filtered_data = None
+        
+        if filtered_data is None:
+            filtered_data = filter_occurrences_in_memory(
+                data, species, year, region, center_lat, center_lon, radius_km
+            )
+            matched = len(filtered_data)
+            
+            # Limit results for performance
+            if len(filtered_data) > limit:
+                filtered_data = filtered_data.sample(n=limit)
         
-        filtered_data = data.copy()
+        annotate_profile(occurrence_rows=len(data), filtered_rows=matched, species=species)
         
-        if species:
-            # Handle both species ID format (with underscores) and scientific names
-            species_name = species.replace('_', ' ')
-            filtered_data = filtered_data[
-                (filtered_data['species'].str.contains(species_name, case=False, na=False)) | 
-                (filtered_data['scientificName'].str.contains(species_name, case=False, na=False)) |
-                (filtered_data['species'] == species) |
-                (filtered_data['scientificName'] == species)
-            ]
+        return jsonify(occurrence_records(filtered_data))
         
-        if year:
-            filtered_data = filtered_data[filtered_data['year'] == year]
-            
-        if region:
-            region_name = region.replace('-', ' ').title()
-            filtered_data = filtered_data[
-                filtered_data['stateProvince'].str.contains(region_name, na=False, case=False)
-            ]
+    except Exception as e:
+        print(f"Error in get_occurrence_data: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/occurrence-bins", methods=["GET"])
+def get_occurrence_bins():
+    """Occurrence counts aggregated into square or hexagonal bins over the whole dataset"""
+    try:
+        shape = request.args.get('shape', 'hex')
+        size = request.args.get('size', type=float, default=0.25)
+        species = request.args.get('species')
+        year = request.args.get('year', type=int)
+        start_year = request.args.get('start_year', type=int, default=year)
+        end_year = request.args.get('end_year', type=int, default=year)
+        breakdown = [f for f in request.args.get('breakdown', '').split(',') if f]
+        polygons = request.args.get('polygons') == '1'
+        try:
+            lat_range = tuple(float(v) for v in request.args['lat_range'].split(',')) if request.args.get('lat_range') else None
+            lon_range = tuple(float(v) for v in request.args['lon_range'].split(',')) if request.args.get('lon_range') else None
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if shape not in BIN_SHAPES:
+            return jsonify({"error": f"shape must be one of {', '.join(BIN_SHAPES)}"}), 400
+        if not MIN_BIN_SIZE <= size <= MAX_BIN_SIZE:
+            return jsonify({"error": f"size must be between {MIN_BIN_SIZE} and {MAX_BIN_SIZE} degrees"}), 400
+        if any(f not in ('species', 'year') for f in breakdown):
+            return jsonify({"error": "breakdown accepts species and year"}), 400
+        
+        data = occurrence_data_for_request()
+        if data is None:
+            return loading_response()
+        counts, taxa = bin_cache.get_or_compute(
+            (shape, size, occurrence_version),
+            lambda: occurrence_bin_counts(data, shape, size)
+        )
+        species_codes = matching_species_codes(taxa, species) if species else None
+        
+        bins = summarize_bins(
+            counts, taxa, shape, size,
+            species_codes=species_codes,
+            start_year=start_year,
+            end_year=end_year,
+            lat_range=lat_range,
+            lon_range=lon_range,
+            breakdown=breakdown,
+            polygons=polygons
+        )
+        annotate_profile(occurrence_rows=len(data), bins=len(bins), species=species)
         
-        # Limit results for performance
-        if len(filtered_data) > limit:
-            filtered_data = filtered_data.sample(n=limit)
+        return jsonify({
+            "shape": shape,
+            "size": size,
+            "dataset_version": occurrence_version,
+            "total_count": sum(b['count'] for b in bins),
+            "bins": bins
+        })
         
-        # Convert to list of dictionaries
-        result = []
-        for _, row in filtered_data.iterrows():
-            result.append({
-                'gbifID': row.get('gbifID'),
-                'scientificName': row.get('scientificName'),
-                'species': row.get('species'),
-                'decimalLatitude': float(row['decimalLatitude']) if pd.notna(row['decimalLatitude']) else None,
-                'decimalLongitude': float(row['decimalLongitude']) if pd.notna(row['decimalLongitude']) else None,
-                'year': int(row['year']) if pd.notna(row['year']) else None,
-                'depth': float(row['depth']) if pd.notna(row.get('depth')) else None,
-                'individualCount': int(row['individualCount']) if pd.notna(row.get('individualCount')) else 1,
-                'stateProvince': row.get('stateProvince'),
-                'locality': row.get('locality')
-            })
+    except Exception as e:
+        print(f"Error in get_occurrence_bins: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def compute_occurrence_density(data, species, region, start_year, end_year, lat_range, lon_range,
+                               resolution, bandwidth):
+    """Binned KDE of the matching occurrences over a lat/lon window"""
+    filtered_data = filter_occurrences_in_memory(data, species, None, region)
+    years = pd.to_numeric(filtered_data['year'], errors='coerce')
+    if start_year is not None:
+        filtered_data = filtered_data[years >= start_year]
+        years = years[years >= start_year]
+    if end_year is not None:
+        filtered_data = filtered_data[years <= end_year]
+    
+    lats, lons, values, bandwidth = binned_kde(
+        filtered_data['decimalLatitude'].to_numpy(dtype=float),
+        filtered_data['decimalLongitude'].to_numpy(dtype=float),
+        lat_range, lon_range, resolution, bandwidth
+    )
+    return {
+        'lats': lats,
+        'lons': lons,
+        'values': values,
+        'bandwidth': bandwidth,
+        'occurrences': len(filtered_data)
+    }
+
+@bp.route("/occurrence-density", methods=["GET"])
+def get_occurrence_density():
+    """Observed-density heatmap of occurrences, smoothed with a Gaussian kernel"""
+    try:
+        species = request.args.get('species')
+        region = request.args.get('region')
+        year = request.args.get('year', type=int)
+        start_year = request.args.get('start_year', type=int, default=year)
+        end_year = request.args.get('end_year', type=int, default=year)
+        try:
+            resolution = float(request.args.get('resolution', DEFAULT_DENSITY_RESOLUTION))
+            bandwidth = float(request.args['bandwidth']) if request.args.get('bandwidth') else None
+            lat_range = tuple(float(v) for v in request.args['lat_range'].split(',')) if request.args.get('lat_range') else STUDY_LAT_RANGE
+            lon_range = tuple(float(v) for v in request.args['lon_range'].split(',')) if request.args.get('lon_range') else STUDY_LON_RANGE
+            payload_options = parse_payload_options(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not MIN_DENSITY_RESOLUTION <= resolution <= MAX_DENSITY_RESOLUTION:
+            return jsonify({"error": f"resolution must be between {MIN_DENSITY_RESOLUTION} and {MAX_DENSITY_RESOLUTION} degrees"}), 400
+        if bandwidth is not None and bandwidth <= 0:
+            return jsonify({"error": "bandwidth must be positive"}), 400
+        
+        data = occurrence_data_for_request()
+        if data is None:
+            return loading_response()
+        if len(data) == 0:
+            return jsonify({"error": "No data available"}), 404
         
-        return jsonify(result)
+        try:
+            density = density_cache.get_or_compute(
+                (species, region, start_year, end_year, lat_range, lon_range, resolution, bandwidth, occurrence_version),
+                lambda: compute_occurrence_density(
+                    data, species, region, start_year, end_year, lat_range, lon_range, resolution, bandwidth
+                )
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # Relative density in [0, 1]; peak is the smoothed count at the densest node
+        peak = float(density['values'].max()) if density['values'].size else 0.0
+        relative = density['values'] / peak if peak > 0 else density['values']
+        annotate_profile(occurrence_rows=len(data), filtered_rows=density['occurrences'], species=species)
+        
+        return jsonify({
+            "species": species,
+            "region": region,
+            "start_year": start_year,
+            "end_year": end_year,
+            "resolution": resolution,
+            "bandwidth": round(density['bandwidth'], 6),
+            "occurrences": density['occurrences'],
+            "peak": peak,
+            "shape": list(relative.shape),
+            "encoding": payload_options,
+            "lats": encode_coordinates(density['lats'], payload_options),
+            "lons": encode_coordinates(density['lons'], payload_options),
+            "density": encode_cube(relative, payload_options),
+            "dataset_version": occurrence_version
+        })
         
     except Exception as e:
-        print(f"Error in get_occurrence_data: {e}")
+        print(f"Error in get_occurrence_density: {e}")
         return jsonify({"error": str(e)}), 500
 
+def occurrence_records(df):
+    """Occurrence rows as JSON-ready dicts, converting column-wise instead of per row"""
+    def column(name, numeric=False):
+        values = df[name] if name in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if numeric:
+            values = pd.to_numeric(values, errors='coerce')
+        return values.astype(object).where(values.notna(), None).tolist()
+    
+    years = column('year', numeric=True)
+    counts = column('individualCount', numeric=True)
+    return [
+        {
+            'gbifID': gbif_id,
+            'scientificName': scientific_name,
+            'species': species,
+            'decimalLatitude': lat,
+            'decimalLongitude': lon,
+            'year': int(year) if year is not None else None,
+            'depth': depth,
+            'individualCount': int(count) if count is not None else 1,
+            'stateProvince': state_province,
+            'locality': locality
+        }
+        for gbif_id, scientific_name, species, lat, lon, year, depth, count, state_province, locality in zip(
+            column('gbifID'), column('scientificName'), column('species'),
+            column('decimalLatitude', numeric=True), column('decimalLongitude', numeric=True),
+            years, column('depth', numeric=True), counts, column('stateProvince'), column('locality')
+        )
+    ]
+
+def occurrence_frames(species=None, year=None, region=None, center_lat=None, center_lon=None,
+                      radius_km=None, chunk_size=50000):
+    """Every matching occurrence row in chunks, from the store when available, for exports"""
+    data = load_occurrence_data()
+    if USE_OCCURRENCE_STORE and sync_store():
+        return iter_occurrences(
+            species=species,
+            year=year,
+            region_name=region.replace('-', ' ').title() if region else None,
+            center_lat=center_lat,
+            center_lon=center_lon,
+            radius_km=radius_km,
+            chunk_size=chunk_size
+        )
+    
+    filtered_data = filter_occurrences_in_memory(data, species, year, region, center_lat, center_lon, radius_km)
+    return (filtered_data.iloc[start:start + chunk_size] for start in range(0, len(filtered_data), chunk_size))
+
+def name_match_mask(columns, value):
+    """Rows whose normalized name starts with value, or contains it when no name starts with it
+
+    The same rule as the occurrence store, applied to the distinct names only.
+    """
+    key = name_key([value])[0]
+    names = pd.unique(pd.concat([column.dropna().astype(object) for column in columns], ignore_index=True))
+    keys = name_key(names)
+    matched = keys.str.startswith(key)
+    if not matched.any():
+        matched = keys.str.contains(key, regex=False)
+    wanted = names[matched.to_numpy(dtype=bool)]
+    mask = np.zeros(len(columns[0]), dtype=bool)
+    for column in columns:
+        mask |= column.isin(wanted).to_numpy()
+    return mask
+
+def filter_occurrences_in_memory(data, species=None, year=None, region=None,
+                                 center_lat=None, center_lon=None, radius_km=None):
+    """Fallback filtering on the loaded frame when the SQLite store is unavailable"""
+    filtered_data = data
+    
+    if species:
+        # Handle both species ID format (with underscores) and scientific names
+        filtered_data = filtered_data[
+            name_match_mask([filtered_data['species'], filtered_data['scientificName']], species)
+        ]
+    
+    if year:
+        filtered_data = filtered_data[filtered_data['year'] == year]
+        
+    if region:
+        filtered_data = filtered_data[name_match_mask([filtered_data['stateProvince']], region.replace('-', ' '))]
+    
+    if center_lat is not None and center_lon is not None and radius_km is not None:
+        filtered_data = filtered_data[radius_mask(
+            filtered_data['decimalLatitude'], filtered_data['decimalLongitude'],
+            center_lat, center_lon, radius_km
+        )]
+    return filtered_data
+
 @bp.route("/regions", methods=["GET"])
 def get_regions():
     """Get all available regions from the dataset"""
     try:
-        load_occurrence_data()
+        if occurrence_data_for_request() is None:
+            return loading_response()
         
         if regions_data is None:
             return jsonify([])
@@ -323,7 +729,8 @@ def get_regions():
 def get_species():
     """Get all available species from the dataset"""
     try:
-        load_occurrence_data()
+        if occurrence_data_for_request() is None:
+            return loading_response()
         
         if species_data is None:
             return jsonify([])
@@ -338,7 +745,9 @@ def get_species():
 def get_year_range():
     """Get the year range available in the dataset"""
     try:
-        data = load_occurrence_data()
+        data = occurrence_data_for_request()
+        if data is None:
+            return loading_response()
         
         if len(data) == 0:
             return jsonify({"min_year": 1990, "max_year": 2024})
@@ -355,6 +764,78 @@ def get_year_range():
         print(f"Error in get_year_range: {e}")
         return jsonify({"error": str(e)}), 500
 
+def compute_environmental_summary(region, species, data):
+    """Summarize environmental conditions for a region and species"""
+    # Get habitat preferences for the species
+    species_habitat = HABITAT_PREFS.get(species, {})
+    
+    if len(data) == 0:
+        # Return species-specific mock data if no real data available
+        temp_range = species_habitat.get('temp_range', (26, 30))
+        depth_range = species_habitat.get('depth_range', (0, 50))
+        salinity_range = species_habitat.get('salinity_range', (30, 35))
+        
+        return {
+            "temperature": (temp_range[0] + temp_range[1]) / 2,
+            "salinity": (salinity_range[0] + salinity_range[1]) / 2,
+            "chlorophyll": 0.21,
+            "depth": (depth_range[0] + depth_range[1]) / 2,
+            "region": region,
+            "occurrenceCount": 0,
+            "habitatType": species_habitat.get('habitat_type', 'unknown')
+        }
+    
+    # Filter data for the specific region and species
+    region_name = region.replace('-', ' ').title()
+    species_name = species.replace('_', ' ')
+    
+    filtered_data = data[
+        (data['stateProvince'].str.contains(region_name, na=False, case=False)) &
+        ((data['species'].str.contains(species_name, na=False, case=False)) |
+         (data['scientificName'].str.contains(species_name, na=False, case=False)))
+    ]
+    
+    # Calculate environmental statistics
+    avg_depth = filtered_data['depth'].mean() if 'depth' in filtered_data.columns else None
+    
+    # Use species-specific environmental data
+    if species_habitat:
+        temp_range = species_habitat['temp_range']
+        salinity_range = species_habitat['salinity_range']
+        depth_range = species_habitat['depth_range']
+        
+        base_temp = (temp_range[0] + temp_range[1]) / 2
+        base_salinity = (salinity_range[0] + salinity_range[1]) / 2
+        base_depth = avg_depth if pd.notna(avg_depth) else (depth_range[0] + depth_range[1]) / 2
+    else:
+        base_temp = 28.5
+        base_salinity = 34.1
+        base_depth = avg_depth if pd.notna(avg_depth) else 12
+    
+    base_chlorophyll = 0.21
+    
+    # Add regional variation
+    if 'papua' in region.lower():
+        base_temp += 0.5
+        base_salinity += 0.3
+    elif 'java' in region.lower():
+        base_temp -= 0.3
+        base_chlorophyll += 0.05
+    
+    # Noise is seeded from the request key and dataset version, so the
+    # summary is a pure function of them and can be cached
+    rng = make_rng('environmental', region, species, occurrence_version)
+    
+    return {
+        "temperature": round(base_temp + rng.normal(0, 0.3), 1),
+        "salinity": round(base_salinity + rng.normal(0, 0.2), 1),
+        "chlorophyll": round(base_chlorophyll + rng.normal(0, 0.03), 2),
+        "depth": int(base_depth) if pd.notna(base_depth) else 12,
+        "region": region_name,
+        "occurrenceCount": len(filtered_data),
+        "habitatType": species_habitat.get('habitat_type', 'unknown')
+    }
+
 @bp.route("/environmental", methods=["GET"])
 def get_environmental_data():
     """Get environmental data for a specific region and species"""
@@ -362,74 +843,20 @@ def get_environmental_data():
         region = request.args.get('region', 'teluk-tomini')
         species = request.args.get('species', 'chanos_chanos')
         
-        data = load_occurrence_data()
-        
-        # Get habitat preferences for the species
-        habitat_prefs = get_species_habitat_preferences()
-        species_habitat = habitat_prefs.get(species, {})
-        
-        if len(data) == 0:
-            # Return species-specific mock data if no real data available
-            temp_range = species_habitat.get('temp_range', (26, 30))
-            depth_range = species_habitat.get('depth_range', (0, 50))
-            salinity_range = species_habitat.get('salinity_range', (30, 35))
-            
-            return jsonify({
-                "temperature": (temp_range[0] + temp_range[1]) / 2,
-                "salinity": (salinity_range[0] + salinity_range[1]) / 2,
-                "chlorophyll": 0.21,
-                "depth": (depth_range[0] + depth_range[1]) / 2,
-                "region": region,
-                "occurrenceCount": 0,
-                "habitatType": species_habitat.get('habitat_type', 'unknown')
-            })
-        
-        # Filter data for the specific region and species
-        region_name = region.replace('-', ' ').title()
-        species_name = species.replace('_', ' ')
-        
-        filtered_data = data[
-            (data['stateProvince'].str.contains(region_name, na=False, case=False)) &
-            ((data['species'].str.contains(species_name, na=False, case=False)) |
-             (data['scientificName'].str.contains(species_name, na=False, case=False)))
-        ]
-        
-        # Calculate environmental statistics
-        avg_depth = filtered_data['depth'].mean() if 'depth' in filtered_data.columns else None
+        data = occurrence_data_for_request()
+        if data is None:
+            return loading_response()
         
-        # Use species-specific environmental data
-        if species_habitat:
-            temp_range = species_habitat['temp_range']
-            salinity_range = species_habitat['salinity_range']
-            depth_range = species_habitat['depth_range']
-            
-            base_temp = (temp_range[0] + temp_range[1]) / 2
-            base_salinity = (salinity_range[0] + salinity_range[1]) / 2
-            base_depth = avg_depth if pd.notna(avg_depth) else (depth_range[0] + depth_range[1]) / 2
-        else:
-            base_temp = 28.5
-            base_salinity = 34.1
-            base_depth = avg_depth if pd.notna(avg_depth) else 12
-        
-        base_chlorophyll = 0.21
-        
-        # Add regional variation
-        if 'papua' in region.lower():
-            base_temp += 0.5
-            base_salinity += 0.3
-        elif 'java' in region.lower():
-            base_temp -= 0.3
-            base_chlorophyll += 0.05
+        summary = environmental_cache.get_or_compute(
+            (region, species, occurrence_version),
+            lambda: compute_environmental_summary(region, species, data)
+        )
         
-        return jsonify({
-            "temperature": round(base_temp + np.random.normal(0, 0.3), 1),
-            "salinity": round(base_salinity + np.random.normal(0, 0.2), 1),
-            "chlorophyll": round(base_chlorophyll + np.random.normal(0, 0.03), 2),
-            "depth": int(base_depth) if pd.notna(base_depth) else 12,
-            "region": region_name,
-            "occurrenceCount": len(filtered_data),
-            "habitatType": species_habitat.get('habitat_type', 'unknown')
-        })
+        response = jsonify(summary)
+        response.set_etag(f"{occurrence_version}-{derive_seed(region, species):x}")
+        response.cache_control.public = True
+        response.cache_control.max_age = ENVIRONMENTAL_CACHE_TTL
+        return response.make_conditional(request)
         
     except Exception as e:
         print(f"Error in get_environmental_data: {e}")
@@ -439,7 +866,9 @@ def get_environmental_data():
 def get_stats():
     """Get general statistics about the dataset"""
     try:
-        data = load_occurrence_data()
+        data = occurrence_data_for_request()
+        if data is None:
+            return loading_response()
         
         if len(data) == 0:
             return jsonify({"error": "No data available"}), 404
@@ -467,6 +896,22 @@ def get_stats():
         print(f"Error in get_stats: {e}")
         return jsonify({"error": str(e)}), 500
 
+@bp.route("/reload", methods=["POST"])
+def reload_data():
+    """Reload the occurrence dataset and invalidate derived caches"""
+    try:
+        data = reload_occurrence_data()
+        
+        return jsonify({
+            "status": "success",
+            "total_records": len(data),
+            "dataset_version": occurrence_version
+        })
+        
+    except Exception as e:
+        print(f"Error in reload_data: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @bp.route("/", methods=["GET"])
 def index():
     return jsonify({
@@ -479,7 +924,8 @@ def index():
             "/api/species-details/<species_id>",
             "/api/year-range",
             "/api/environmental",
-            "/api/stats"
+            "/api/stats",
+            "/api/reload"
         ],
         "data_loaded": occurrence_data is not None,
         "total_records": len(occurrence_data) if occurrence_data is not None else 0,
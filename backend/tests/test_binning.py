@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from utils.binning import bin_centers, hex_index, occurrence_bin_counts, square_index, summarize_bins
+
+
+def test_hex_index_maps_each_centre_to_its_own_bin():
+    q, r = np.meshgrid(np.arange(-5, 6), np.arange(-5, 6))
+    q, r = q.ravel(), r.ravel()
+    lats, lons = bin_centers(q, r, 'hex', 0.5)
+
+    index_q, index_r = hex_index(lats, lons, 0.5)
+
+    np.testing.assert_array_equal(index_q, q)
+    np.testing.assert_array_equal(index_r, r)
+
+
+def test_hex_index_picks_the_nearest_centre():
+    rng = np.random.default_rng(1)
+    size = 0.3
+    lats = rng.uniform(-3, 3, 2000)
+    lons = rng.uniform(100, 106, 2000)
+
+    q, r = hex_index(lats, lons, size)
+    lat_c, lon_c = bin_centers(q, r, 'hex', size)
+    distance = np.hypot(lats - lat_c, lons - lon_c)
+
+    # Points lie inside their hexagon: no further than the circumradius from
+    # its centre, and no neighbouring centre is closer
+    assert np.all(distance <= size / np.sqrt(3) + 1e-9)
+    for dq, dr in ((1, 0), (-1, 0), (0, 1), (0, -1), (1, -1), (-1, 1)):
+        n_lat, n_lon = bin_centers(q + dq, r + dr, 'hex', size)
+        assert np.all(np.hypot(lats - n_lat, lons - n_lon) >= distance - 1e-9)
+
+
+def test_square_index_floors_to_the_cell():
+    i, j = square_index(np.array([-0.01, 0.0, 0.49, 0.5]), np.array([100.2, 100.0, 100.49, 100.51]), 0.5)
+
+    np.testing.assert_array_equal(i, [-1, 0, 0, 1])
+    np.testing.assert_array_equal(j, [200, 200, 200, 201])
+
+
+def test_bin_totals_keep_every_record():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        'decimalLatitude': rng.uniform(-10, 5, 500),
+        'decimalLongitude': rng.uniform(96, 140, 500),
+        'species': rng.choice(['Thunnus albacares', 'Chanos chanos'], 500),
+        'scientificName': 'x',
+        'year': rng.choice([2001, 2002, np.nan], 500),
+    })
+
+    for shape in ('square', 'hex'):
+        counts, taxa = occurrence_bin_counts(df, shape, 1.0)
+        bins = summarize_bins(counts, taxa, shape, 1.0, breakdown=('species',))
+
+        assert sum(bin_['count'] for bin_ in bins) == len(df)
+        assert all(sum(bin_['species'].values()) == bin_['count'] for bin_ in bins)
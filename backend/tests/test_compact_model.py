@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from utils.compact_model import export_model
+
+
+def _training_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 4))
+    y = (X[:, 0] + 0.5 * X[:, 1] - X[:, 2] + rng.normal(scale=0.5, size=600) > 0).astype(int)
+    return X, y
+
+
+def _inputs_with_nan():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(400, 4))
+    X[::3, 0] = np.nan
+    X[1::5, 2] = np.nan
+    return X
+
+
+def _models():
+    from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+    X, y = _training_data()
+    forest = RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+    boosting = HistGradientBoostingClassifier(max_iter=30, random_state=0).fit(X, y)
+    return [forest, boosting]
+
+
+@pytest.mark.parametrize('index', [0, 1], ids=['random_forest', 'gradient_boosting'])
+def test_compact_model_matches_sklearn(index):
+    model = _models()[index]
+    compact = export_model(model, ['a', 'b', 'c', 'd'])
+    X = np.random.default_rng(2).normal(size=(300, 4))
+
+    np.testing.assert_allclose(compact.predict_proba(X), model.predict_proba(X), atol=1e-9)
+
+
+@pytest.mark.parametrize('index', [0, 1], ids=['random_forest', 'gradient_boosting'])
+def test_compact_model_matches_sklearn_with_missing_values(index):
+    model = _models()[index]
+    compact = export_model(model, ['a', 'b', 'c', 'd'])
+    X = _inputs_with_nan()
+
+    np.testing.assert_allclose(compact.predict_proba(X), model.predict_proba(X), atol=1e-9)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from utils.density import binned_kde, linear_binning
+
+
+def test_linear_binning_conserves_points_inside_the_grid():
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(0, 4, 1000)
+    lons = rng.uniform(0, 6, 1000)
+
+    grid = linear_binning(lats, lons, 0.0, 0.0, 0.5, (9, 13))
+
+    assert np.isclose(grid.sum(), 1000)
+    assert grid.min() >= 0
+
+
+def test_binned_kde_conserves_mass_over_a_covering_window():
+    rng = np.random.default_rng(1)
+    lats = rng.normal(-4, 0.5, 5000)
+    lons = rng.normal(118, 0.8, 5000)
+
+    _, _, values, bandwidth = binned_kde(lats, lons, (-11, 6), (95, 141), resolution=0.1)
+
+    assert bandwidth > 0
+    assert np.isclose(values.sum(), 5000, rtol=1e-6)
+
+
+def test_binned_kde_matches_a_direct_gaussian_sum():
+    lats = np.array([-2.0, -2.3, -1.6])
+    lons = np.array([120.0, 120.4, 119.9])
+    bandwidth = 0.3
+    resolution = 0.05
+
+    grid_lats, grid_lons, values, _ = binned_kde(lats, lons, (-3, -1), (119, 121), resolution, bandwidth)
+
+    # Counts per node: a point spread over one node cell of a Gaussian density
+    i, j = np.searchsorted(grid_lats, -2.0), np.searchsorted(grid_lons, 120.0)
+    d2 = (grid_lats[i] - lats) ** 2 + (grid_lons[j] - lons) ** 2
+    expected = np.sum(np.exp(-0.5 * d2 / bandwidth ** 2)) / (2 * np.pi * bandwidth ** 2) * resolution ** 2
+    assert np.isclose(values[i, j], expected, rtol=0.02)
@@ -0,0 +1,46 @@
+import io
+
+import numpy as np
+import pytest
+
+from utils.export import geotiff_chunks
+
+
+def _read_geotiff(values, lat_min, lon_min, resolution):
+    tifffile = pytest.importorskip('tifffile')
+    data = b''.join(geotiff_chunks(values, lat_min, lon_min, resolution))
+    with tifffile.TiffFile(io.BytesIO(data)) as tif:
+        page = tif.pages[0]
+        return page.asarray(), {tag.code: tag.value for tag in page.tags}
+
+
+def test_geotiff_round_trip_is_north_up_with_nan_nodata():
+    rng = np.random.default_rng(0)
+    values = rng.random((7, 11)).astype(np.float32)
+    values[2, 3] = np.nan
+
+    image, tags = _read_geotiff(values, -8.0, 110.0, 0.25)
+
+    assert image.dtype == np.float32
+    np.testing.assert_array_equal(image, values[::-1])
+    assert tags[42113] == 'nan'
+
+
+def test_geotiff_georeferencing_puts_cell_centres_on_grid_points():
+    values = np.zeros((4, 5), dtype=np.float32)
+
+    _, tags = _read_geotiff(values, -8.0, 110.0, 0.5)
+
+    assert tags[33550][:2] == (0.5, 0.5)
+    # Tie point: the top-left corner of the top-left cell
+    assert tags[33922][3:5] == (109.75, -8.0 + 3 * 0.5 + 0.25)
+
+
+def test_geotiff_round_trip_across_several_strips():
+    # Wide enough that each strip holds fewer rows than the image
+    values = np.arange(600 * 500, dtype=np.float32).reshape(600, 500)
+
+    image, tags = _read_geotiff(values, 0.0, 100.0, 0.1)
+
+    assert len(tags[273]) > 1
+    np.testing.assert_array_equal(image, values[::-1])
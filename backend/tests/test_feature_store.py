@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import feature_store
+from utils.feature_store import load_features, save_features
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    shore = tmp_path / 'distance_to_shore.npy'
+    np.save(shore, np.zeros((2, 2), dtype=np.float32))
+    monkeypatch.setattr(feature_store, 'FEATURE_DIR', str(tmp_path / 'features'))
+    monkeypatch.setattr(feature_store, 'SHORE_DISTANCE_PATH', str(shore))
+    return tmp_path
+
+
+def _frames(n=20):
+    rng = np.random.default_rng(0)
+    full = pd.DataFrame({
+        'decimalLatitude': rng.uniform(-8, 2, n),
+        'decimalLongitude': rng.uniform(110, 135, n),
+        'temperature': rng.normal(28, 1, n),
+        'label': np.repeat([1, 0], n // 2),
+    })
+    return full[full['label'] == 1].reset_index(drop=True), full
+
+
+def test_round_trip_per_species_and_dataset_version(store_dir):
+    presence, full = _frames()
+    save_features('Thunnus_albacares', 'v1', presence, full)
+
+    stored_presence, stored_full = load_features('Thunnus_albacares', 'v1')
+
+    pd.testing.assert_frame_equal(stored_presence, presence)
+    pd.testing.assert_frame_equal(stored_full, full)
+    assert load_features('Thunnus_albacares', 'v2') is None
+    assert load_features('Katsuwonus_pelamis', 'v1') is None
+
+
+def test_new_version_replaces_the_old_one(store_dir):
+    presence, full = _frames()
+    save_features('Thunnus_albacares', 'v1', presence, full)
+    save_features('Thunnus_albacares', 'v2', presence, full)
+    save_features('Katsuwonus_pelamis', 'v1', presence, full)
+
+    assert load_features('Thunnus_albacares', 'v1') is None
+    assert load_features('Thunnus_albacares', 'v2') is not None
+    assert load_features('Katsuwonus_pelamis', 'v1') is not None
+    assert len(os.listdir(feature_store.FEATURE_DIR)) == 2
+
+
+def test_changed_inputs_invalidate_stored_features(store_dir):
+    presence, full = _frames()
+    save_features('Thunnus_albacares', 'v1', presence, full)
+
+    np.save(store_dir / 'distance_to_shore.npy', np.ones((3, 3), dtype=np.float32))
+
+    assert load_features('Thunnus_albacares', 'v1') is None
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from utils.hotspots import extract_hotspots, grid_from_points, grid_spacing
+
+
+def _grid(shape=(20, 30)):
+    lats = np.linspace(-8, -8 + 0.1 * (shape[0] - 1), shape[0])
+    lons = np.linspace(110, 110 + 0.1 * (shape[1] - 1), shape[1])
+    return lats, lons, np.zeros(shape)
+
+
+def test_larger_region_outranks_a_single_stronger_cell():
+    lats, lons, values = _grid()
+    values[2:6, 2:8] = 0.8
+    values[15, 25] = 0.99
+
+    hotspots = extract_hotspots(lats, lons, values, threshold=0.7)
+
+    assert [h['cells'] for h in hotspots] == [24, 1]
+    assert [h['rank'] for h in hotspots] == [1, 2]
+    assert hotspots[1]['peak'] == {'lat': round(lats[15], 6), 'lon': round(lons[25], 6), 'probability': 0.99}
+    assert hotspots[0]['bounds'] == {
+        'lat_min': round(lats[2], 6), 'lat_max': round(lats[5], 6),
+        'lon_min': round(lons[2], 6), 'lon_max': round(lons[7], 6)
+    }
+    assert hotspots[0]['mean_probability'] == 0.8
+
+
+def test_cells_touching_at_a_corner_form_one_hotspot():
+    lats, lons, values = _grid()
+    values[4, 4] = values[5, 5] = values[6, 6] = 0.9
+
+    hotspots = extract_hotspots(lats, lons, values, threshold=0.7)
+
+    assert len(hotspots) == 1
+    assert hotspots[0]['cells'] == 3
+
+
+def test_nan_cells_and_small_regions_are_left_out():
+    lats, lons, values = _grid()
+    values[:] = np.nan
+    values[10, 10] = 0.9
+    values[2:4, 2:4] = 0.9
+
+    assert [h['cells'] for h in extract_hotspots(lats, lons, values, min_cells=2)] == [4]
+    assert extract_hotspots(lats, lons, np.full(values.shape, np.nan)) == []
+
+
+def test_grid_from_points_fills_missing_nodes_with_nan():
+    lats, lons = np.meshgrid([-1.0, 0.0, 1.0], [110.0, 110.5], indexing='ij')
+    values = np.arange(6, dtype=float)
+
+    grid_lats, grid_lons, grid = grid_from_points(lats.ravel()[:-1], lons.ravel()[:-1], values[:-1])
+
+    np.testing.assert_array_equal(grid_lats, [-1.0, 0.0, 1.0])
+    np.testing.assert_array_equal(grid_lons, [110.0, 110.5])
+    np.testing.assert_array_equal(grid[:2], [[0, 1], [2, 3]])
+    assert grid[2, 0] == 4 and np.isnan(grid[2, 1])
+
+
+def test_single_row_grids_borrow_the_other_spacing():
+    assert grid_spacing(np.array([0.0]), np.array([110.0, 110.25, 110.5])) == (0.25, 0.25)
+    with pytest.raises(ValueError):
+        grid_spacing(np.array([0.0]), np.array([110.0]))
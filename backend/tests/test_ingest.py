@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import routes
+from utils import preprocessing, shoreline
+from utils.ingest import detect_drift, records_to_frame
+
+SPECIES = 'Thunnus_albacares'
+
+
+def _records(n, first_id, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'gbifID': np.arange(first_id, first_id + n),
+        'species': 'Thunnus albacares',
+        'scientificName': 'Thunnus albacares (Bonnaterre, 1788)',
+        'family': 'Scombridae',
+        'countryCode': 'ID',
+        'stateProvince': 'Maluku',
+        'locality': 'test',
+        'decimalLatitude': rng.uniform(-8, 2, n).round(5),
+        'decimalLongitude': rng.uniform(110, 135, n).round(5),
+        'year': rng.integers(2000, 2024, n),
+        'depth': rng.uniform(0, 200, n).round(1),
+        'individualCount': 1,
+    })
+
+
+@pytest.fixture
+def occurrence_source(tmp_path, monkeypatch):
+    """A small local export, with the ingest log under tmp_path"""
+    export = tmp_path / 'occurrence.tsv'
+    _records(40, 1, seed=0).to_csv(export, sep='\t', index=False)
+    monkeypatch.setenv('FISHY_OCCURRENCE_PATH', str(export))
+    monkeypatch.setattr(preprocessing, 'INGESTED_PATH', str(tmp_path / 'ingested.tsv'))
+    # Shore distances from the coastline points, without writing the raster into backend/data
+    lat_grid, lon_grid = np.meshgrid(*shoreline.grid_coordinates(), indexing='ij')
+    monkeypatch.setattr(shoreline, '_grid', shoreline.distance_to_coastline_points(lat_grid, lon_grid))
+    monkeypatch.setattr(routes, 'occurrence_data', None)
+    monkeypatch.setattr(routes, 'species_data', None)
+    monkeypatch.setattr(routes, 'regions_data', None)
+    monkeypatch.setattr(routes, 'occurrence_version', None)
+    preprocessing.read_occurrence_csv(reload=True)
+    yield
+    preprocessing._source_cache.clear()
+
+
+def _presence_count():
+    presence_df, _, _, _, _ = preprocessing.load_and_prepare_data(SPECIES, use_feature_store=False)
+    return len(presence_df)
+
+
+def test_ingested_records_survive_retrain_and_restart(occurrence_source):
+    before = _presence_count()
+    version = preprocessing.occurrence_source_version()
+
+    assert routes.append_occurrence_records(_records(10, 1000, seed=1)) == 10
+
+    # A retrain reads the memoized export, which now includes the new rows
+    assert _presence_count() == before + 10
+    assert preprocessing.occurrence_source_version() != version
+
+    # A restart reads the export again and merges the ingest log
+    preprocessing._source_cache.clear()
+    assert _presence_count() == before + 10
+
+
+def test_records_already_ingested_are_not_appended_twice(occurrence_source):
+    assert routes.append_occurrence_records(_records(10, 1000, seed=1)) == 10
+    assert routes.append_occurrence_records(_records(10, 1000, seed=1)) == 0
+
+    preprocessing._source_cache.clear()
+    assert len(preprocessing.read_occurrence_csv()) == 50
+
+
+def test_records_to_frame_coerces_json_strings():
+    df = records_to_frame([{
+        'decimalLatitude': '-6.2', 'decimalLongitude': 'x', 'species': 'Thunnus albacares',
+        'scientificName': 'Thunnus albacares', 'year': '2020'
+    }])
+
+    assert df['decimalLatitude'].iloc[0] == -6.2
+    assert np.isnan(df['decimalLongitude'].iloc[0])
+    assert df['year'].iloc[0] == 2020
+
+    with pytest.raises(ValueError, match='year'):
+        records_to_frame([{'decimalLatitude': 1, 'decimalLongitude': 2, 'species': 's', 'scientificName': 's'}])
+
+
+def test_drift_ignores_noise_and_flags_a_shifted_batch():
+    rng = np.random.default_rng(0)
+    reference = pd.DataFrame({'temperature': rng.normal(28, 1, 2000), 'depth': rng.normal(50, 10, 2000)})
+    same = pd.DataFrame({'temperature': rng.normal(28, 1, 20), 'depth': rng.normal(50, 10, 20)})
+    shifted = pd.DataFrame({'temperature': rng.normal(31, 1, 200), 'depth': rng.normal(50, 10, 200)})
+
+    noise_score, _ = detect_drift(reference, same, ['temperature', 'depth'])
+    shift_score, drift = detect_drift(reference, shifted, ['temperature', 'depth'])
+
+    assert noise_score == 0
+    assert shift_score > 2
+    assert drift['temperature'] == round(shift_score, 4)
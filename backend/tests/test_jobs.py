@@ -0,0 +1,37 @@
+import threading
+
+from utils.jobs import JobQueue
+
+
+def test_active_key_shares_its_job_and_reports_its_params():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+
+    def train(backend=None):
+        release.wait()
+        return backend
+
+    job, created = queue.submit('Thunnus_albacares', 'train', train, backend='hist_gradient_boosting')
+    again, created_again = queue.submit('Thunnus_albacares', 'train', train, backend='random_forest')
+
+    assert created and not created_again
+    assert again['id'] == job['id']
+    assert again['params'] == {'backend': 'hist_gradient_boosting'}
+
+    release.set()
+    assert queue.wait(job['id'])['status'] == 'succeeded'
+    _, created_after = queue.submit('Thunnus_albacares', 'train', train, backend='random_forest')
+    assert created_after
+
+
+def test_failed_job_records_the_error():
+    def fail():
+        raise RuntimeError('no data')
+
+    queue = JobQueue(max_workers=1)
+    job, _ = queue.submit('general', 'train', fail)
+
+    finished = queue.wait(job['id'])
+    assert finished['status'] == 'failed'
+    assert finished['error'] == 'no data'
+    assert finished['finished_at'] is not None
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from database import db, init_database
+from routes import filter_occurrences_in_memory
+from utils.occurrence_store import _occurrence_filter, iter_occurrences, query_occurrences, sync_occurrence_store
+
+SPECIES = [
+    ('Thunnus albacares', 'Thunnus albacares (Bonnaterre, 1788)', 'Maluku', 30),
+    ('Katsuwonus pelamis', 'Katsuwonus pelamis (Linnaeus, 1758)', 'Jawa Barat', 20),
+    ('Euthynnus affinis', 'Euthynnus affinis (Cantor, 1849)', 'Jawa Timur', 10),
+]
+
+
+def _frame():
+    rng = np.random.default_rng(0)
+    rows = []
+    for species, scientific_name, province, n in SPECIES:
+        for _ in range(n):
+            rows.append({
+                'gbifID': len(rows) + 1,
+                'species': species,
+                'scientificName': scientific_name,
+                'stateProvince': province,
+                'decimalLatitude': rng.uniform(-8, 2),
+                'decimalLongitude': rng.uniform(110, 135),
+                'year': int(rng.integers(2015, 2020)),
+            })
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def store(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'occurrences.sqlite'}"
+    init_database(app)
+    with app.app_context():
+        df = _frame()
+        sync_occurrence_store(df, 'v1')
+        yield df
+
+
+@pytest.mark.parametrize('species, expected', [
+    ('Thunnus_albacares', 30),
+    ('thunnus', 30),
+    ('Katsuwonus pelamis (Linnaeus', 20),
+    # No name starts with these, so they fall back to substrings
+    ('albacares', 30),
+    ('nnus', 40),
+    ('Sardinella', 0),
+])
+def test_species_filter_matches_the_in_memory_path(store, species, expected):
+    df, matched = query_occurrences(species=species, limit=1000)
+
+    assert matched == len(df) == expected
+    assert len(filter_occurrences_in_memory(store, species=species)) == expected
+
+
+def test_region_filter_accepts_region_ids(store):
+    _, matched = query_occurrences(region_name='Jawa', limit=1000)
+
+    assert matched == 30
+    assert len(filter_occurrences_in_memory(store, region='jawa-barat')) == 20
+    assert query_occurrences(region_name='Jawa Barat', limit=1000)[1] == 20
+
+
+def test_prefix_filters_use_the_name_indexes(store):
+    sql, params, _ = _occurrence_filter(species='Thunnus albacares', region_name='Maluku')
+    with db.engine.connect() as conn:
+        plan = ' '.join(str(row[-1]) for row in conn.execute(text(f"EXPLAIN QUERY PLAN SELECT o.id {sql}"), params))
+
+    assert 'ix_occurrences_' in plan
+    assert 'SCAN o' not in plan
+
+
+def test_samples_distinct_rows_over_the_limit(store):
+    df, matched = query_occurrences(species='Thunnus', year=None, limit=7)
+    assert matched == 30
+    assert len(df) == 7
+    assert df['gbifID'].is_unique
+    assert (df['species'] == 'Thunnus albacares').all()
+
+    df, matched = query_occurrences(limit=25)
+    assert matched == 60
+    assert len(df) == 25
+    assert df['gbifID'].is_unique
+
+
+def test_export_pages_cover_every_match(store):
+    pages = list(iter_occurrences(species='Katsuwonus', chunk_size=7))
+
+    assert [len(page) for page in pages] == [7, 7, 6]
+    assert sorted(pd.concat(pages)['gbifID']) == list(range(31, 51))
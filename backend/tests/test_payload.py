@@ -0,0 +1,91 @@
+import gzip
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask, Response, jsonify
+
+from utils.compression import init_response_compression
+from utils.payload import encode_cube, encode_points, parse_payload_options
+
+
+def _points():
+    return pd.DataFrame({
+        'decimalLatitude': [-6.123456789, -6.2],
+        'decimalLongitude': [106.987654321, 107.0],
+        'prediction': [0.5, np.nan],
+        'species': ['Thunnus_albacares', 'Thunnus_albacares'],
+    })
+
+
+def test_options_are_none_without_payload_arguments():
+    assert parse_payload_options({}) is None
+    assert parse_payload_options({'precision': ''}) is None
+
+
+@pytest.mark.parametrize('args', [{'precision': '9'}, {'precision': 'x'}, {'probability': 'int16'}, {'layout': 'rows'}])
+def test_invalid_options_are_rejected(args):
+    with pytest.raises(ValueError):
+        parse_payload_options(args)
+
+
+def test_records_move_constants_to_the_header():
+    options = parse_payload_options({'precision': '3', 'probability': 'uint8'})
+
+    header, rows = encode_points(_points(), options)
+
+    assert header['constants'] == {'species': 'Thunnus_albacares'}
+    assert header['probability_scale'] == 255
+    assert rows == [
+        {'decimalLatitude': -6.123, 'decimalLongitude': 106.988, 'prediction': 128},
+        {'decimalLatitude': -6.2, 'decimalLongitude': 107.0, 'prediction': None},
+    ]
+
+
+def test_column_layout_keeps_float_probabilities():
+    header, columns = encode_points(_points(), parse_payload_options({'layout': 'columns'}))
+
+    assert header['columns'] == ['decimalLatitude', 'decimalLongitude', 'prediction']
+    assert columns['prediction'] == [0.5, None]
+    assert columns['decimalLatitude'] == [-6.123456789, -6.2]
+
+
+def test_uint8_cube_keeps_nan_as_none():
+    cube = np.array([[0.0, 1.0], [np.nan, 0.25]])
+
+    assert encode_cube(cube, parse_payload_options({'probability': 'uint8'})) == [[0, 255], [None, 64]]
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_response_compression(app)
+
+    @app.route('/big')
+    def big():
+        return jsonify({'values': list(range(2000))})
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return Response((json.dumps({'n': i}) for i in range(2000)), mimetype='application/json')
+
+    return app.test_client()
+
+
+def test_large_json_is_gzipped_for_clients_that_accept_it(client):
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data)) == {'values': list(range(2000))}
+
+
+def test_small_streamed_and_unaccepted_responses_are_left_alone(client):
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/stream', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/big').headers
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from utils.seeding import dataset_fingerprint, derive_seed, make_rng
+
+
+def _frame(n=50):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'decimalLatitude': rng.uniform(-8, 2, n),
+        'decimalLongitude': rng.uniform(110, 135, n),
+        'species': 'Thunnus albacares',
+        'scientificName': 'Thunnus albacares (Bonnaterre, 1788)',
+        'year': rng.integers(2000, 2024, n),
+        'locality': 'synthetic',
+    })
+
+
+def test_seed_is_stable_across_numpy_and_python_scalars():
+    assert derive_seed('Thunnus_albacares', 'abc', (np.int64(3), np.float64(0.5))) == \
+        derive_seed('Thunnus_albacares', 'abc', (3, 0.5))
+    assert derive_seed('Thunnus_albacares', 'abc') != derive_seed('Thunnus_albacares', 'abd')
+    assert derive_seed(None) == derive_seed('')
+
+
+def test_generators_with_the_same_key_draw_the_same_values():
+    np.testing.assert_array_equal(make_rng('absences', 'v1').random(5), make_rng('absences', 'v1').random(5))
+    assert not np.array_equal(make_rng('absences', 'v1').random(5), make_rng('absences', 'v2').random(5))
+
+
+def test_fingerprint_tracks_the_modelling_columns_only():
+    df = _frame()
+    version = dataset_fingerprint(df)
+
+    assert dataset_fingerprint(df.copy()) == version
+    assert dataset_fingerprint(df.assign(locality='elsewhere')) == version
+    assert dataset_fingerprint(df.iloc[:-1]) != version
+    assert dataset_fingerprint(df.assign(year=df['year'] + 1)) != version
+    assert dataset_fingerprint(df.iloc[:0]) == 'empty'
+    assert dataset_fingerprint(None) == 'empty'
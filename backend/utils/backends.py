@@ -0,0 +1,80 @@
+import os
+import pickle
+import time
+
+import numpy as np
+
+DEFAULT_BACKEND = os.environ.get('FISHY_MODEL_BACKEND', 'random_forest')
+
+# scikit-learn is imported by the builders so that importing this module (and
+# the app) stays cheap until a model is actually fitted
+def _random_forest():
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(
+        n_estimators=150,
+        random_state=42,
+        max_depth=12,
+        min_samples_split=3,
+        min_samples_leaf=1,
+        max_features='sqrt',
+        n_jobs=-1
+    )
+
+def _hist_gradient_boosting():
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    return HistGradientBoostingClassifier(
+        max_iter=200,
+        learning_rate=0.1,
+        max_leaf_nodes=31,
+        early_stopping=False,
+        random_state=42
+    )
+
+MODEL_BACKENDS = {
+    'random_forest': _random_forest,
+    'hist_gradient_boosting': _hist_gradient_boosting,
+}
+
+def _parse_species_backends(value):
+    """Parse FISHY_SPECIES_BACKENDS, e.g. "Thunnus_albacares=hist_gradient_boosting,Chanos_chanos=random_forest\""""
+    mapping = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            species, backend = item.split('=', 1)
+            mapping[species.strip()] = backend.strip()
+    return mapping
+
+SPECIES_BACKENDS = _parse_species_backends(os.environ.get('FISHY_SPECIES_BACKENDS'))
+
+def resolve_backend(selected_species=None, requested=None):
+    """Backend for a species: explicit request, then per-species config, then the default"""
+    backend = requested or SPECIES_BACKENDS.get(selected_species or 'general') or DEFAULT_BACKEND
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}'. Available: {', '.join(MODEL_BACKENDS)}")
+    return backend
+
+def build_classifier(backend=None):
+    return MODEL_BACKENDS[backend or DEFAULT_BACKEND]()
+
+def describe_model(model, X_sample, fit_seconds, repeats=20):
+    """Training time, inference latency and serialized size for a fitted model"""
+    X_sample = np.asarray(X_sample, dtype=float)
+
+    start = time.perf_counter()
+    model.predict_proba(X_sample)
+    batch_seconds = time.perf_counter() - start
+
+    single = X_sample[:1]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict_proba(single)
+    single_seconds = (time.perf_counter() - start) / repeats
+
+    return {
+        'fit_seconds': round(fit_seconds, 4),
+        'batch_rows': len(X_sample),
+        'batch_predict_seconds': round(batch_seconds, 6),
+        'per_row_microseconds': round(batch_seconds / max(len(X_sample), 1) * 1e6, 3),
+        'single_predict_microseconds': round(single_seconds * 1e6, 1),
+        'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    }
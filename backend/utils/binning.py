@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+# Occurrence density on square or hexagonal bins in plain lat/lon degrees. Bins
+# are indexed by integer (i, j) pairs: (row, column) for squares and axial
+# (q, r) coordinates for pointy-top hexagons whose flat-to-flat width is the
+# bin size. Over the study area (|lat| <= 11) a degree of longitude is within
+# 2% of a degree of latitude, so the hexagons stay close to regular.
+BIN_SHAPES = ('square', 'hex')
+MIN_BIN_SIZE = 0.01
+MAX_BIN_SIZE = 5.0
+SQRT3 = np.sqrt(3.0)
+
+def square_index(lats, lons, size):
+    return np.floor(lats / size).astype(np.int64), np.floor(lons / size).astype(np.int64)
+
+def hex_index(lats, lons, size):
+    """Axial (q, r) of the hexagon containing each point, by cube rounding"""
+    radius = size / SQRT3
+    q = (SQRT3 / 3 * lons - lats / 3) / radius
+    r = (2 / 3 * lats) / radius
+    s = -q - r
+
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+def bin_index(lats, lons, shape, size):
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if shape == 'hex':
+        return hex_index(lats, lons, size)
+    return square_index(lats, lons, size)
+
+def bin_centers(i, j, shape, size):
+    """(lat, lon) of bin centres"""
+    i = np.asarray(i, dtype=float)
+    j = np.asarray(j, dtype=float)
+    if shape == 'hex':
+        radius = size / SQRT3
+        return radius * 1.5 * j, radius * SQRT3 * (i + j / 2)
+    return (i + 0.5) * size, (j + 0.5) * size
+
+def bin_polygons(center_lats, center_lons, shape, size):
+    """Closed [lon, lat] rings around each centre, shaped (bins, vertices, 2)"""
+    if shape == 'hex':
+        angles = np.deg2rad(30 + 60 * np.arange(7))
+        radius = size / SQRT3
+        d_lon, d_lat = radius * np.cos(angles), radius * np.sin(angles)
+    else:
+        d_lon = np.array([-0.5, 0.5, 0.5, -0.5, -0.5]) * size
+        d_lat = np.array([-0.5, -0.5, 0.5, 0.5, -0.5]) * size
+    lons = np.asarray(center_lons, dtype=float)[:, None] + d_lon
+    lats = np.asarray(center_lats, dtype=float)[:, None] + d_lat
+    return np.stack([lons, lats], axis=-1)
+
+def occurrence_bin_counts(df, shape, size):
+    """Occurrence counts per (bin, taxon, year) for a whole dataset
+
+    Returns the counts frame (i, j, taxon code, year, count; -1 for a missing
+    year) and the (species, scientificName) pairs the codes refer to. Filtering
+    by species or years and summing per bin is then cheap for any request.
+    """
+    if len(df) == 0:
+        empty = pd.DataFrame({c: pd.Series(dtype=np.int64) for c in ('i', 'j', 'species', 'year', 'count')})
+        return empty, []
+
+    i, j = bin_index(df['decimalLatitude'], df['decimalLongitude'], shape, size)
+    names = [
+        (df[column].astype(object).fillna('') if column in df.columns else pd.Series('', index=df.index))
+        for column in ('species', 'scientificName')
+    ]
+    species_codes, taxa = pd.MultiIndex.from_arrays(names).factorize()
+    years = pd.to_numeric(df['year'], errors='coerce') if 'year' in df.columns else pd.Series(np.nan, index=df.index)
+
+    counts = pd.DataFrame({
+        'i': i,
+        'j': j,
+        'species': species_codes.astype(np.int64),
+        'year': years.fillna(-1).to_numpy(dtype=np.int64),
+    }).groupby(['i', 'j', 'species', 'year'], sort=False).size().reset_index(name='count')
+    return counts, [(str(name), str(scientific_name)) for name, scientific_name in taxa]
+
+def matching_species_codes(taxa, species):
+    """Codes of the taxa matched by a species id or scientific name
+
+    Same rule as training's species filter: a case-insensitive substring of
+    the species or scientificName column, or an exact match.
+    """
+    names = pd.Series([name for name, _ in taxa], dtype=object)
+    scientific_names = pd.Series([scientific_name for _, scientific_name in taxa], dtype=object)
+    wanted = species.replace('_', ' ')
+    matched = (
+        names.str.contains(wanted, case=False, regex=False, na=False)
+        | scientific_names.str.contains(wanted, case=False, regex=False, na=False)
+        | (names == species) | (scientific_names == species)
+    )
+    return np.flatnonzero(matched.to_numpy())
+
+def summarize_bins(counts, taxa, shape, size, species_codes=None, start_year=None, end_year=None,
+                   lat_range=None, lon_range=None, breakdown=(), polygons=False):
+    """Per-bin totals (with optional per-species and per-year counts) of a counts frame"""
+    selected = counts
+    if species_codes is not None:
+        selected = selected[selected['species'].isin(species_codes)]
+    if start_year is not None:
+        selected = selected[selected['year'] >= start_year]
+    if end_year is not None:
+        selected = selected[(selected['year'] <= end_year) & (selected['year'] >= 0)]
+
+    totals = selected.groupby(['i', 'j'], sort=True)['count'].sum().reset_index()
+    lats, lons = bin_centers(totals['i'], totals['j'], shape, size)
+    in_window = np.ones(len(totals), dtype=bool)
+    if lat_range is not None:
+        in_window &= (lats >= lat_range[0]) & (lats <= lat_range[1])
+    if lon_range is not None:
+        in_window &= (lons >= lon_range[0]) & (lons <= lon_range[1])
+    totals, lats, lons = totals[in_window], lats[in_window], lons[in_window]
+
+    bins = [
+        {'id': f'{i}:{j}', 'lat': round(float(lat), 6), 'lon': round(float(lon), 6), 'count': int(count)}
+        for i, j, count, lat, lon in zip(totals['i'], totals['j'], totals['count'], lats, lons)
+    ]
+    position = {(i, j): n for n, (i, j) in enumerate(zip(totals['i'], totals['j']))}
+
+    for field in breakdown:
+        key = 'species' if field == 'species' else 'years'
+        for bin_ in bins:
+            bin_[key] = {}
+        grouped = selected.groupby(['i', 'j', field], sort=True)['count'].sum()
+        for (i, j, value), count in zip(grouped.index, grouped.to_numpy()):
+            n = position.get((i, j))
+            if n is None or value < 0:
+                continue
+            label = taxa[value][0] if field == 'species' else str(value)
+            if label:
+                bins[n][key][label] = bins[n][key].get(label, 0) + int(count)
+
+    if polygons:
+        rings = np.round(bin_polygons(lats, lons, shape, size), 6).tolist()
+        for bin_, ring in zip(bins, rings):
+            bin_['polygon'] = ring
+    return bins
@@ -0,0 +1,239 @@
+import os
+import tempfile
+
+import numpy as np
+
+# Fitted tree ensembles flattened into contiguous node arrays. Every tree of the
+# ensemble lives in the same arrays, nodes are laid out breadth-first with
+# sibling children side by side, and leaves point to themselves so a fixed
+# number of vectorized steps walks every (row, tree) pair down to its leaf.
+MODEL_DIR = os.environ.get(
+    'FISHY_MODEL_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'models')
+)
+# Bump when the exported layout changes so stale files are ignored
+EXPORT_VERSION = 2
+# Rows walked at once; bounds the (rows x trees) index arrays for large batches
+PREDICT_CHUNK_SIZE = 20000
+
+class CompactTreeEnsemble:
+    """Array-only tree ensemble with a predict_proba compatible with sklearn classifiers"""
+
+    def __init__(self, feature, threshold, left, value, roots, depth, aggregation,
+                 baseline=0.0, feature_columns=None, missing_left=None):
+        self.feature = feature.astype(np.intp)
+        self.threshold = threshold
+        # Children are stored next to each other: the right child is left + 1
+        self.left = left.astype(np.intp)
+        self.value = value
+        self.roots = roots.astype(np.intp)
+        self.depth = int(depth)
+        # 'mean' averages leaf probabilities (random forest), 'logit' sums raw
+        # leaf scores onto a baseline and applies the sigmoid (gradient boosting)
+        self.aggregation = aggregation
+        self.baseline = float(baseline)
+        self.feature_columns = list(feature_columns or [])
+        self.missing_left = missing_left
+        self.n_features_in_ = len(self.feature_columns) or int(feature.max()) + 1
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        arrays = [self.feature, self.threshold, self.left, self.value, self.roots]
+        if self.missing_left is not None:
+            arrays.append(self.missing_left)
+        return sum(a.nbytes for a in arrays)
+
+    def _leaf_values(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        has_missing = self.missing_left is not None and np.isnan(flat).any()
+        for _ in range(self.depth):
+            x = flat[offsets + self.feature[nodes]]
+            # Leaves have an infinite threshold and point to themselves
+            go_right = x > self.threshold[nodes]
+            if has_missing:
+                go_right |= np.isnan(x) & ~self.missing_left[nodes]
+            nodes = self.left[nodes] + go_right
+        return self.value[nodes]
+
+    def predict_presence(self, X):
+        """Probability of the positive class for each row of X"""
+        if hasattr(X, 'to_numpy'):
+            X = X[self.feature_columns].to_numpy() if self.feature_columns else X.to_numpy()
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if self.aggregation == 'mean':
+            # sklearn trees compare float32 inputs against float64 thresholds
+            X = X.astype(np.float32).astype(np.float64)
+        X = np.ascontiguousarray(X)
+
+        presence = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), PREDICT_CHUNK_SIZE):
+            leaves = self._leaf_values(X[start:start + PREDICT_CHUNK_SIZE])
+            if self.aggregation == 'mean':
+                presence[start:start + PREDICT_CHUNK_SIZE] = leaves.mean(axis=1)
+            else:
+                raw = self.baseline + leaves.sum(axis=1)
+                presence[start:start + PREDICT_CHUNK_SIZE] = 1.0 / (1.0 + np.exp(-raw))
+        return presence
+
+    def predict_proba(self, X):
+        presence = self.predict_presence(X)
+        return np.column_stack([1.0 - presence, presence])
+
+    def predict(self, X):
+        return (self.predict_presence(X) > 0.5).astype(int)
+
+def _breadth_first_order(children_left, children_right):
+    """Node order in which every node's two children get consecutive positions, and the tree depth"""
+    order = [np.array([0])]
+    frontier = order[0]
+    while True:
+        internal = frontier[children_left[frontier] != -1]
+        if len(internal) == 0:
+            break
+        frontier = np.column_stack([children_left[internal], children_right[internal]]).ravel()
+        order.append(frontier)
+    return np.concatenate(order), len(order) - 1
+
+def _flatten_trees(trees):
+    """Concatenate per-tree node tables into one ensemble
+
+    Each tree is (left, right, feature, threshold, value, missing_left) in
+    sklearn's node numbering, with -1 children marking leaves.
+    """
+    features, thresholds, lefts, values, roots, missing = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+    for left, right, feature, threshold, value, missing_left in trees:
+        order, tree_depth = _breadth_first_order(left, right)
+        position = np.empty(len(left), dtype=np.intp)
+        position[order] = np.arange(len(order))
+
+        left, right = left[order], right[order]
+        is_leaf = left == -1
+        features.append(np.where(is_leaf, 0, feature[order]))
+        thresholds.append(np.where(is_leaf, np.inf, threshold[order]).astype(np.float64))
+        # Leaves point to themselves; the infinite threshold keeps them there
+        lefts.append(np.where(is_leaf, np.arange(len(order)), position[left]) + offset)
+        values.append(value[order].astype(np.float64))
+        # Leaves send missing values left, i.e. back to themselves, so a NaN in
+        # their placeholder feature 0 never moves a row off its leaf
+        missing.append(np.asarray(missing_left, dtype=bool)[order] | is_leaf)
+        roots.append(offset)
+        offset += len(order)
+        depth = max(depth, tree_depth)
+
+    return (
+        np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+        np.concatenate(values), np.array(roots), depth, np.concatenate(missing)
+    )
+
+def _positive_class_index(model):
+    classes = list(model.classes_)
+    return classes.index(1) if 1 in classes else len(classes) - 1
+
+def _export_forest(model, feature_columns):
+    positive = _positive_class_index(model)
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        counts = tree.value[:, 0, :]
+        totals = counts.sum(axis=1)
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        trees.append((
+            tree.children_left, tree.children_right, tree.feature, tree.threshold,
+            counts[:, positive] / np.where(totals > 0, totals, 1), missing_left
+        ))
+    feature, threshold, left, value, roots, depth, missing = _flatten_trees(trees)
+    return CompactTreeEnsemble(
+        feature, threshold, left, value, roots, depth, 'mean',
+        feature_columns=feature_columns, missing_left=missing
+    )
+
+def _export_gradient_boosting(model, feature_columns):
+    # Binary HistGradientBoostingClassifier: one predictor per iteration
+    if len(model.classes_) != 2:
+        raise ValueError("Only binary gradient boosting models can be exported")
+    trees = []
+    for (predictor,) in model._predictors:
+        nodes = predictor.nodes
+        if nodes['is_categorical'].any():
+            raise ValueError("Categorical splits cannot be exported")
+        is_leaf = nodes['is_leaf'].astype(bool)
+        trees.append((
+            np.where(is_leaf, -1, nodes['left'].astype(np.intp)),
+            np.where(is_leaf, -1, nodes['right'].astype(np.intp)),
+            nodes['feature_idx'], nodes['num_threshold'],
+            np.where(is_leaf, nodes['value'], 0.0), nodes['missing_go_to_left'].astype(bool)
+        ))
+    feature, threshold, left, value, roots, depth, missing = _flatten_trees(trees)
+    return CompactTreeEnsemble(
+        feature, threshold, left, value, roots, depth, 'logit',
+        baseline=float(np.ravel(model._baseline_prediction)[0]),
+        feature_columns=feature_columns, missing_left=missing
+    )
+
+def export_model(model, feature_columns=None):
+    """Flatten a fitted random forest or gradient boosting classifier; None if unsupported"""
+    if model is None:
+        return None
+    try:
+        if hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_'):
+            return _export_forest(model, feature_columns)
+        if hasattr(model, '_predictors'):
+            return _export_gradient_boosting(model, feature_columns)
+    except Exception as e:
+        print(f"Error exporting compact model: {e}")
+    return None
+
+def model_path(model_key):
+    return os.path.join(MODEL_DIR, f"{model_key}.npz")
+
+def save_compact_model(compact, model_key):
+    """Write the node arrays to MODEL_DIR atomically"""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    arrays = {
+        'feature': compact.feature.astype(np.int32),
+        'threshold': compact.threshold,
+        'left': compact.left.astype(np.int32),
+        'value': compact.value,
+        'roots': compact.roots.astype(np.int32),
+        'meta': np.array([EXPORT_VERSION, compact.depth, compact.baseline]),
+        'aggregation': np.array(compact.aggregation),
+        'feature_columns': np.array(compact.feature_columns, dtype=str),
+    }
+    if compact.missing_left is not None:
+        arrays['missing_left'] = compact.missing_left
+    with tempfile.NamedTemporaryFile(dir=MODEL_DIR, suffix='.npz', delete=False) as tmp:
+        np.savez(tmp, **arrays)
+    os.chmod(tmp.name, 0o644)
+    path = model_path(model_key)
+    os.replace(tmp.name, path)
+    return path
+
+def load_compact_model(model_key):
+    """Load a previously exported model, or None if missing or from an older export"""
+    path = model_path(model_key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            version, depth, baseline = data['meta']
+            if int(version) != EXPORT_VERSION:
+                return None
+            return CompactTreeEnsemble(
+                data['feature'], data['threshold'], data['left'], data['value'],
+                data['roots'], int(depth), str(data['aggregation']),
+                baseline=baseline,
+                feature_columns=[str(c) for c in data['feature_columns']],
+                missing_left=data['missing_left'] if 'missing_left' in data.files else None
+            )
+    except Exception as e:
+        print(f"Error loading compact model {path}: {e}")
+        return None
@@ -0,0 +1,63 @@
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses are compressed when the client accepts it and the body is big
+# enough to be worth the CPU. Brotli is used when installed, gzip otherwise.
+COMPRESS_MIN_BYTES = int(os.environ.get('FISHY_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('FISHY_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('FISHY_BROTLI_QUALITY', 5))
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/geo+json', 'text/csv', 'text/plain', 'text/html'
+)
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+def _compressible(response):
+    return (
+        200 <= response.status_code < 300
+        and response.status_code != 204
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+    )
+
+def init_response_compression(app):
+    """Register a hook that compresses buffered responses per Accept-Encoding
+
+    Streamed responses (exports) and files are left alone; exports offer their
+    own gzip=1 option.
+    """
+
+    @app.after_request
+    def _compress_response(response):
+        if not _compressible(response):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        encoding = request.accept_encodings.best_match(available_encodings())
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_BYTES:
+            return response
+
+        response.set_data(compress_body(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag is not None and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,134 @@
+import os
+import threading
+
+import numpy as np
+
+# Gridded environmental covariates, one NetCDF file per layer with a single data
+# variable on lat/lon coordinates (an optional time dimension is averaged into a
+# climatology). Bathymetry follows the GEBCO convention of elevation in metres,
+# negative below sea level, and is converted to a positive depth.
+COVARIATE_DIR = os.environ.get(
+    'FISHY_COVARIATE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'covariates')
+)
+LAYER_FILES = {
+    'temperature': 'sst.nc',
+    'depth': 'bathymetry.nc',
+    'salinity': 'salinity.nc',
+    'chlorophyll': 'chlorophyll.nc',
+}
+LAT_NAMES = ('lat', 'latitude', 'y')
+LON_NAMES = ('lon', 'longitude', 'x')
+
+# 'nearest' or 'linear' (bilinear)
+INTERPOLATION = os.environ.get('FISHY_COVARIATE_INTERP', 'nearest')
+SAMPLE_CHUNK_SIZE = 500000
+
+_layers = None
+_layers_lock = threading.Lock()
+
+def _open_layer(path):
+    """Open a layer lazily; values are only read when sampled"""
+    import xarray as xr
+    
+    try:
+        import dask  # noqa: F401
+        dataset = xr.open_dataset(path, chunks={})
+    except ImportError:
+        dataset = xr.open_dataset(path)
+
+    variable = next(iter(dataset.data_vars))
+    layer = dataset[variable]
+
+    lat_name = next(name for name in LAT_NAMES if name in layer.dims)
+    lon_name = next(name for name in LON_NAMES if name in layer.dims)
+    layer = layer.rename({lat_name: 'lat', lon_name: 'lon'})
+    if 'time' in layer.dims:
+        layer = layer.mean('time')
+    return layer.sortby('lat').sortby('lon')
+
+def load_covariate_layers(reload=False):
+    """Return the available covariate layers keyed by feature name"""
+    global _layers
+
+    with _layers_lock:
+        if _layers is not None and not reload:
+            return _layers
+
+        layers = {}
+        for feature, filename in LAYER_FILES.items():
+            path = os.path.join(COVARIATE_DIR, filename)
+            if not os.path.exists(path):
+                continue
+            try:
+                layers[feature] = _open_layer(path)
+                print(f"Loaded covariate layer {feature} from {path}")
+            except Exception as e:
+                print(f"Error loading covariate layer {path}: {e}")
+        _layers = layers
+        return _layers
+
+def available_covariates():
+    return list(load_covariate_layers().keys())
+
+def _sample_layer(layer, lats, lons, method):
+    import xarray as xr
+    
+    points_lat = xr.DataArray(lats, dims='points')
+    points_lon = xr.DataArray(lons, dims='points')
+    if method == 'linear':
+        values = layer.interp(lat=points_lat, lon=points_lon, method='linear').values
+    else:
+        values = layer.sel(lat=points_lat, lon=points_lon, method='nearest').values
+        # nearest would otherwise clamp points outside the raster to its edge
+        lat_min, lat_max = float(layer['lat'].min()), float(layer['lat'].max())
+        lon_min, lon_max = float(layer['lon'].min()), float(layer['lon'].max())
+        outside = (lats < lat_min) | (lats > lat_max) | (lons < lon_min) | (lons > lon_max)
+        values = np.where(outside, np.nan, values)
+    return np.asarray(values, dtype=float)
+
+def sample_covariates(lats, lons, features=None, method=None):
+    """Sample covariate layers at many points with one vectorized lookup per layer and chunk"""
+    layers = load_covariate_layers()
+    method = method or INTERPOLATION
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+
+    samples = {}
+    for feature, layer in layers.items():
+        if features is not None and feature not in features:
+            continue
+        values = np.empty(len(lats), dtype=float)
+        for start in range(0, len(lats), SAMPLE_CHUNK_SIZE):
+            stop = start + SAMPLE_CHUNK_SIZE
+            values[start:stop] = _sample_layer(layer, lats[start:stop], lons[start:stop], method)
+        if feature == 'depth':
+            values = np.clip(-values, 0, None)
+        samples[feature] = values
+    return samples
+
+def apply_covariates(df, features=None, lat_column='decimalLatitude', lon_column='decimalLongitude', samples=None):
+    """Overwrite synthetic environmental columns with covariate values where the rasters have data
+
+    samples can carry values already drawn by sample_covariates for the same rows,
+    so several frames over one grid share a single lookup.
+    """
+    if samples is None:
+        if len(df) == 0 or not load_covariate_layers():
+            return df
+        samples = sample_covariates(df[lat_column].to_numpy(), df[lon_column].to_numpy(), features)
+
+    for feature, values in samples.items():
+        if features is not None and feature not in features:
+            continue
+        has_value = np.isfinite(values)
+        if feature in df.columns:
+            df[feature] = np.where(has_value, values, df[feature].to_numpy())
+        elif has_value.any():
+            # Layers without a synthetic counterpart (chlorophyll) fall back to the layer mean
+            df[feature] = np.where(has_value, values, np.nanmean(values))
+        else:
+            # The column always exists so feature selection by name works; rows
+            # without any layer value are left to the imputer or dropped
+            df[feature] = np.nan
+    return df
@@ -0,0 +1,91 @@
+import numpy as np
+
+# Observed-density surfaces from occurrence points: points are linearly binned
+# onto a regular lat/lon grid and the grid is convolved with a Gaussian kernel
+# through the FFT, which costs the same for 1k or 1M points.
+DEFAULT_DENSITY_RESOLUTION = 0.1
+MIN_DENSITY_RESOLUTION = 0.01
+MAX_DENSITY_RESOLUTION = 1.0
+# The filtered study area, the default window
+STUDY_LAT_RANGE = (-11.0, 6.0)
+STUDY_LON_RANGE = (95.0, 141.0)
+MAX_DENSITY_CELLS = 4_000_000
+KERNEL_SIGMAS = 4
+
+def grid_axis(start, stop, resolution):
+    return np.round(np.arange(start, stop + resolution / 2, resolution), 6)
+
+def scott_bandwidth(lats, lons):
+    """Scott's rule for a 2-D Gaussian kernel, in degrees"""
+    n = len(lats)
+    if n < 2:
+        return None
+    spread = np.mean([np.std(lats), np.std(lons)])
+    return float(spread * n ** (-1 / 6)) if spread > 0 else None
+
+def linear_binning(lats, lons, lat0, lon0, resolution, shape):
+    """Point counts on grid nodes, each point split between its four neighbouring nodes"""
+    y = (np.asarray(lats, dtype=float) - lat0) / resolution
+    x = (np.asarray(lons, dtype=float) - lon0) / resolution
+    inside = (y >= 0) & (y <= shape[0] - 1) & (x >= 0) & (x <= shape[1] - 1)
+    y, x = y[inside], x[inside]
+
+    y0 = np.minimum(np.floor(y).astype(np.int64), max(shape[0] - 2, 0))
+    x0 = np.minimum(np.floor(x).astype(np.int64), max(shape[1] - 2, 0))
+    fy, fx = y - y0, x - x0
+    y1 = np.minimum(y0 + 1, shape[0] - 1)
+    x1 = np.minimum(x0 + 1, shape[1] - 1)
+
+    size = shape[0] * shape[1]
+    grid = np.zeros(size)
+    for yi, xi, weight in (
+        (y0, x0, (1 - fy) * (1 - fx)),
+        (y0, x1, (1 - fy) * fx),
+        (y1, x0, fy * (1 - fx)),
+        (y1, x1, fy * fx),
+    ):
+        grid += np.bincount(yi * shape[1] + xi, weights=weight, minlength=size)
+    return grid.reshape(shape)
+
+def gaussian_kernel(sigma_cells):
+    radius = max(1, int(np.ceil(KERNEL_SIGMAS * sigma_cells)))
+    offsets = np.arange(-radius, radius + 1)
+    profile = np.exp(-0.5 * (offsets / sigma_cells) ** 2)
+    kernel = np.outer(profile, profile)
+    return kernel / kernel.sum(), radius
+
+def fft_convolve(grid, kernel):
+    """'same'-sized linear convolution of grid with an odd-sized kernel"""
+    shape = (grid.shape[0] + kernel.shape[0] - 1, grid.shape[1] + kernel.shape[1] - 1)
+    result = np.fft.irfft2(np.fft.rfft2(grid, shape) * np.fft.rfft2(kernel, shape), shape)
+    top, left = kernel.shape[0] // 2, kernel.shape[1] // 2
+    return result[top:top + grid.shape[0], left:left + grid.shape[1]]
+
+def binned_kde(lats, lons, lat_range, lon_range, resolution=DEFAULT_DENSITY_RESOLUTION, bandwidth=None):
+    """Smoothed occurrence counts per grid node of a lat/lon window
+
+    Returns (grid lats, grid lons, values, bandwidth). Points just outside the
+    window still contribute through the kernel. bandwidth is in degrees and
+    defaults to Scott's rule.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if bandwidth is None:
+        bandwidth = scott_bandwidth(lats, lons) or resolution
+    bandwidth = max(bandwidth, resolution / 2)
+    kernel, radius = gaussian_kernel(bandwidth / resolution)
+
+    grid_lats = grid_axis(lat_range[0], lat_range[1], resolution)
+    grid_lons = grid_axis(lon_range[0], lon_range[1], resolution)
+    # Bin onto the window plus a kernel radius margin, smooth, then crop
+    shape = (len(grid_lats) + 2 * radius, len(grid_lons) + 2 * radius)
+    if shape[0] * shape[1] > MAX_DENSITY_CELLS:
+        raise ValueError(
+            f"Density grid exceeds {MAX_DENSITY_CELLS} cells; narrow the area, use a coarser resolution or a smaller bandwidth"
+        )
+    counts = linear_binning(
+        lats, lons, grid_lats[0] - radius * resolution, grid_lons[0] - radius * resolution, resolution, shape
+    )
+    smoothed = fft_convolve(counts, kernel)[radius:radius + len(grid_lats), radius:radius + len(grid_lons)]
+    # FFT round-off leaves tiny negative values where there are no points
+    return grid_lats, grid_lons, np.clip(smoothed, 0, None), bandwidth
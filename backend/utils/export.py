@@ -0,0 +1,185 @@
+import json
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Streaming writers for downloads. Each one is a generator of byte chunks built
+# from row blocks of a raster window or from frames read in chunks, so a large
+# export never exists in full as Python objects or as one JSON document.
+EXPORT_CHUNK_ROWS = 50000
+FILE_CHUNK_BYTES = 1 << 20
+GZIP_LEVEL = 6
+
+RASTER_FORMATS = ('csv', 'geojson', 'geotiff', 'netcdf')
+POINT_FORMATS = ('csv', 'geojson')
+EXTENSIONS = {'csv': 'csv', 'geojson': 'geojson', 'geotiff': 'tif', 'netcdf': 'nc'}
+MIMETYPES = {
+    'csv': 'text/csv',
+    'geojson': 'application/geo+json',
+    'geotiff': 'image/tiff',
+    'netcdf': 'application/x-netcdf',
+}
+
+def _encode(chunk):
+    return chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """Compress a stream of chunks into one gzip member as it is produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(_encode(chunk))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def raster_frames(lats, lons, values, chunk_rows=EXPORT_CHUNK_ROWS, value_name='probability'):
+    """Cells with a value as frames of about chunk_rows rows, one block of latitudes at a time"""
+    lat_block = max(1, chunk_rows // max(len(lons), 1))
+    for start in range(0, len(lats), lat_block):
+        block = np.asarray(values[start:start + lat_block])
+        lat_mesh, lon_mesh = np.meshgrid(lats[start:start + lat_block], lons, indexing='ij')
+        has_value = ~np.isnan(block)
+        if not has_value.any():
+            continue
+        yield pd.DataFrame({
+            'latitude': np.round(lat_mesh[has_value], 6),
+            'longitude': np.round(lon_mesh[has_value], 6),
+            value_name: np.round(block[has_value].astype(float), 6),
+        })
+
+def csv_chunks(frames, columns):
+    """CSV text with one header row, written frame by frame"""
+    yield ','.join(columns) + '\n'
+    for frame in frames:
+        yield frame.to_csv(index=False, header=False, columns=columns, lineterminator='\n')
+
+def geojson_chunks(frames, lat_column, lon_column, property_columns, metadata=None):
+    """A GeoJSON FeatureCollection of points, written frame by frame"""
+    yield '{"type":"FeatureCollection","metadata":' + json.dumps(metadata or {}) + ',"features":['
+    first = True
+    for frame in frames:
+        if len(frame) == 0:
+            continue
+        # Properties are serialized column-wise by pandas, one object per line
+        properties = frame[property_columns].to_json(orient='records', lines=True).splitlines()
+        features = [
+            f'{{"type":"Feature","geometry":{{"type":"Point","coordinates":[{lon!r},{lat!r}]}},"properties":{props}}}'
+            for lat, lon, props in zip(
+                frame[lat_column].astype(float).tolist(), frame[lon_column].astype(float).tolist(), properties
+            )
+        ]
+        yield ('' if first else ',') + ','.join(features)
+        first = False
+    yield ']}'
+
+# TIFF tag types
+_SHORT, _LONG, _DOUBLE, _ASCII = 3, 4, 12, 2
+_TYPE_FORMATS = {_SHORT: 'H', _LONG: 'I', _DOUBLE: 'd'}
+
+def _tiff_ifd(tags, data_offset):
+    """IFD entries and the out-of-line value block that follows them at data_offset"""
+    entries = []
+    extra = b''
+    for tag, tag_type, tag_values in tags:
+        if tag_type == _ASCII:
+            data = tag_values
+        else:
+            data = struct.pack(f'<{len(tag_values)}{_TYPE_FORMATS[tag_type]}', *tag_values)
+        if len(data) <= 4:
+            entries.append(struct.pack('<HHI', tag, tag_type, len(tag_values)) + data.ljust(4, b'\x00'))
+        else:
+            entries.append(struct.pack('<HHII', tag, tag_type, len(tag_values), data_offset + len(extra)))
+            # Values must start on a word boundary
+            extra += data + b'\x00' * (len(data) % 2)
+    ifd = struct.pack('<H', len(tags)) + b''.join(entries) + struct.pack('<I', 0)
+    return ifd, extra
+
+def geotiff_chunks(values, lat_min, lon_min, resolution):
+    """Single-band float32 GeoTIFF (EPSG:4326, NaN as nodata) streamed strip by strip
+
+    values is indexed (lat ascending, lon ascending) with cell centres on the
+    grid points; the image is written north-up.
+    """
+    height, width = values.shape
+    rows_per_strip = max(1, (256 * 1024) // (width * 4))
+    n_strips = (height + rows_per_strip - 1) // rows_per_strip
+    strip_bytes = [min(rows_per_strip, height - i * rows_per_strip) * width * 4 for i in range(n_strips)]
+
+    lat_top = lat_min + (height - 1) * resolution + resolution / 2
+    lon_left = lon_min - resolution / 2
+    geokeys = [
+        1, 1, 0, 3,
+        1024, 0, 1, 2,      # GTModelType: geographic
+        1025, 0, 1, 1,      # GTRasterType: pixel is area
+        2048, 0, 1, 4326,   # GeographicType: WGS 84
+    ]
+
+    def tags(strip_offsets):
+        return [
+            (256, _LONG, [width]),
+            (257, _LONG, [height]),
+            (258, _SHORT, [32]),
+            (259, _SHORT, [1]),
+            (262, _SHORT, [1]),
+            (273, _LONG, strip_offsets),
+            (277, _SHORT, [1]),
+            (278, _LONG, [rows_per_strip]),
+            (279, _LONG, strip_bytes),
+            (284, _SHORT, [1]),
+            (339, _SHORT, [3]),
+            (33550, _DOUBLE, [resolution, resolution, 0.0]),
+            (33922, _DOUBLE, [0.0, 0.0, 0.0, lon_left, lat_top, 0.0]),
+            (34735, _SHORT, geokeys),
+            (42113, _ASCII, b'nan\x00'),
+        ]
+
+    # Header, IFD and tag values come first; the strip offsets depend on their
+    # size, which does not depend on the offsets themselves
+    data_offset = 8 + 2 + 12 * len(tags([0] * n_strips)) + 4
+    ifd, extra = _tiff_ifd(tags([0] * n_strips), data_offset)
+    first_strip = data_offset + len(extra)
+    offsets = [int(o) for o in np.cumsum([first_strip] + strip_bytes[:-1])]
+    ifd, extra = _tiff_ifd(tags(offsets), data_offset)
+
+    yield b'II*\x00' + struct.pack('<I', 8) + ifd + extra
+    north_up = values[::-1]
+    for i in range(n_strips):
+        strip = north_up[i * rows_per_strip:(i + 1) * rows_per_strip]
+        yield np.ascontiguousarray(strip, dtype='<f4').tobytes()
+
+def netcdf_chunks(values, lats, lons, name='probability', leading=None, attrs=None):
+    """NetCDF file of a raster (or a stack with leading=(dim, coords)) streamed from a temporary file
+
+    NetCDF headers need the final layout, so the file is written once with
+    xarray and then read back in fixed-size chunks.
+    """
+    import xarray as xr
+
+    dims, coords = ['lat', 'lon'], {'lat': np.asarray(lats), 'lon': np.asarray(lons)}
+    if leading is not None:
+        dims.insert(0, leading[0])
+        coords[leading[0]] = np.asarray(leading[1])
+    dataset = xr.Dataset(
+        {name: (dims, np.asarray(values, dtype=np.float32))},
+        coords=coords,
+        attrs={k: v for k, v in (attrs or {}).items() if v is not None}
+    )
+    dataset['lat'].attrs.update(units='degrees_north', standard_name='latitude')
+    dataset['lon'].attrs.update(units='degrees_east', standard_name='longitude')
+
+    fd, path = tempfile.mkstemp(suffix='.nc')
+    os.close(fd)
+    try:
+        dataset.to_netcdf(path, encoding={name: {'_FillValue': np.float32(np.nan)}})
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(FILE_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.unlink(path)
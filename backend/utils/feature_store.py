@@ -0,0 +1,123 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import pandas as pd
+
+from utils.covariates import COVARIATE_DIR, INTERPOLATION, LAYER_FILES
+from utils.shoreline import SHORE_DISTANCE_PATH
+
+# Prepared training frames (presence_df and full_df after environment synthesis,
+# absence sampling and derived features) stored per species and dataset version,
+# so retraining with other hyperparameters or another backend skips straight to
+# fitting. Bump FEATURE_PIPELINE_VERSION whenever any of those steps changes.
+FEATURE_PIPELINE_VERSION = 1
+FEATURE_STORE_ENABLED = os.environ.get('FISHY_FEATURE_STORE', '1') == '1'
+FEATURE_DIR = os.environ.get(
+    'FISHY_FEATURE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'features')
+)
+FRAMES = ('presence', 'full')
+
+_store_lock = threading.Lock()
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+        return [os.path.basename(path), stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        return None
+
+def input_signature():
+    """Covariate and shoreline files the pipeline samples; a change invalidates stored features"""
+    files = [os.path.join(COVARIATE_DIR, name) for name in sorted(LAYER_FILES.values())] + [SHORE_DISTANCE_PATH]
+    signature = json.dumps([INTERPOLATION] + [_file_signature(path) for path in files])
+    return hashlib.sha256(signature.encode()).hexdigest()[:16]
+
+def _slug(selected_species):
+    return re.sub(r'[^A-Za-z0-9]+', '_', selected_species or 'general').strip('_') or 'general'
+
+def feature_key(selected_species, dataset_version):
+    """Directory name for a species' features at a dataset version and pipeline version"""
+    digest = hashlib.sha256(json.dumps(
+        [selected_species, dataset_version, FEATURE_PIPELINE_VERSION, input_signature()]
+    ).encode()).hexdigest()[:16]
+    return f"{_slug(selected_species)}-{digest}"
+
+def _read_meta(path):
+    with open(os.path.join(path, 'meta.json')) as f:
+        return json.load(f)
+
+def load_features(selected_species, dataset_version):
+    """(presence_df, full_df) stored for this species and dataset version, or None"""
+    path = os.path.join(FEATURE_DIR, feature_key(selected_species, dataset_version))
+    try:
+        meta = _read_meta(path)
+        frames = []
+        for name in FRAMES:
+            frame_path = os.path.join(path, f"{name}.{meta['format']}")
+            if meta['format'] == 'parquet':
+                frames.append(pd.read_parquet(frame_path))
+            else:
+                frames.append(pd.read_pickle(frame_path))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error loading stored features from {path}: {e}")
+        return None
+    return tuple(frames)
+
+def _stored_species(path):
+    try:
+        return _read_meta(path).get('species')
+    except (OSError, ValueError):
+        return None
+
+def save_features(selected_species, dataset_version, presence_df, full_df):
+    """Store prepared frames atomically and drop older versions for the same species"""
+    key = feature_key(selected_species, dataset_version)
+    path = os.path.join(FEATURE_DIR, key)
+    file_format = 'parquet' if parquet_available() else 'pkl'
+
+    os.makedirs(FEATURE_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=FEATURE_DIR, prefix='.staging-')
+    try:
+        for name, frame in zip(FRAMES, (presence_df, full_df)):
+            frame_path = os.path.join(staging, f"{name}.{file_format}")
+            if file_format == 'parquet':
+                frame.to_parquet(frame_path)
+            else:
+                frame.to_pickle(frame_path)
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump({
+                'species': selected_species,
+                'dataset_version': dataset_version,
+                'pipeline_version': FEATURE_PIPELINE_VERSION,
+                'format': file_format,
+                'presence_rows': len(presence_df),
+                'total_rows': len(full_df)
+            }, f, indent=2)
+        os.chmod(staging, 0o755)
+
+        with _store_lock:
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(staging, path)
+            for stale in glob.glob(os.path.join(FEATURE_DIR, f"{_slug(selected_species)}-*")):
+                if stale != path and _stored_species(stale) == selected_species:
+                    shutil.rmtree(stale, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return path
@@ -0,0 +1,79 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+# Query points are processed in chunks so BallTree results and the temporary
+# arrays stay bounded for millions of coordinates
+DEFAULT_CHUNK_SIZE = 100000
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; inputs in degrees and broadcast against each other"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2 +
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def nearest_haversine_km(lats, lons, ref_lats, ref_lons, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Distance in km from each point to the nearest of a small set of reference points"""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    ref_lats = np.asarray(ref_lats, dtype=float)
+    ref_lons = np.asarray(ref_lons, dtype=float)
+
+    flat_lats = lats.ravel()
+    flat_lons = lons.ravel()
+    distances = np.empty(flat_lats.shape, dtype=float)
+    for start in range(0, len(flat_lats), chunk_size):
+        stop = start + chunk_size
+        distances[start:stop] = haversine_km(
+            flat_lats[start:stop, None], flat_lons[start:stop, None], ref_lats, ref_lons
+        ).min(axis=1)
+    return distances.reshape(lats.shape)
+
+def build_ball_tree(lats, lons):
+    """BallTree over coordinates in degrees using the haversine metric"""
+    from sklearn.neighbors import BallTree
+
+    coords = np.radians(np.column_stack([np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)]))
+    return BallTree(coords, metric='haversine')
+
+def _query_points(lats, lons):
+    return np.radians(np.column_stack([np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)]))
+
+def nearest_neighbor(tree, lats, lons, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Distance (km) and index of the nearest tree point for each query point"""
+    points = _query_points(lats, lons)
+    distances = np.empty(len(points), dtype=float)
+    indices = np.empty(len(points), dtype=np.int64)
+    for start in range(0, len(points), chunk_size):
+        stop = start + chunk_size
+        dist, idx = tree.query(points[start:stop], k=1)
+        distances[start:stop] = dist[:, 0] * EARTH_RADIUS_KM
+        indices[start:stop] = idx[:, 0]
+    return distances, indices
+
+def radius_search(tree, lats, lons, radius_km, count_only=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Indices of tree points within radius_km of each query point (or just their counts)"""
+    points = _query_points(lats, lons)
+    radius = radius_km / EARTH_RADIUS_KM
+    results = []
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start:start + chunk_size]
+        results.append(tree.query_radius(chunk, r=radius, count_only=count_only))
+    if count_only:
+        return np.concatenate(results) if results else np.empty(0, dtype=np.int64)
+    return [indices for chunk in results for indices in chunk]
+
+def bbox_mask(lats, lons, lat_range, lon_range):
+    """Boolean mask of points inside an inclusive lat/lon bounding box"""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    return (
+        (lats >= lat_range[0]) & (lats <= lat_range[1]) &
+        (lons >= lon_range[0]) & (lons <= lon_range[1])
+    )
+
+def radius_mask(lats, lons, center_lat, center_lon, radius_km):
+    """Boolean mask of points within radius_km of a single center point"""
+    return haversine_km(lats, lons, center_lat, center_lon) <= radius_km
@@ -0,0 +1,89 @@
+import numpy as np
+
+# Hotspots are connected groups of grid cells whose predicted probability is at
+# or above a threshold. Cells touching by an edge or a corner belong to the same
+# hotspot. Hotspots are ranked by score, the probability-weighted area in km²,
+# so a large moderately likely region can outrank a single very likely cell.
+DEFAULT_HOTSPOT_THRESHOLD = 0.7
+KM_PER_DEGREE = 111.32
+
+def grid_from_points(lats, lons, values):
+    """A regular (lat, lon) grid from point predictions, NaN where a node has no prediction"""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    grid_lats, lat_index = np.unique(np.round(lats, 6), return_inverse=True)
+    grid_lons, lon_index = np.unique(np.round(lons, 6), return_inverse=True)
+    grid = np.full((len(grid_lats), len(grid_lons)), np.nan)
+    grid[lat_index, lon_index] = values
+    return grid_lats, grid_lons, grid
+
+def _spacing(axis):
+    return float(np.median(np.diff(axis))) if len(axis) > 1 else 0.0
+
+def grid_spacing(lats, lons):
+    """(lat, lon) node spacing; a single-row or single-column grid borrows the other axis' spacing"""
+    lat_step, lon_step = _spacing(lats), _spacing(lons)
+    if lat_step <= 0 and lon_step <= 0:
+        raise ValueError("Hotspots need a grid with at least two nodes along one axis")
+    return (lat_step if lat_step > 0 else lon_step), (lon_step if lon_step > 0 else lat_step)
+
+def extract_hotspots(lats, lons, values, threshold=DEFAULT_HOTSPOT_THRESHOLD, min_cells=1):
+    """Ranked connected regions of values >= threshold on a (lat, lon) grid"""
+    from scipy import ndimage
+
+    values = np.asarray(values, dtype=float)
+    lat_step, lon_step = grid_spacing(lats, lons)
+    above = np.nan_to_num(values, nan=-np.inf) >= threshold
+    labels, count = ndimage.label(above, structure=np.ones((3, 3), dtype=bool))
+    if count == 0:
+        return []
+
+    lat_mesh, lon_mesh = np.meshgrid(lats, lons, indexing='ij')
+    cell_area = lat_step * KM_PER_DEGREE * lon_step * KM_PER_DEGREE * np.cos(np.deg2rad(lat_mesh))
+
+    # Per-label sums over the labelled cells; label 0 is the background
+    flat = labels.ravel()
+    inside = flat > 0
+    index = flat[inside]
+    probability = values.ravel()[inside]
+    area = cell_area.ravel()[inside]
+    weight = probability * area
+
+    def per_label(weights=None):
+        return np.bincount(index, weights=weights, minlength=count + 1)[1:]
+
+    cells = per_label()
+    area_km2 = per_label(area)
+    score = per_label(weight)
+    mean_probability = per_label(probability) / cells
+    centroid_lat = per_label(weight * lat_mesh.ravel()[inside]) / score
+    centroid_lon = per_label(weight * lon_mesh.ravel()[inside]) / score
+    peak_index = ndimage.maximum_position(values, labels, np.arange(1, count + 1))
+    slices = ndimage.find_objects(labels)
+
+    hotspots = []
+    for n in np.argsort(-score):
+        if cells[n] < min_cells:
+            continue
+        lat_slice, lon_slice = slices[n]
+        peak = peak_index[n]
+        hotspots.append({
+            'rank': len(hotspots) + 1,
+            'centroid': {'lat': round(float(centroid_lat[n]), 6), 'lon': round(float(centroid_lon[n]), 6)},
+            'peak': {
+                'lat': round(float(lats[peak[0]]), 6),
+                'lon': round(float(lons[peak[1]]), 6),
+                'probability': round(float(values[peak]), 4)
+            },
+            'bounds': {
+                'lat_min': round(float(lats[lat_slice.start]), 6),
+                'lat_max': round(float(lats[lat_slice.stop - 1]), 6),
+                'lon_min': round(float(lons[lon_slice.start]), 6),
+                'lon_max': round(float(lons[lon_slice.stop - 1]), 6)
+            },
+            'cells': int(cells[n]),
+            'area_km2': round(float(area_km2[n]), 2),
+            'mean_probability': round(float(mean_probability[n]), 4),
+            'score': round(float(score[n]), 2)
+        })
+    return hotspots
@@ -0,0 +1,213 @@
+import glob
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from utils.preprocessing import (
+    add_derived_features,
+    clean_occurrence_frame,
+    filter_species,
+    generate_intelligent_absence_data,
+    get_enhanced_species_habitat_preferences,
+    synthesize_environment,
+)
+from utils.covariates import apply_covariates
+from utils.prediction import fit_model, generate_prediction_grid, get_feature_columns
+from utils.metrics import timed_stage
+from utils.seeding import dataset_fingerprint, make_rng
+
+INGEST_DIR = os.environ.get(
+    'FISHY_INGEST_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'ingest')
+)
+
+# Largest standardized mean shift of any feature tolerated before a full retrain
+DRIFT_THRESHOLD = float(os.environ.get('FISHY_DRIFT_THRESHOLD', 0.5))
+# Standard errors subtracted from each shift, so a handful of new rows cannot
+# trigger a retrain on sampling noise alone
+DRIFT_STANDARD_ERRORS = 3.0
+# Full retrain once rows added since the last one exceed this share of the training data
+RETRAIN_FRACTION = float(os.environ.get('FISHY_RETRAIN_FRACTION', 0.5))
+WARM_START_TREES = 25
+MAX_TREES = 400
+
+KEY_COLUMNS = ['decimalLatitude', 'decimalLongitude', 'species', 'scientificName', 'year']
+NUMERIC_COLUMNS = ['decimalLatitude', 'decimalLongitude', 'year']
+NAME_COLUMNS = ['species', 'scientificName']
+
+def records_to_frame(records):
+    """Turn posted GBIF rows into a cleaned occurrence frame
+
+    JSON clients often send numbers as strings; coordinates and years are
+    coerced to numbers (unparseable values become NaN and are dropped later)
+    and names to strings, so the rows merge against the training data.
+    """
+    df = pd.DataFrame(records)
+    missing = [c for c in KEY_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Records are missing required fields: {', '.join(missing)}")
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    for column in NAME_COLUMNS:
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return df
+
+def _new_presences(raw_df, entry):
+    """Cleaned records for the entry's species that are not already in its training data"""
+    df = clean_occurrence_frame(raw_df)
+    species = entry.get('selected_species')
+    if species:
+        df = filter_species(df, species)
+    if len(df) == 0:
+        return df
+
+    existing = entry['presence_df'][KEY_COLUMNS]
+    merged = df.merge(existing.drop_duplicates(), on=KEY_COLUMNS, how='left', indicator=True)
+    return merged[merged['_merge'] == 'left_only'].drop(columns='_merge').drop_duplicates()
+
+def prepare_new_rows(new_presence, entry):
+    """Environment, absences and derived features for new presence rows only"""
+    species = entry.get('selected_species')
+    habitat_prefs = get_enhanced_species_habitat_preferences()
+    rng = make_rng('ingest', species, dataset_fingerprint(new_presence))
+
+    presence_new = synthesize_environment(new_presence, species, habitat_prefs, rng)
+    presence_new['label'] = 1
+
+    # Absences are distance-checked against every presence but only as many
+    # are drawn as there are new presences
+    all_presence = pd.concat([entry['presence_df'][KEY_COLUMNS], presence_new[KEY_COLUMNS]], ignore_index=True)
+    ratio = len(presence_new) / len(all_presence)
+    absence_new = generate_intelligent_absence_data(all_presence, species, habitat_prefs, ratio=ratio, rng=rng)
+    absence_new = apply_covariates(absence_new)
+
+    full_new = pd.concat([presence_new, absence_new], ignore_index=True)
+    full_new = add_derived_features(full_new, species, habitat_prefs)
+    presence_new = add_derived_features(presence_new, species, habitat_prefs)
+    return presence_new, full_new
+
+def detect_drift(reference_df, new_df, feature_columns):
+    """Largest standardized shift in feature means between the training data and new rows
+
+    Each shift is reduced by DRIFT_STANDARD_ERRORS standard errors of the new
+    rows' mean (1/sqrt(n) in standardized units), so it is a lower bound that
+    small batches only exceed with a large shift.
+    """
+    reference = reference_df[feature_columns]
+    new = new_df[feature_columns]
+    scale = reference.std().replace(0, 1).fillna(1)
+    standard_error = 1 / np.sqrt(new.count().replace(0, np.nan))
+    shift = (new.mean() - reference.mean()).abs() / scale - DRIFT_STANDARD_ERRORS * standard_error
+    shift = shift.clip(lower=0).fillna(0)
+    return float(shift.max()), {k: round(float(v), 4) for k, v in shift.items()}
+
+def _can_warm_start(model):
+    return (
+        model is not None and
+        'warm_start' in model.get_params() and
+        hasattr(model, 'n_estimators') and
+        model.n_estimators + WARM_START_TREES <= MAX_TREES
+    )
+
+def update_model(entry, presence_new, full_new):
+    """Fold new rows into a trained entry, warm-starting or retraining the model in place"""
+    species = entry.get('selected_species')
+    model = entry.get('model')
+    feature_columns = entry.get('feature_columns') or get_feature_columns(entry['full_df'])
+
+    drift_score, drift = detect_drift(entry['full_df'], full_new, feature_columns)
+    full_df = pd.concat([entry['full_df'], full_new], ignore_index=True)
+    presence_df = pd.concat([entry['presence_df'], presence_new], ignore_index=True)
+    rows_since_retrain = entry.get('rows_since_retrain', 0) + len(full_new)
+
+    if drift_score > DRIFT_THRESHOLD:
+        action, reason = 'retrain', 'drift'
+    elif rows_since_retrain > RETRAIN_FRACTION * len(full_df):
+        action, reason = 'retrain', 'volume'
+    elif not _can_warm_start(model) or entry.get('imputer') is None:
+        action, reason = 'retrain', 'model_not_incremental'
+    else:
+        action, reason = 'warm_start', None
+
+    with timed_stage('incremental_update', species=species, action=action, rows=len(full_new)):
+        if action == 'retrain':
+            feature_columns = get_feature_columns(full_df)
+            model, imputer, accuracy, stats = fit_model(
+                full_df, feature_columns, species, backend=entry.get('backend')
+            )
+            entry.update({'imputer': imputer, 'accuracy': accuracy, 'model_stats': stats})
+            rows_since_retrain = 0
+        else:
+            # New trees see the new rows plus an equal-sized sample of the old
+            # ones, so they are not fitted to the new batch alone
+            previous = entry['full_df']
+            sample = previous.sample(n=min(len(previous), len(full_new)), random_state=len(previous))
+            batch = pd.concat([full_new, sample], ignore_index=True)
+            X = entry['imputer'].transform(batch[feature_columns])
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + WARM_START_TREES)
+            model.fit(X, batch['label'])
+
+    lat_range = (min(entry['lat_range'][0], full_new['decimalLatitude'].min()),
+                 max(entry['lat_range'][1], full_new['decimalLatitude'].max()))
+    lon_range = (min(entry['lon_range'][0], full_new['decimalLongitude'].min()),
+                 max(entry['lon_range'][1], full_new['decimalLongitude'].max()))
+
+    with timed_stage('grid_prediction', species=species):
+        predictions = generate_prediction_grid(lat_range, lon_range, model, feature_columns, species)
+
+    entry.update({
+        'model': model,
+        'feature_columns': feature_columns,
+        'presence_df': presence_df,
+        'full_df': full_df,
+        'lat_range': lat_range,
+        'lon_range': lon_range,
+        'predictions': predictions,
+        'rows_since_retrain': rows_since_retrain
+    })
+    return {
+        'action': action,
+        'reason': reason,
+        'drift_score': round(drift_score, 4),
+        'drift': drift,
+        'new_presence_records': len(presence_new),
+        'new_total_records': len(full_new)
+    }
+
+def ingest_into_models(raw_df, model_data):
+    """Update every trained model whose species appears in the new records"""
+    results = {}
+    for model_key, entry in model_data.items():
+        if entry.get('model') is None:
+            results[model_key] = {'action': 'skipped', 'reason': 'no_trained_model'}
+            continue
+
+        new_presence = _new_presences(raw_df, entry)
+        if len(new_presence) == 0:
+            results[model_key] = {'action': 'skipped', 'reason': 'no_new_records'}
+            continue
+
+        presence_new, full_new = prepare_new_rows(new_presence, entry)
+        results[model_key] = update_model(entry, presence_new, full_new)
+    return results
+
+def read_drop_file(path):
+    """Read a dropped CSV/TSV export, detecting the delimiter from the header"""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        header = f.readline()
+    sep = '\t' if '\t' in header else ','
+    return pd.read_csv(path, sep=sep, on_bad_lines='skip')
+
+def pending_drop_files():
+    return sorted(
+        glob.glob(os.path.join(INGEST_DIR, '*.csv')) +
+        glob.glob(os.path.join(INGEST_DIR, '*.tsv'))
+    )
+
+def mark_processed(path):
+    """Move an ingested file out of the drop directory"""
+    processed_dir = os.path.join(INGEST_DIR, 'processed')
+    os.makedirs(processed_dir, exist_ok=True)
+    shutil.move(path, os.path.join(processed_dir, os.path.basename(path)))
@@ -0,0 +1,88 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+class JobQueue:
+    """Background jobs on a bounded thread pool, one active job per key
+
+    Submitting a key that already has a queued or running job returns that job,
+    so repeated training requests for a species share one run. The job records
+    its keyword arguments as params, so callers can tell a request that asked
+    for something different apart from a repeat.
+    """
+
+    def __init__(self, max_workers=1, max_finished=200, name='job'):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = OrderedDict()
+        self._futures = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self.max_finished = max_finished
+
+    def submit(self, key, kind, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs); returns (job, created)"""
+        with self._lock:
+            active = self._active.get(key)
+            if active is not None:
+                return dict(self._jobs[active]), False
+
+            job_id = uuid.uuid4().hex[:12]
+            self._jobs[job_id] = {
+                'id': job_id,
+                'kind': kind,
+                'key': key,
+                'params': dict(kwargs),
+                'status': 'queued',
+                'submitted_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None
+            }
+            self._active[key] = job_id
+            self._prune()
+            self._futures[job_id] = self._executor.submit(self._run, job_id, fn, args, kwargs)
+            return dict(self._jobs[job_id]), True
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status='running', started_at=datetime.now().isoformat())
+        try:
+            result = fn(*args, **kwargs)
+            self._update(job_id, status='succeeded', result=result)
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self._update(job_id, status='failed', error=str(e))
+        finally:
+            with self._lock:
+                job = self._jobs[job_id]
+                job['finished_at'] = datetime.now().isoformat()
+                if self._active.get(job['key']) == job_id:
+                    del self._active[job['key']]
+                self._futures.pop(job_id, None)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        finished = [j for j, job in self._jobs.items() if job['finished_at'] is not None]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job has finished and return it"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return [dict(job) for job in reversed(self._jobs.values())]
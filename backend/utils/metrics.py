@@ -0,0 +1,106 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+# Pipeline stages run for seconds to minutes, requests for milliseconds to seconds
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class Histogram:
+    """Cumulative histogram in the Prometheus exposition model"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+        self.count += 1
+        self.total += value
+
+_lock = threading.Lock()
+_stage_histograms = {}
+_request_histograms = {}
+
+def observe_stage(stage, duration):
+    """Record the duration of one pipeline stage run"""
+    with _lock:
+        histogram = _stage_histograms.setdefault(stage, Histogram(STAGE_BUCKETS))
+        histogram.observe(duration)
+
+def observe_request(method, route, status, duration):
+    """Record the latency of one handled request"""
+    with _lock:
+        key = (method, route, str(status))
+        histogram = _request_histograms.setdefault(key, Histogram(REQUEST_BUCKETS))
+        histogram.observe(duration)
+
+@contextmanager
+def timed_stage(stage, **labels):
+    """Time a pipeline stage and log it as a structured span"""
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield
+    except Exception:
+        status = 'error'
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        observe_stage(stage, duration)
+        fields = ' '.join(f'{key}={value}' for key, value in labels.items())
+        print(f"[span] stage={stage} status={status} duration={duration:.4f}s {fields}".rstrip())
+
+def init_request_metrics(app):
+    """Register hooks that record per-route request latency"""
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_start_time = time.perf_counter()
+
+    @app.after_request
+    def _record_request_latency(response):
+        start = g.pop('request_start_time', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            observe_request(request.method, route, response.status_code, time.perf_counter() - start)
+        return response
+
+def _format_labels(labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels)
+
+def _render_histogram(lines, name, labels, histogram):
+    for upper, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f'{name}_bucket{{{_format_labels(labels + [("le", upper)])}}} {count}')
+    lines.append(f'{name}_bucket{{{_format_labels(labels + [("le", "+Inf")])}}} {histogram.count}')
+    lines.append(f'{name}_sum{{{_format_labels(labels)}}} {histogram.total:.6f}')
+    lines.append(f'{name}_count{{{_format_labels(labels)}}} {histogram.count}')
+
+def render_prometheus(gauges=None):
+    """Render all recorded metrics in the Prometheus text exposition format"""
+    lines = [
+        '# HELP fishy_stage_duration_seconds Duration of training pipeline stages.',
+        '# TYPE fishy_stage_duration_seconds histogram',
+    ]
+    with _lock:
+        for stage, histogram in sorted(_stage_histograms.items()):
+            _render_histogram(lines, 'fishy_stage_duration_seconds', [('stage', stage)], histogram)
+
+        lines.append('# HELP fishy_request_duration_seconds Latency of HTTP requests by route.')
+        lines.append('# TYPE fishy_request_duration_seconds histogram')
+        for (method, route, status), histogram in sorted(_request_histograms.items()):
+            labels = [('method', method), ('route', route), ('status', status)]
+            _render_histogram(lines, 'fishy_request_duration_seconds', labels, histogram)
+
+    for name, (help_text, value) in (gauges or {}).items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {value}')
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,53 @@
+import glob
+import os
+import pickle
+import tempfile
+
+from utils.compact_model import MODEL_DIR
+
+# Trained model entries (training frames, fitted model, imputer, prediction grid)
+# pickled next to the exported node arrays. A server started with preloading
+# restores them before forking instead of retraining in every worker.
+ENTRY_VERSION = 1
+ENTRY_SUFFIX = '.entry.pkl'
+# Rebuilt from the other fields on load rather than pickled
+TRANSIENT_FIELDS = ('compact_model',)
+
+def entry_path(model_key):
+    return os.path.join(MODEL_DIR, f"{model_key}{ENTRY_SUFFIX}")
+
+def save_model_entry(model_key, entry):
+    """Pickle a trained entry atomically, tagged with the dataset version it was trained on"""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    payload = {
+        'version': ENTRY_VERSION,
+        'source_version': entry.get('source_version'),
+        'entry': {k: v for k, v in entry.items() if k not in TRANSIENT_FIELDS}
+    }
+    with tempfile.NamedTemporaryFile(dir=MODEL_DIR, suffix='.pkl', delete=False) as tmp:
+        pickle.dump(payload, tmp, protocol=pickle.HIGHEST_PROTOCOL)
+    os.chmod(tmp.name, 0o644)
+    path = entry_path(model_key)
+    os.replace(tmp.name, path)
+    return path
+
+def load_model_entries(source_version):
+    """Persisted entries trained on the given dataset version, keyed by model key
+
+    Entries from an older layout or another dataset version are skipped, so the
+    caller retrains those on demand.
+    """
+    entries = {}
+    for path in sorted(glob.glob(os.path.join(MODEL_DIR, f"*{ENTRY_SUFFIX}"))):
+        model_key = os.path.basename(path)[:-len(ENTRY_SUFFIX)]
+        try:
+            with open(path, 'rb') as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            print(f"Error loading model entry {path}: {e}")
+            continue
+        if payload.get('version') != ENTRY_VERSION or payload.get('source_version') != source_version:
+            print(f"Skipping stale model entry {model_key}")
+            continue
+        entries[model_key] = payload['entry']
+    return entries
@@ -0,0 +1,301 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from database import db
+from models import SpeciesOccurrence, StoreMetadata
+from utils.geo import EARTH_RADIUS_KM, radius_mask
+from utils.metrics import timed_stage
+
+# Occurrence records mirrored into SQLite so every worker queries one on-disk
+# copy through B-tree indexes (species, year, province) and an R*Tree on the
+# coordinates instead of filtering its own pandas frame.
+RTREE_TABLE = 'occurrences_rtree'
+INSERT_CHUNK_SIZE = 50000
+
+# Frame column -> model column
+COLUMN_MAP = {
+    'gbifID': 'gbif_id',
+    'species': 'species_name',
+    'scientificName': 'scientific_name',
+    'family': 'family',
+    'decimalLatitude': 'latitude',
+    'decimalLongitude': 'longitude',
+    'year': 'year',
+    'stateProvince': 'state_province',
+    'locality': 'locality',
+    'depth': 'depth',
+    'individualCount': 'individual_count',
+}
+
+# Largest id list sent in one IN (...) when fetching sampled rows
+FETCH_CHUNK_SIZE = 500
+# Above any character a name can contain, closing a prefix range
+PREFIX_END = '\U0010ffff'
+
+def name_key(values):
+    """Names lowercased, with underscores as spaces and runs of whitespace collapsed"""
+    values = pd.Series(values, dtype=object)
+    keys = values.astype(str).str.replace('_', ' ').str.split().str.join(' ').str.lower()
+    return keys.where(values.notna(), None)
+
+def _create_schema(conn):
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info(occurrences)"))}
+    if columns and set(SpeciesOccurrence.__table__.columns.keys()) - columns:
+        # Stores built before a column was added are rebuilt from scratch
+        SpeciesOccurrence.__table__.drop(conn)
+        conn.execute(text(f"DROP TABLE IF EXISTS {RTREE_TABLE}"))
+        conn.execute(text("DELETE FROM store_metadata WHERE key = 'dataset_version'"))
+    db.metadata.create_all(conn, tables=[SpeciesOccurrence.__table__, StoreMetadata.__table__])
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} "
+        "USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+    ))
+
+def _store_version(conn):
+    row = conn.execute(
+        text("SELECT value FROM store_metadata WHERE key = 'dataset_version'")
+    ).fetchone()
+    return row[0] if row else None
+
+def _set_store_version(conn, version):
+    conn.execute(text(
+        "INSERT INTO store_metadata (key, value) VALUES ('dataset_version', :v) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value"
+    ), {'v': version})
+
+def _records(df):
+    """Frame rows as insert parameters for the occurrences table"""
+    out = pd.DataFrame(index=df.index)
+    for source, target in COLUMN_MAP.items():
+        out[target] = df[source].astype(object) if source in df.columns else None
+    out['species_name'] = out['species_name'].fillna(out['scientific_name']).fillna('')
+    out['species_key'] = name_key(out['species_name'])
+    out['scientific_key'] = name_key(out['scientific_name'])
+    out['region_key'] = name_key(out['state_province'])
+    for column in ('gbif_id', 'year', 'individual_count'):
+        out[column] = pd.to_numeric(out[column], errors='coerce').astype('Int64')
+    for column in ('latitude', 'longitude', 'depth'):
+        out[column] = pd.to_numeric(out[column], errors='coerce')
+    out = out.dropna(subset=['latitude', 'longitude'])
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict(orient='records')
+
+def _insert(conn, df):
+    records = _records(df)
+    start_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM occurrences")).scalar()
+    for offset in range(0, len(records), INSERT_CHUNK_SIZE):
+        conn.execute(SpeciesOccurrence.__table__.insert(), records[offset:offset + INSERT_CHUNK_SIZE])
+    conn.execute(text(
+        f"INSERT INTO {RTREE_TABLE} (id, min_lat, max_lat, min_lon, max_lon) "
+        "SELECT id, latitude, latitude, longitude, longitude FROM occurrences WHERE id > :start"
+    ), {'start': start_id})
+    return len(records)
+
+def sync_occurrence_store(df, version):
+    """Rebuild the store from the loaded frame unless it already holds this dataset version"""
+    with db.engine.connect() as conn:
+        _create_schema(conn)
+        conn.commit()
+        if _store_version(conn) == version:
+            return False
+
+    # A single transaction: workers starting together wait on the write lock,
+    # then see the version the first one wrote and skip the rebuild
+    with db.engine.begin() as conn:
+        conn.execute(text("DELETE FROM store_metadata WHERE key = 'rebuild_lock'"))
+        if _store_version(conn) == version:
+            return False
+        with timed_stage('occurrence_store_build', rows=len(df)):
+            conn.execute(text("DELETE FROM occurrences"))
+            conn.execute(text(f"DELETE FROM {RTREE_TABLE}"))
+            inserted = _insert(conn, df)
+            _set_store_version(conn, version)
+    print(f"Occurrence store rebuilt with {inserted} records")
+    with db.engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+    return True
+
+def append_to_store(df, version):
+    """Insert newly ingested records and move the store to the new dataset version"""
+    with db.engine.begin() as conn:
+        _create_schema(conn)
+        inserted = _insert(conn, df)
+        _set_store_version(conn, version)
+    return inserted
+
+def store_ready(version):
+    """Whether the store holds the given dataset version"""
+    try:
+        with db.engine.connect() as conn:
+            return _store_version(conn) == version
+    except Exception:
+        return False
+
+def _radius_box(center_lat, center_lon, radius_km):
+    """Lat/lon box (degrees) enclosing a radius, used as the R*Tree prefilter"""
+    dlat = np.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(np.cos(np.radians(center_lat)), 1e-6)
+    dlon = min(np.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return center_lat - dlat, center_lat + dlat, center_lon - dlon, center_lon + dlon
+
+def _like_substring(value):
+    """LIKE pattern matching value anywhere, with its own wildcards escaped"""
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+def _name_filter(name, columns, value, substring, params):
+    """Clause matching the normalized value against the key columns
+
+    A prefix is a range on each key's index; a substring has to scan.
+    """
+    key = name_key([value])[0]
+    if substring:
+        params[name] = _like_substring(key)
+        clauses = [f"o.{column} LIKE :{name} ESCAPE '\\'" for column in columns]
+    else:
+        params[f'{name}_start'] = key
+        params[f'{name}_end'] = key + PREFIX_END
+        clauses = [f"(o.{column} >= :{name}_start AND o.{column} < :{name}_end)" for column in columns]
+    return "(" + " OR ".join(clauses) + ")"
+
+def _occurrence_filter(species=None, year=None, region_name=None, center_lat=None,
+                       center_lon=None, radius_km=None, substring=False, keyset=False):
+    """FROM/WHERE SQL and parameters selecting the filtered rows, and whether a radius check must follow
+
+    With keyset=True only ids above :after_id are selected, for paging in id order.
+    """
+    joins = []
+    where = []
+    params = {}
+
+    if species:
+        where.append(_name_filter('species', ('species_key', 'scientific_key'), species, substring, params))
+    if year:
+        params['year'] = int(year)
+        where.append("o.year = :year")
+    if region_name:
+        where.append(_name_filter('region', ('region_key',), region_name, substring, params))
+
+    use_radius = center_lat is not None and center_lon is not None and radius_km is not None
+    if use_radius:
+        min_lat, max_lat, min_lon, max_lon = _radius_box(center_lat, center_lon, radius_km)
+        joins.append(
+            f"JOIN {RTREE_TABLE} r ON r.id = o.id AND r.min_lat >= :min_lat AND r.max_lat <= :max_lat "
+            "AND r.min_lon >= :min_lon AND r.max_lon <= :max_lon"
+        )
+        params.update({'min_lat': min_lat, 'max_lat': max_lat, 'min_lon': min_lon, 'max_lon': max_lon})
+    if keyset:
+        where.append("o.id > :after_id")
+
+    sql = f"FROM occurrences o {' '.join(joins)}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql, params, use_radius
+
+def _use_substring(conn, species, region_name):
+    """Whether name filters fall back to substrings because no name starts with them"""
+    if not species and not region_name:
+        return False
+    sql, params, _ = _occurrence_filter(species=species, region_name=region_name)
+    return conn.execute(text(f"SELECT 1 {sql} LIMIT 1"), params).fetchone() is None
+
+def _select_rows(from_sql, keyset=False):
+    """SELECT of the response columns; with keyset=True each row also carries its id as row_id"""
+    return (
+        f"SELECT {'o.id AS row_id, ' if keyset else ''}o.gbif_id AS gbifID, o.scientific_name AS scientificName, o.species_name AS species, "
+        "o.latitude AS decimalLatitude, o.longitude AS decimalLongitude, o.year AS year, o.depth AS depth, "
+        f"o.individual_count AS individualCount, o.state_province AS stateProvince, o.locality AS locality {from_sql}"
+    )
+
+def _rows_by_id(conn, ids):
+    """Rows for the given ids, in id order"""
+    frames = []
+    ids = np.sort(np.asarray(ids, dtype=np.int64))
+    for offset in range(0, len(ids), FETCH_CHUNK_SIZE):
+        chunk = ids[offset:offset + FETCH_CHUNK_SIZE]
+        params = {f'id{i}': int(v) for i, v in enumerate(chunk)}
+        in_list = ', '.join(f':{name}' for name in params)
+        frames.append(pd.read_sql_query(text(_select_rows(f"FROM occurrences o WHERE o.id IN ({in_list})")), conn, params=params))
+    return pd.concat(frames, ignore_index=True)
+
+def _matching_ids(conn, from_sql, params, filtered):
+    """Ids of the matching rows
+
+    Without a filter the ids are generated from the id range: the store is only
+    ever rebuilt or appended to in one transaction, so its ids have no gaps.
+    """
+    if not filtered:
+        first, last = conn.execute(text("SELECT MIN(id), MAX(id) FROM occurrences")).fetchone()
+        return np.arange(first, last + 1, dtype=np.int64) if first is not None else np.empty(0, dtype=np.int64)
+    rows = conn.execute(text(f"SELECT o.id {from_sql}"), params).fetchall()
+    return np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+
+def query_occurrences(species=None, year=None, region_name=None, center_lat=None,
+                      center_lon=None, radius_km=None, limit=1000):
+    """Filtered occurrence rows through the indexes; returns (frame, matched row count)
+
+    Species and region match as case-insensitive prefixes of the normalized
+    names, an index range, and only fall back to a substring scan when no name
+    starts with them. A radius is narrowed with the R*Tree first and then
+    checked exactly. Over the limit, rows are sampled by id rather than by
+    sorting the matches on RANDOM().
+    """
+    with db.engine.connect() as conn:
+        substring = _use_substring(conn, species, region_name)
+        from_sql, params, use_radius = _occurrence_filter(
+            species, year, region_name, center_lat, center_lon, radius_km, substring
+        )
+        if use_radius:
+            # The exact distance check has to run before sampling down to the limit
+            df = pd.read_sql_query(text(_select_rows(from_sql)), conn, params=params)
+            df = df[radius_mask(df['decimalLatitude'], df['decimalLongitude'], center_lat, center_lon, radius_km)]
+            matched = len(df)
+            if matched > limit:
+                df = df.sample(n=limit)
+            return df, matched
+
+        ids = _matching_ids(conn, from_sql, params, filtered=bool(species or year or region_name))
+        matched = len(ids)
+        if matched > limit:
+            df = _rows_by_id(conn, np.random.default_rng().choice(ids, size=limit, replace=False))
+        else:
+            df = pd.read_sql_query(text(_select_rows(from_sql)), conn, params=params)
+    return df, matched
+
+def iter_occurrences(species=None, year=None, region_name=None, center_lat=None,
+                     center_lon=None, radius_km=None, chunk_size=50000):
+    """Every matching row, as frames of up to chunk_size rows
+
+    Each page is its own short query after the last id seen, so a slow download
+    holds neither a pooled connection nor a read snapshot (which would stop WAL
+    checkpoints) between pages. A new dataset version during the download (a
+    rebuild renumbers the rows) ends it with an error rather than skipping or
+    repeating rows.
+    """
+    with db.engine.connect() as conn:
+        substring = _use_substring(conn, species, region_name)
+    from_sql, params, use_radius = _occurrence_filter(
+        species, year, region_name, center_lat, center_lon, radius_km, substring, keyset=True
+    )
+    page_sql = text(_select_rows(from_sql, keyset=True) + " ORDER BY o.id LIMIT :page_size")
+    after_id = 0
+    version = None
+    while True:
+        with db.engine.connect() as conn:
+            current_version = _store_version(conn)
+            if version is not None and current_version != version:
+                raise RuntimeError("Occurrence store changed during the export")
+            version = current_version
+            df = pd.read_sql_query(page_sql, conn, params={**params, 'after_id': after_id, 'page_size': chunk_size})
+        if len(df) == 0:
+            return
+        after_id = int(df['row_id'].iloc[-1])
+        last_page = len(df) < chunk_size
+        df = df.drop(columns='row_id')
+        if use_radius:
+            df = df[radius_mask(df['decimalLatitude'], df['decimalLongitude'], center_lat, center_lon, radius_km)]
+        yield df
+        if last_page:
+            return
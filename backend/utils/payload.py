@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from utils.rasters import nested_list
+
+# Opt-in minimization of point payloads. A client asks for it with any of
+#   precision=4        decimal places for latitude/longitude
+#   probability=uint8  probabilities as integers 0-255 (divide by probability_scale)
+#   layout=columns     one array per column instead of one object per row
+# and gets the rows without their repeated constants (species), which move to
+# an "encoding" header. Without these options responses keep their old shape.
+MAX_PRECISION = 8
+VALUE_DECIMALS = 4
+PROBABILITY_ENCODINGS = ('float', 'uint8')
+LAYOUTS = ('records', 'columns')
+UINT8_SCALE = 255
+
+def parse_payload_options(source):
+    """Payload options from query args or a JSON body; None when none were given"""
+    precision = source.get('precision')
+    probability = source.get('probability')
+    layout = source.get('layout')
+    if precision in (None, '') and not probability and not layout:
+        return None
+
+    if precision not in (None, ''):
+        precision = int(precision)
+        if not 0 <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between 0 and {MAX_PRECISION}")
+    else:
+        precision = None
+    probability = probability or 'float'
+    if probability not in PROBABILITY_ENCODINGS:
+        raise ValueError(f"probability must be one of {', '.join(PROBABILITY_ENCODINGS)}")
+    layout = layout or 'records'
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {', '.join(LAYOUTS)}")
+    return {
+        'precision': precision,
+        'probability': probability,
+        'probability_scale': UINT8_SCALE if probability == 'uint8' else 1,
+        'layout': layout,
+    }
+
+def quantize_probabilities(values):
+    """Probabilities as uint8 steps of 1/255; NaN stays NaN"""
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), np.nan, np.round(np.clip(values, 0, 1) * UINT8_SCALE))
+
+def _column_values(values, decimals=None, integer=False):
+    values = np.asarray(values)
+    if not np.issubdtype(values.dtype, np.floating):
+        return values.tolist()
+    if decimals is not None:
+        values = np.round(values, decimals)
+    out = values.astype(object)
+    has_value = ~np.isnan(values)
+    if integer:
+        out[has_value] = values[has_value].astype(int)
+    out[~has_value] = None
+    return out.tolist()
+
+def encode_points(frame, options, lat_column='decimalLatitude', lon_column='decimalLongitude',
+                  value_column='prediction'):
+    """Rows of a point frame in the requested encoding; returns (encoding header, rows)"""
+    constants = {}
+    columns = []
+    for column in frame.columns:
+        series = frame[column]
+        if len(series) and not pd.api.types.is_numeric_dtype(series) and series.nunique(dropna=False) == 1:
+            constants[column] = series.iloc[0]
+        else:
+            columns.append(column)
+
+    data = {}
+    for column in columns:
+        if column in (lat_column, lon_column):
+            data[column] = _column_values(frame[column], options['precision'])
+        elif column == value_column and options['probability'] == 'uint8':
+            data[column] = _column_values(quantize_probabilities(frame[column]), integer=True)
+        else:
+            data[column] = _column_values(frame[column], VALUE_DECIMALS)
+
+    header = {**options, 'columns': columns, 'constants': constants}
+    if options['layout'] == 'columns':
+        return header, data
+    return header, [dict(zip(columns, row)) for row in zip(*(data[c] for c in columns))]
+
+def encode_cube(values, options):
+    """A probability cube as nested lists in the requested encoding, None where NaN"""
+    if options is None or options['probability'] != 'uint8':
+        return nested_list(values)
+    return _column_values(quantize_probabilities(values), integer=True)
+
+def encode_coordinates(values, options, decimals=6):
+    """Cube axis coordinates, rounded to the requested precision"""
+    if options is not None and options['precision'] is not None:
+        decimals = options['precision']
+    return nested_list(values, decimals)
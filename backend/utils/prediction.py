@@ -1,47 +1,56 @@
 import numpy as np
 import pandas as pd
-import xarray as xr
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
 from utils.preprocessing import get_enhanced_species_habitat_preferences
-from sklearn.impute import SimpleImputer
+from utils.metrics import timed_stage
+from utils.seeding import make_rng
+from utils.covariates import apply_covariates
+from utils.backends import build_classifier, describe_model, resolve_backend
+import time
 
-def train_and_predict(presence_df, full_df, lat_range, lon_range, selected_species=None):
-    try:
-        feature_columns = ['decimalLatitude', 'decimalLongitude', 'temperature']
-        if 'depth' in full_df.columns:
-            feature_columns.append('depth')
-        if 'salinity' in full_df.columns:
-            feature_columns.append('salinity')
+def get_feature_columns(full_df):
+    """Model feature columns available in a prepared frame"""
+    feature_columns = ['decimalLatitude', 'decimalLongitude', 'temperature']
+    if 'depth' in full_df.columns:
+        feature_columns.append('depth')
+    if 'salinity' in full_df.columns:
+        feature_columns.append('salinity')
+    # apply_covariates adds the column even where the layer has no values
+    if 'chlorophyll' in full_df.columns and full_df['chlorophyll'].notna().any():
+        feature_columns.append('chlorophyll')
+    return feature_columns
 
-        X = full_df[feature_columns]
-        y = full_df['label']
+def fit_model(full_df, feature_columns, selected_species=None, clf=None, backend=None):
+    """Fit a presence/absence classifier; returns (model, imputer, accuracy, stats)"""
+    from sklearn.impute import SimpleImputer
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
 
-        # Remove rows with NaN or use imputer
-        imputer = SimpleImputer(strategy='mean')
-        X = pd.DataFrame(imputer.fit_transform(X), columns=feature_columns)
-        y = y.reset_index(drop=True)
+    X = full_df[feature_columns]
+    y = full_df['label']
 
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+    # Remove rows with NaN or use imputer
+    imputer = SimpleImputer(strategy='mean')
+    X = pd.DataFrame(imputer.fit_transform(X), columns=feature_columns)
+    y = y.reset_index(drop=True)
 
-        clf = RandomForestClassifier(
-            n_estimators=150, 
-            random_state=42,
-            max_depth=12,
-            min_samples_split=3,
-            min_samples_leaf=1,
-            max_features='sqrt'
-        )
+    # Split data
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+
+    backend = resolve_backend(selected_species, backend)
+    if clf is None:
+        clf = build_classifier(backend)
+    with timed_stage('fit', species=selected_species, backend=backend, rows=len(X_train)):
+        fit_start = time.perf_counter()
         clf.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - fit_start
 
-        y_pred = clf.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
-        print(f"Model accuracy for {selected_species or 'all species'}: {accuracy:.3f}")
+    y_pred = clf.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"Model accuracy for {selected_species or 'all species'} ({backend}): {accuracy:.3f}")
 
+    if hasattr(clf, 'feature_importances_'):
         feature_importance = pd.DataFrame({
             'feature': feature_columns,
             'importance': clf.feature_importances_
@@ -49,51 +58,75 @@ def train_and_predict(presence_df, full_df, lat_range, lon_range, selected_speci
         print("Feature importance:")
         print(feature_importance)
 
-        grid_df = generate_prediction_grid(lat_range, lon_range, clf, feature_columns, selected_species)
-        return grid_df
+    stats = describe_model(clf, X_test, fit_seconds)
+    stats.update({'backend': backend, 'accuracy': round(accuracy, 4)})
+    print(f"Model stats: {stats}")
+
+    return clf, imputer, accuracy, stats
+
+def train_species_model(presence_df, full_df, lat_range, lon_range, selected_species=None, backend=None):
+    """Train a model and predict the grid; returns the fitted model alongside the predictions"""
+    try:
+        feature_columns = get_feature_columns(full_df)
+        clf, imputer, accuracy, stats = fit_model(full_df, feature_columns, selected_species, backend=backend)
+
+        with timed_stage('grid_prediction', species=selected_species):
+            grid_df = generate_prediction_grid(lat_range, lon_range, clf, feature_columns, selected_species)
+
+        return {
+            'model': clf,
+            'feature_columns': feature_columns,
+            'imputer': imputer,
+            'accuracy': accuracy,
+            'model_stats': stats,
+            'predictions': grid_df
+        }
 
     except Exception as e:
         print(f"Error in train_and_predict: {e}")
-        return generate_fallback_predictions(lat_range, lon_range, selected_species)
+        return {
+            'model': None,
+            'feature_columns': [],
+            'imputer': None,
+            'accuracy': None,
+            'model_stats': None,
+            'predictions': generate_fallback_predictions(lat_range, lon_range, selected_species)
+        }
+
+def train_and_predict(presence_df, full_df, lat_range, lon_range, selected_species=None):
+    return train_species_model(presence_df, full_df, lat_range, lon_range, selected_species)['predictions']
+    
+def grid_features(lats, lons, feature_columns, selected_species=None, rng=None, covariate_samples=None):
+    """Environmental features for many grid cells at once"""
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    if rng is None:
+        rng = make_rng('grid_features', selected_species, len(lats))
+    habitat_prefs = get_enhanced_species_habitat_preferences()
     
-def generate_prediction_grid(lat_range, lon_range, model, feature_columns, selected_species=None):
+    grid_df = pd.DataFrame({'decimalLatitude': lats, 'decimalLongitude': lons})
+    grid_df['temperature'] = generate_species_specific_temperature_for_prediction(
+        lats, lons, selected_species, habitat_prefs, rng
+    )
+    if 'depth' in feature_columns:
+        grid_df['depth'] = generate_species_specific_depth_for_prediction(selected_species, habitat_prefs)
+    if 'salinity' in feature_columns:
+        grid_df['salinity'] = generate_species_specific_salinity_for_prediction(selected_species, habitat_prefs)
+    
+    # Sample gridded covariates for every cell in one lookup per layer
+    return apply_covariates(grid_df, features=feature_columns, samples=covariate_samples)
+
+def generate_prediction_grid(lat_range, lon_range, model, feature_columns, selected_species=None, rng=None):
     """Generate predictions on a regular grid"""
+    if rng is None:
+        rng = make_rng('grid', selected_species, lat_range, lon_range)
     try:
         # Create grid points
         lat_grid = np.linspace(lat_range[0], lat_range[1], 50)
         lon_grid = np.linspace(lon_range[0], lon_range[1], 50)
+        lat_mesh, lon_mesh = np.meshgrid(lat_grid, lon_grid, indexing='ij')
         
-        grid_points = []
-        for lat in lat_grid:
-            for lon in lon_grid:
-                grid_points.append({'decimalLatitude': lat, 'decimalLongitude': lon})
-        
-        grid_df = pd.DataFrame(grid_points)
-        
-        # Add environmental features based on species preferences
-        habitat_prefs = get_enhanced_species_habitat_preferences()
-        
-        grid_df['temperature'] = grid_df.apply(
-            lambda row: generate_species_specific_temperature_for_prediction(
-                row['decimalLatitude'], 
-                row['decimalLongitude'],
-                selected_species,
-                habitat_prefs
-            ), 
-            axis=1
-        )
-        
-        if 'depth' in feature_columns:
-            grid_df['depth'] = grid_df.apply(
-                lambda row: generate_species_specific_depth_for_prediction(selected_species, habitat_prefs),
-                axis=1
-            )
-        
-        if 'salinity' in feature_columns:
-            grid_df['salinity'] = grid_df.apply(
-                lambda row: generate_species_specific_salinity_for_prediction(selected_species, habitat_prefs),
-                axis=1
-            )
+        grid_df = grid_features(lat_mesh.ravel(), lon_mesh.ravel(), feature_columns, selected_species, rng)
         
         # Remove points with missing data
         grid_df = grid_df.dropna()
@@ -116,8 +149,10 @@ def generate_prediction_grid(lat_range, lon_range, model, feature_columns, selec
         print(f"Error generating prediction grid: {e}")
         return generate_fallback_predictions(lat_range, lon_range, selected_species)
 
-def generate_species_specific_temperature_for_prediction(lat, lon, species, habitat_prefs):
-    """Generate temperature for prediction grid based on species preferences"""
+def generate_species_specific_temperature_for_prediction(lat, lon, species, habitat_prefs, rng=None):
+    """Generate temperature for prediction grid based on species preferences (scalar or array lat/lon)"""
+    if rng is None:
+        rng = make_rng('temperature', species, lat, lon)
     base_temp = 28.0
     
     if species and species in habitat_prefs:
@@ -125,21 +160,21 @@ def generate_species_specific_temperature_for_prediction(lat, lon, species, habi
         base_temp = (temp_range[0] + temp_range[1]) / 2
     
     # Add latitude effect
-    lat_effect = (lat + 5) * 0.2
+    lat_effect = (np.asarray(lat, dtype=float) + 5) * 0.2
     
     # Add some variation but less random than training data
-    variation = np.random.normal(0, 0.2)
+    variation = rng.normal(0, 0.2) if np.ndim(lat) == 0 else rng.normal(0, 0.2, size=np.shape(lat))
     
     temperature = base_temp + lat_effect + variation
     
     # Keep within species-specific bounds
     if species and species in habitat_prefs:
         temp_range = habitat_prefs[species]['temp_range']
-        temperature = max(temp_range[0], min(temp_range[1], temperature))
+        temperature = np.clip(temperature, temp_range[0], temp_range[1])
     else:
-        temperature = max(25.0, min(32.0, temperature))
+        temperature = np.clip(temperature, 25.0, 32.0)
     
-    return temperature
+    return float(temperature) if np.ndim(temperature) == 0 else temperature
 
 def generate_species_specific_depth_for_prediction(species, habitat_prefs):
     """Generate depth for prediction grid based on species preferences"""
@@ -163,15 +198,15 @@ def generate_fallback_predictions(lat_range, lon_range, selected_species=None):
     """Generate fallback predictions when model training fails"""
     print(f"Generating fallback predictions for {selected_species or 'unknown species'}")
     
-    np.random.seed(42)
+    rng = make_rng('fallback_predictions', selected_species, lat_range, lon_range)
     n_points = 1000
     
     habitat_prefs = get_enhanced_species_habitat_preferences()
     
     predictions = []
     for _ in range(n_points):
-        lat = np.random.uniform(lat_range[0], lat_range[1])
-        lon = np.random.uniform(lon_range[0], lon_range[1])
+        lat = rng.uniform(lat_range[0], lat_range[1])
+        lon = rng.uniform(lon_range[0], lon_range[1])
         
         # Generate species-specific prediction probabilities
         base_prob = 0.3
@@ -201,7 +236,7 @@ def generate_fallback_predictions(lat_range, lon_range, selected_species=None):
                     base_prob *= 0.3  # Much lower in marine areas
         
         # Add random variation
-        prediction = base_prob + np.random.normal(0, 0.15)
+        prediction = base_prob + rng.normal(0, 0.15)
         prediction = max(0.0, min(1.0, prediction))  # Clamp to [0,1]
         
         predictions.append({
@@ -213,7 +248,35 @@ def generate_fallback_predictions(lat_range, lon_range, selected_species=None):
     
     return pd.DataFrame(predictions)
 
-def predict_species_presence(lat, lon, species_id, model=None):
+def point_features(lats, lons, feature_columns, species_id=None, imputer=None):
+    """Model features at individual points, built the same way as the prediction grid"""
+    lats = np.atleast_1d(np.asarray(lats, dtype=float))
+    lons = np.atleast_1d(np.asarray(lons, dtype=float))
+    habitat_prefs = get_enhanced_species_habitat_preferences()
+    
+    points_df = pd.DataFrame({'decimalLatitude': lats, 'decimalLongitude': lons})
+    points_df['temperature'] = [
+        generate_species_specific_temperature_for_prediction(lat, lon, species_id, habitat_prefs)
+        for lat, lon in zip(lats, lons)
+    ]
+    if 'depth' in feature_columns:
+        points_df['depth'] = generate_species_specific_depth_for_prediction(species_id, habitat_prefs)
+    if 'salinity' in feature_columns:
+        points_df['salinity'] = generate_species_specific_salinity_for_prediction(species_id, habitat_prefs)
+    points_df = apply_covariates(points_df, features=feature_columns)
+    
+    # Layers such as chlorophyll may be missing here; the training imputer fills them
+    points_df = points_df.reindex(columns=feature_columns)
+    if imputer is not None:
+        points_df = pd.DataFrame(imputer.transform(points_df), columns=feature_columns)
+    return points_df
+
+def predict_points(lats, lons, species_id, model, feature_columns, imputer=None):
+    """Presence probabilities for a small batch of points"""
+    X = point_features(lats, lons, feature_columns, species_id, imputer)
+    return model.predict_proba(X[feature_columns].to_numpy())[:, 1]
+
+def predict_species_presence(lat, lon, species_id, model=None, feature_columns=None, imputer=None):
     """Predict species presence at specific coordinates"""
     try:
         if model is None:
@@ -221,22 +284,19 @@ def predict_species_presence(lat, lon, species_id, model=None):
             return predict_presence_heuristic(lat, lon, species_id)
         
         # Use trained model
-        habitat_prefs = get_enhanced_species_habitat_preferences()
-        temp = generate_species_specific_temperature_for_prediction(lat, lon, species_id, habitat_prefs)
-        depth = generate_species_specific_depth_for_prediction(species_id, habitat_prefs)
-        salinity = generate_species_specific_salinity_for_prediction(species_id, habitat_prefs)
-        
-        X = np.array([[lat, lon, temp, depth, salinity]])
-        probability = model.predict_proba(X)[0, 1]
+        feature_columns = feature_columns or ['decimalLatitude', 'decimalLongitude', 'temperature', 'depth', 'salinity']
+        probability = predict_points([lat], [lon], species_id, model, feature_columns, imputer)[0]
         
-        return probability
+        return float(probability)
         
     except Exception as e:
         print(f"Error predicting species presence: {e}")
         return 0.5  # Default probability
 
-def predict_presence_heuristic(lat, lon, species_id):
+def predict_presence_heuristic(lat, lon, species_id, rng=None):
     """Enhanced heuristic for species presence prediction based on habitat preferences"""
+    if rng is None:
+        rng = make_rng('heuristic', species_id, lat, lon)
     habitat_prefs = get_enhanced_species_habitat_preferences()
     
     if species_id not in habitat_prefs:
@@ -274,5 +334,5 @@ def predict_presence_heuristic(lat, lon, species_id):
             base_prob = 0.1
     
     # Add some random variation
-    final_prob = base_prob + np.random.normal(0, 0.1)
+    final_prob = base_prob + rng.normal(0, 0.1)
     return max(0.0, min(1.0, final_prob))
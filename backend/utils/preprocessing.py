@@ -1,19 +1,133 @@
 import pandas as pd
 import numpy as np
-import xarray as xr
-from Bio import SeqIO
 import os
-import requests
 from io import StringIO
 import glob
+import threading
 from pathlib import Path
-from sklearn.preprocessing import StandardScaler
-from scipy.spatial.distance import cdist
+from utils.metrics import timed_stage
+from utils.seeding import dataset_fingerprint, make_rng
+from utils.covariates import apply_covariates
+from utils.shoreline import distance_to_shore
+from utils.geo import build_ball_tree, nearest_neighbor
+from utils.feature_store import FEATURE_STORE_ENABLED, load_features, save_features
 import warnings
 warnings.filterwarnings('ignore')
 
-def load_fasta_species():
+# Absences must be at least ~0.5 degrees (great-circle) from any presence
+MIN_ABSENCE_DISTANCE_KM = 55.0
+
+OCCURRENCE_DATA_URL = "https://hebbkx1anhila5yf.public.blob.vercel-storage.com/occurrence-q4D1BSg6qEE6PpgihdkwFSFmjxw9rs.csv"
+
+# The occurrence export and FASTA catalog are parsed once per process and shared
+# by the API routes and every training run. Loaded before gunicorn forks, they
+# are inherited by all workers instead of being fetched again by each one.
+# Only the columns read by the routes, the occurrence store and training are
+# kept (a GBIF export has dozens more), with repetitive strings as categoricals.
+OCCURRENCE_COLUMNS = (
+    'gbifID', 'species', 'scientificName', 'family', 'countryCode', 'stateProvince', 'locality',
+    'decimalLatitude', 'decimalLongitude', 'year', 'depth', 'individualCount'
+)
+_source_cache = {}
+_source_lock = threading.Lock()
+
+# Records ingested after the export was published. They are appended here so
+# retrains and restarts see them too (the drop files are moved away once read).
+INGESTED_PATH = os.environ.get(
+    'FISHY_INGESTED_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'ingested_occurrences.tsv')
+)
+
+# Object columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+def compact_frame(df):
+    """Frame with repetitive string columns stored as categoricals
+
+    Object columns hold one Python object per cell, and reading them updates
+    reference counts, which dirties the pages a forked worker shares with the
+    master. Category codes are plain integer arrays that stay shared.
+    """
+    if df is None or len(df) == 0:
+        return df
+    converted = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_string_dtype(values.dtype) and values.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(values):
+            converted[column] = values.astype('category')
+    return df.assign(**converted) if converted else df
+
+def read_occurrence_csv(reload=False):
+    """The GBIF occurrence export plus ingested records, read once per source and then served from memory"""
+    source = os.environ.get('FISHY_OCCURRENCE_PATH') or OCCURRENCE_DATA_URL
+    with _source_lock:
+        if reload or _source_cache.get('source') != source:
+            _source_cache['occurrences'] = compact_frame(_merge_ingested(_fetch_occurrence_csv(), _read_ingested()))
+            _source_cache['source'] = source
+            _source_cache.pop('occurrence_version', None)
+        return _source_cache['occurrences']
+
+def append_ingested_occurrences(df):
+    """Persist ingested records and add them to the memoized export"""
+    df = df.reindex(columns=list(OCCURRENCE_COLUMNS))
+    with _source_lock:
+        os.makedirs(os.path.dirname(INGESTED_PATH), exist_ok=True)
+        write_header = not os.path.exists(INGESTED_PATH) or os.path.getsize(INGESTED_PATH) == 0
+        with open(INGESTED_PATH, 'a', encoding='utf-8', newline='') as f:
+            df.to_csv(f, sep='\t', header=write_header, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        if 'occurrences' in _source_cache:
+            _source_cache['occurrences'] = compact_frame(_merge_ingested(_source_cache['occurrences'], df))
+        _source_cache.pop('occurrence_version', None)
+
+def _read_ingested():
+    if not os.path.exists(INGESTED_PATH):
+        return None
+    return pd.read_csv(INGESTED_PATH, sep='\t', on_bad_lines='skip', usecols=lambda c: c in OCCURRENCE_COLUMNS)
+
+def _merge_ingested(df, ingested):
+    """Ingested records after the export's, dropping any the export has since picked up"""
+    if ingested is None or len(ingested) == 0:
+        return df
+    merged = pd.concat([df, ingested], ignore_index=True)
+    if 'gbifID' in merged.columns:
+        merged = merged[~(merged['gbifID'].notna() & merged.duplicated('gbifID'))].reset_index(drop=True)
+    return merged
+
+def occurrence_source_version():
+    """Fingerprint of the raw occurrence export and ingested records, used to tell whether persisted models are stale"""
+    df = read_occurrence_csv()
+    with _source_lock:
+        if 'occurrence_version' not in _source_cache:
+            _source_cache['occurrence_version'] = dataset_fingerprint(df)
+        return _source_cache['occurrence_version']
+
+def _fetch_occurrence_csv():
+    """Read the GBIF occurrence export, from FISHY_OCCURRENCE_PATH if set, otherwise from the remote URL"""
+    local_path = os.environ.get('FISHY_OCCURRENCE_PATH')
+    if local_path:
+        print(f"Loading occurrence data from local file: {local_path}")
+        return pd.read_csv(local_path, sep='\t', on_bad_lines='skip', usecols=lambda c: c in OCCURRENCE_COLUMNS)
+    
+    import requests
+    
+    print(f"Loading occurrence data from: {OCCURRENCE_DATA_URL}")
+    response = requests.get(OCCURRENCE_DATA_URL, timeout=30)
+    response.raise_for_status()
+    return pd.read_csv(StringIO(response.text), sep='\t', on_bad_lines='skip', usecols=lambda c: c in OCCURRENCE_COLUMNS)
+
+def load_fasta_species(reload=False):
+    """FASTA species catalog, parsed once and then served from memory"""
+    with _source_lock:
+        if reload or 'fasta' not in _source_cache:
+            _source_cache['fasta'] = _parse_fasta_species()
+        return _source_cache['fasta']
+
+def _parse_fasta_species():
     """Load all available FASTA files and extract species information"""
+    from Bio import SeqIO
+    
     fasta_dir = os.path.abspath('./backend/data/data_gen_ncbi_fasta/')
     print(f"Absolute path: {fasta_dir}")
 
@@ -197,7 +311,7 @@ def get_enhanced_species_habitat_preferences():
     }
     return habitat_prefs
 
-def calculate_habitat_suitability(lat, lon, temp, depth, salinity, species, habitat_prefs):
+def calculate_habitat_suitability(lat, lon, temp, depth, salinity, species, habitat_prefs, shore_dist=None):
     """Calculate habitat suitability score based on environmental parameters"""
     if species not in habitat_prefs:
         return 0.5
@@ -210,7 +324,8 @@ def calculate_habitat_suitability(lat, lon, temp, depth, salinity, species, habi
     salinity_suit = gaussian_suitability(salinity, prefs['optimal_salinity'], prefs['tolerance']['salinity'])
     
     # Calculate distance to shore effect
-    shore_dist = estimate_distance_to_shore(lat, lon)
+    if shore_dist is None:
+        shore_dist = estimate_distance_to_shore(lat, lon)
     shore_suit = distance_suitability(shore_dist, prefs['distance_to_shore'])
     
     # Weighted combination of factors
@@ -230,34 +345,29 @@ def gaussian_suitability(value, optimal, tolerance):
     return np.exp(-0.5 * ((value - optimal) / tolerance) ** 2)
 
 def distance_suitability(distance, preferred_range):
-    """Calculate suitability based on distance preference"""
+    """Calculate suitability based on distance preference (scalar or array)"""
     min_dist, max_dist = preferred_range
-    if min_dist <= distance <= max_dist:
-        return 1.0
-    elif distance < min_dist:
-        return max(0.0, 1.0 - (min_dist - distance) / min_dist)
-    else:
-        return max(0.0, 1.0 - (distance - max_dist) / max_dist)
+    distance = np.asarray(distance, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        below = np.maximum(0.0, 1.0 - (min_dist - distance) / min_dist)
+        above = np.maximum(0.0, 1.0 - (distance - max_dist) / max_dist)
+    suitability = np.where(distance < min_dist, below, np.where(distance > max_dist, above, 1.0))
+    return suitability if suitability.ndim else float(suitability)
 
 def estimate_distance_to_shore(lat, lon):
-    """Estimate distance to nearest shore (simplified)"""
-    # Indonesian coastline approximation
-    coastline_points = [
-        (-6.2, 106.8), (-7.8, 110.4), (-8.1, 115.2), (-8.7, 116.3),
-        (-2.5, 140.7), (1.3, 124.8), (3.6, 125.7), (0.8, 127.4),
-        (-0.9, 131.3), (-3.7, 128.2), (5.5, 95.3), (3.1, 98.7)
-    ]
-    
-    distances = [np.sqrt((lat - clat)**2 + (lon - clon)**2) * 111 for clat, clon in coastline_points]
-    return min(distances)
+    """Distance to nearest shore in km, looked up from the precomputed raster (scalar or array)"""
+    distances = distance_to_shore(lat, lon)
+    return distances if distances.ndim else float(distances)
 
-def generate_enhanced_environmental_data(lat, lon, species, habitat_prefs):
+def generate_enhanced_environmental_data(lat, lon, species, habitat_prefs, rng=None, shore_dist=None):
     """Generate more realistic environmental data"""
+    if rng is None:
+        rng = make_rng('environment', species, lat, lon)
     prefs = habitat_prefs.get(species, {})
     
     # Temperature with seasonal and depth variation
     base_temp = 28.0 - (lat + 5) * 0.8  # Latitude effect
-    seasonal_var = np.random.normal(0, 1.5)  # Seasonal variation
+    seasonal_var = rng.normal(0, 1.5)  # Seasonal variation
     depth_var = -0.02 * prefs.get('optimal_depth', 10)  # Depth cooling
     temperature = base_temp + seasonal_var + depth_var
     
@@ -267,17 +377,18 @@ def generate_enhanced_environmental_data(lat, lon, species, habitat_prefs):
     
     # Depth based on bathymetry and species preference
     if 'optimal_depth' in prefs:
-        depth = np.random.normal(prefs['optimal_depth'], prefs['tolerance']['depth'])
+        depth = rng.normal(prefs['optimal_depth'], prefs['tolerance']['depth'])
         depth = max(0, min(depth, prefs['depth_range'][1]))
     else:
-        depth = np.random.uniform(0, 50)
+        depth = rng.uniform(0, 50)
     
     # Salinity based on habitat type and distance to shore
-    shore_dist = estimate_distance_to_shore(lat, lon)
+    if shore_dist is None:
+        shore_dist = estimate_distance_to_shore(lat, lon)
     if prefs.get('habitat_type', '').startswith('fresh'):
-        salinity = max(0, np.random.normal(2, 3) - shore_dist * 0.1)
+        salinity = max(0, rng.normal(2, 3) - shore_dist * 0.1)
     else:
-        salinity = 35 - max(0, (50 - shore_dist) * 0.1) + np.random.normal(0, 0.5)
+        salinity = 35 - max(0, (50 - shore_dist) * 0.1) + rng.normal(0, 0.5)
     
     # Constrain salinity
     if 'salinity_range' in prefs:
@@ -285,12 +396,13 @@ def generate_enhanced_environmental_data(lat, lon, species, habitat_prefs):
     
     return temperature, depth, salinity
 
-def generate_intelligent_absence_data(presence_df, selected_species, habitat_prefs, ratio=1.0):
+def generate_intelligent_absence_data(presence_df, selected_species, habitat_prefs, ratio=1.0, rng=None):
     """Generate more intelligent absence data using environmental constraints"""
     if len(presence_df) == 0:
         return pd.DataFrame()
     
-    np.random.seed(42)
+    if rng is None:
+        rng = make_rng('absence', selected_species, dataset_fingerprint(presence_df), ratio)
     
     # Define study area bounds with buffer
     lat_min = presence_df['decimalLatitude'].min() - 2
@@ -309,64 +421,68 @@ def generate_intelligent_absence_data(presence_df, selected_species, habitat_pre
     attempts = 0
     max_attempts = target_count * 10
     
-    # Get presence coordinates for distance calculation
-    presence_coords = presence_df[['decimalLatitude', 'decimalLongitude']].values
+    # Index presence coordinates once for haversine nearest-neighbour checks
+    presence_tree = build_ball_tree(presence_df['decimalLatitude'], presence_df['decimalLongitude'])
     
     while len(absences) < target_count and attempts < max_attempts:
-        attempts += 1
-        
-        # Generate random point
-        lat = np.random.uniform(lat_min, lat_max)
-        lon = np.random.uniform(lon_min, lon_max)
-        
-        # Check minimum distance from presence points
-        point = np.array([[lat, lon]])
-        distances = cdist(point, presence_coords)[0]
-        min_distance = np.min(distances)
+        # Draw and distance-check candidates in batches rather than one at a time
+        batch_size = min(max(2 * (target_count - len(absences)), 64), max_attempts - attempts)
+        candidate_lats = rng.uniform(lat_min, lat_max, batch_size)
+        candidate_lons = rng.uniform(lon_min, lon_max, batch_size)
+        min_distances, _ = nearest_neighbor(presence_tree, candidate_lats, candidate_lons)
+        shore_distances = estimate_distance_to_shore(candidate_lats, candidate_lons)
         
-        if min_distance < 0.5:  # Too close to presence point
-            continue
-        
-        # Generate environmental data
-        temp, depth, salinity = generate_enhanced_environmental_data(lat, lon, selected_species, habitat_prefs)
-        
-        # Calculate habitat suitability
-        suitability = calculate_habitat_suitability(lat, lon, temp, depth, salinity, selected_species, habitat_prefs)
-        
-        # Bias towards less suitable areas for absence (but not completely unsuitable)
-        if np.random.random() < (1 - suitability) * 0.8 + 0.1:
-            absences.append({
-                'decimalLatitude': lat,
-                'decimalLongitude': lon,
-                'temperature': temp,
-                'depth': depth,
-                'salinity': salinity,
-                'label': 0,
-                'species': 'absence',
-                'scientificName': 'absence',
-                'year': np.random.randint(1990, 2024),
-                'habitat_suitability': suitability
-            })
+        for lat, lon, min_distance, shore_dist in zip(candidate_lats, candidate_lons, min_distances, shore_distances):
+            if len(absences) >= target_count:
+                break
+            attempts += 1
+            
+            if min_distance < MIN_ABSENCE_DISTANCE_KM:  # Too close to presence point
+                continue
+            
+            # Generate environmental data
+            temp, depth, salinity = generate_enhanced_environmental_data(
+                lat, lon, selected_species, habitat_prefs, rng, shore_dist
+            )
+            
+            # Calculate habitat suitability
+            suitability = calculate_habitat_suitability(
+                lat, lon, temp, depth, salinity, selected_species, habitat_prefs, shore_dist
+            )
+            
+            # Bias towards less suitable areas for absence (but not completely unsuitable)
+            if rng.random() < (1 - suitability) * 0.8 + 0.1:
+                absences.append({
+                    'decimalLatitude': lat,
+                    'decimalLongitude': lon,
+                    'temperature': temp,
+                    'depth': depth,
+                    'salinity': salinity,
+                    'label': 0,
+                    'species': 'absence',
+                    'scientificName': 'absence',
+                    'year': rng.integers(1990, 2024),
+                    'habitat_suitability': suitability
+                })
     
     print(f"Generated {len(absences)} absence points from {attempts} attempts")
     return pd.DataFrame(absences)
 
 def add_derived_features(df, selected_species, habitat_prefs):
     """Add derived features that may improve model performance"""
+    lats = df['decimalLatitude'].to_numpy(dtype=float)
+    lons = df['decimalLongitude'].to_numpy(dtype=float)
+    
     # Distance to shore
-    df['distance_to_shore'] = df.apply(
-        lambda row: estimate_distance_to_shore(row['decimalLatitude'], row['decimalLongitude']), 
-        axis=1
-    )
+    df['distance_to_shore'] = estimate_distance_to_shore(lats, lons)
     
     # Habitat suitability score
-    df['habitat_suitability'] = df.apply(
-        lambda row: calculate_habitat_suitability(
-            row['decimalLatitude'], row['decimalLongitude'],
-            row['temperature'], row['depth'], row['salinity'],
-            selected_species, habitat_prefs
-        ),
-        axis=1
+    df['habitat_suitability'] = calculate_habitat_suitability(
+        lats, lons,
+        df['temperature'].to_numpy(dtype=float),
+        df['depth'].to_numpy(dtype=float),
+        df['salinity'].to_numpy(dtype=float),
+        selected_species, habitat_prefs
     )
     
     # Temperature difference from optimal
@@ -386,46 +502,98 @@ def add_derived_features(df, selected_species, habitat_prefs):
     
     return df
 
-def load_and_prepare_data(selected_species=None):
+def clean_occurrence_frame(df):
+    """Keep the modelling columns and drop records without usable coordinates in Indonesian waters"""
+    df = df[['decimalLatitude', 'decimalLongitude', 'species', 'scientificName', 'year']].dropna()
+    df['decimalLatitude'] = pd.to_numeric(df['decimalLatitude'], errors='coerce')
+    df['decimalLongitude'] = pd.to_numeric(df['decimalLongitude'], errors='coerce')
+    df = df.dropna()
+    
+    # Remove obvious outliers
+    df = df[
+        (df['decimalLatitude'] >= -15) & (df['decimalLatitude'] <= 10) &
+        (df['decimalLongitude'] >= 90) & (df['decimalLongitude'] <= 145)
+    ]
+    
+    # Filter for Indonesian waters with buffer
+    df = df[
+        (df['decimalLatitude'] >= -11) & (df['decimalLatitude'] <= 6) &
+        (df['decimalLongitude'] >= 95) & (df['decimalLongitude'] <= 141)
+    ]
+    return df
+
+def filter_species(df, selected_species):
+    """Records whose species or scientificName contains the selected species name"""
+    species_scientific = selected_species.replace('_', ' ')
+    return df[
+        (df['species'].str.contains(species_scientific, case=False, na=False)) |
+        (df['scientificName'].str.contains(species_scientific, case=False, na=False))
+    ]
+
+def synthesize_environment(df, selected_species, habitat_prefs, rng):
+    """Add temperature/depth/salinity columns to occurrence records"""
+    env_data = []
+    for _, row in df.iterrows():
+        temp, depth, salinity = generate_enhanced_environmental_data(
+            row['decimalLatitude'], row['decimalLongitude'], 
+            selected_species, habitat_prefs, rng
+        )
+        env_data.append({'temperature': temp, 'depth': depth, 'salinity': salinity})
+    
+    env_df = pd.DataFrame(env_data, columns=['temperature', 'depth', 'salinity'])
+    df = df.copy()
+    df[['temperature', 'depth', 'salinity']] = env_df.to_numpy()
+    
+    # Real gridded covariates replace the synthetic values where available
+    return apply_covariates(df)
+
+def prepare_features(df, selected_species, habitat_prefs, dataset_version):
+    """Presence and presence+absence training frames with environment and derived features"""
+    # Seed every random draw from (species, dataset version) so identical
+    # inputs always produce identical training data
+    rng = make_rng('training', selected_species, dataset_version)
+    
+    # Generate enhanced environmental data
+    with timed_stage('environment_synthesis', species=selected_species, rows=len(df)):
+        df = synthesize_environment(df, selected_species, habitat_prefs, rng)
+    
+    # Create presence dataset
+    presence_df = df.copy()
+    presence_df['label'] = 1
+    
+    # Generate intelligent absence data
+    with timed_stage('absence_generation', species=selected_species, rows=len(df)):
+        absence_df = generate_intelligent_absence_data(df, selected_species, habitat_prefs, rng=rng)
+        absence_df = apply_covariates(absence_df)
+    
+    # Combine presence and absence data
+    full_df = pd.concat([presence_df, absence_df], ignore_index=True)
+    
+    # Add derived features
+    with timed_stage('feature_engineering', species=selected_species, rows=len(full_df)):
+        full_df = add_derived_features(full_df, selected_species, habitat_prefs)
+        presence_df = add_derived_features(presence_df, selected_species, habitat_prefs)
+    return presence_df, full_df
+
+def load_and_prepare_data(selected_species=None, use_feature_store=FEATURE_STORE_ENABLED):
     """Enhanced data loading and preparation"""
     try:
         print("Loading FASTA species data...")
-        fasta_species = load_fasta_species()
+        with timed_stage('load_fasta'):
+            fasta_species = load_fasta_species()
         
         print("Loading occurrence data from CSV...")
-        url = "https://hebbkx1anhila5yf.public.blob.vercel-storage.com/occurrence-q4D1BSg6qEE6PpgihdkwFSFmjxw9rs.csv"
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-
-        df = pd.read_csv(StringIO(response.text), sep='\t', on_bad_lines='skip')
+        with timed_stage('load_occurrences'):
+            df = read_occurrence_csv()
 
         print(f"Raw data loaded: {len(df)} records")
         
         # Enhanced data cleaning
-        df = df[['decimalLatitude', 'decimalLongitude', 'species', 'scientificName', 'year']].dropna()
-        df['decimalLatitude'] = pd.to_numeric(df['decimalLatitude'], errors='coerce')
-        df['decimalLongitude'] = pd.to_numeric(df['decimalLongitude'], errors='coerce')
-        df = df.dropna()
-        
-        # Remove obvious outliers
-        df = df[
-            (df['decimalLatitude'] >= -15) & (df['decimalLatitude'] <= 10) &
-            (df['decimalLongitude'] >= 90) & (df['decimalLongitude'] <= 145)
-        ]
-        
-        # Filter for Indonesian waters with buffer
-        df = df[
-            (df['decimalLatitude'] >= -11) & (df['decimalLatitude'] <= 6) &
-            (df['decimalLongitude'] >= 95) & (df['decimalLongitude'] <= 141)
-        ]
+        df = clean_occurrence_frame(df)
         
         # Filter by selected species if specified
         if selected_species:
-            species_scientific = selected_species.replace('_', ' ')
-            df = df[
-                (df['species'].str.contains(species_scientific, case=False, na=False)) |
-                (df['scientificName'].str.contains(species_scientific, case=False, na=False))
-            ]
+            df = filter_species(df, selected_species)
             print(f"Filtered for species {selected_species}: {len(df)} records")
         
         print(f"Filtered data: {len(df)} records")
@@ -437,37 +605,30 @@ def load_and_prepare_data(selected_species=None):
         # Get enhanced habitat preferences
         habitat_prefs = get_enhanced_species_habitat_preferences()
         
-        # Generate enhanced environmental data
-        env_data = []
-        for _, row in df.iterrows():
-            temp, depth, salinity = generate_enhanced_environmental_data(
-                row['decimalLatitude'], row['decimalLongitude'], 
-                selected_species, habitat_prefs
-            )
-            env_data.append({'temperature': temp, 'depth': depth, 'salinity': salinity})
-        
-        env_df = pd.DataFrame(env_data)
-        df[['temperature', 'depth', 'salinity']] = env_df
-        
-        # Create presence dataset
-        presence_df = df.copy()
-        presence_df['label'] = 1
-        
-        # Generate intelligent absence data
-        absence_df = generate_intelligent_absence_data(df, selected_species, habitat_prefs)
+        # Identifies these records; seeds the training draws and keys the feature store
+        dataset_version = dataset_fingerprint(df)
         
-        # Combine presence and absence data
-        full_df = pd.concat([presence_df, absence_df], ignore_index=True)
-        
-        # Add derived features
-        full_df = add_derived_features(full_df, selected_species, habitat_prefs)
-        presence_df = add_derived_features(presence_df, selected_species, habitat_prefs)
+        # Frames prepared earlier from the same records go straight to training
+        stored = None
+        if use_feature_store:
+            with timed_stage('feature_store_load', species=selected_species):
+                stored = load_features(selected_species, dataset_version)
+        if stored is not None:
+            presence_df, full_df = stored
+            print(f"Loaded prepared features for {selected_species or 'general'} from the feature store")
+        else:
+            presence_df, full_df = prepare_features(df, selected_species, habitat_prefs, dataset_version)
+            if use_feature_store:
+                try:
+                    save_features(selected_species, dataset_version, presence_df, full_df)
+                except Exception as e:
+                    print(f"Error storing prepared features: {e}")
         
         # Define coordinate ranges
         lat_range = (full_df['decimalLatitude'].min(), full_df['decimalLatitude'].max())
         lon_range = (full_df['decimalLongitude'].min(), full_df['decimalLongitude'].max())
         
-        print(f"Prepared {len(presence_df)} presence records and {len(absence_df)} absence records")
+        print(f"Prepared {len(presence_df)} presence records and {len(full_df) - len(presence_df)} absence records")
         print(f"Coordinate ranges: Lat {lat_range}, Lon {lon_range}")
         
         return presence_df, full_df, lat_range, lon_range, fasta_species
@@ -480,9 +641,9 @@ def generate_fallback_data(selected_species=None):
     """Enhanced fallback data generation"""
     print("Using enhanced fallback mock data")
     
-    np.random.seed(42)
     habitat_prefs = get_enhanced_species_habitat_preferences()
     species_to_use = selected_species or 'Chanos_chanos'
+    rng = make_rng('fallback', species_to_use)
     
     # Generate realistic presence data based on species preferences
     presence_data = []
@@ -492,16 +653,16 @@ def generate_fallback_data(selected_species=None):
             
             # Generate coordinates based on habitat type
             if prefs['habitat_type'].startswith('fresh'):
-                lat = np.random.normal(-3, 2)
-                lon = np.random.normal(115, 8)
+                lat = rng.normal(-3, 2)
+                lon = rng.normal(115, 8)
             else:
-                lat = np.random.uniform(-8, 2)
-                lon = np.random.uniform(110, 135)
+                lat = rng.uniform(-8, 2)
+                lon = rng.uniform(110, 135)
         else:
-            lat = np.random.uniform(-8, 2)
-            lon = np.random.uniform(110, 135)
+            lat = rng.uniform(-8, 2)
+            lon = rng.uniform(110, 135)
         
-        temp, depth, salinity = generate_enhanced_environmental_data(lat, lon, species_to_use, habitat_prefs)
+        temp, depth, salinity = generate_enhanced_environmental_data(lat, lon, species_to_use, habitat_prefs, rng)
         
         presence_data.append({
             'decimalLatitude': lat,
@@ -512,13 +673,13 @@ def generate_fallback_data(selected_species=None):
             'label': 1,
             'species': species_to_use.replace('_', ' '),
             'scientificName': species_to_use.replace('_', ' '),
-            'year': np.random.randint(1990, 2024)
+            'year': rng.integers(1990, 2024)
         })
     
     presence_df = pd.DataFrame(presence_data)
     
     # Generate intelligent absence data
-    absence_df = generate_intelligent_absence_data(presence_df, species_to_use, habitat_prefs)
+    absence_df = generate_intelligent_absence_data(presence_df, species_to_use, habitat_prefs, rng=rng)
     
     # Combine datasets
     full_df = pd.concat([presence_df, absence_df], ignore_index=True)
@@ -0,0 +1,145 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, has_request_context, request
+
+# Profiling is opt-in: nothing is captured unless FISHY_PROFILE_DIR is set and a
+# request asks for it with ?profile=1 or an "X-Fishy-Profile: 1" header.
+PROFILE_DIR_ENV = 'FISHY_PROFILE_DIR'
+PROFILE_HEADER = 'X-Fishy-Profile'
+PROFILED_PREFIXES = ('/predict', '/train', '/model/', '/api/')
+# These requests only queue a training job and wait for it, so the job profiles
+# the training run on its worker thread instead of the request profiling the wait
+JOB_PROFILED_PATHS = ('/train', '/model/retrain')
+
+# cProfile can only hook one profiler per thread and sampling everything at once
+# would skew the numbers, so only one profile is captured at a time.
+_profile_lock = threading.Lock()
+
+def get_profile_dir():
+    return os.environ.get(PROFILE_DIR_ENV)
+
+def _write_profile(profiler, label, metadata):
+    """Write the .prof dump, a text summary and a JSON metadata file; returns the .prof path"""
+    profile_dir = get_profile_dir()
+    os.makedirs(profile_dir, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', label).strip('-') or 'profile'
+    base = os.path.join(profile_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{slug}")
+
+    profiler.dump_stats(f'{base}.prof')
+
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(40)
+    with open(f'{base}.txt', 'w') as f:
+        f.write(summary.getvalue())
+
+    with open(f'{base}.json', 'w') as f:
+        json.dump(metadata, f, indent=2, default=str)
+
+    print(f"Profile written to {base}.prof")
+    return f'{base}.prof'
+
+@contextmanager
+def profile_run(label, **metadata):
+    """Profile a block (e.g. a training run) when FISHY_PROFILE_DIR is set"""
+    if not get_profile_dir() or not _profile_lock.acquire(blocking=False):
+        yield metadata
+        return
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        yield metadata
+    finally:
+        profiler.disable()
+        metadata['duration_seconds'] = time.perf_counter() - start
+        try:
+            _write_profile(profiler, label, metadata)
+        finally:
+            _profile_lock.release()
+
+def annotate_profile(**fields):
+    """Attach dataset sizes or other context to the profile of the current request"""
+    if has_request_context() and g.get('profiler') is not None:
+        g.profile_metadata.update(fields)
+
+def _asked_for_profile():
+    if request.args.get('profile') == '1' or request.headers.get(PROFILE_HEADER) == '1':
+        return True
+    body = request.get_json(silent=True)
+    return isinstance(body, dict) and body.get('profile') is True
+
+def _profile_requested():
+    if not request.path.startswith(PROFILED_PREFIXES) or request.path in JOB_PROFILED_PATHS:
+        return False
+    return _asked_for_profile()
+
+def job_profile_requested():
+    """Whether a training request asked for its job's run to be profiled"""
+    return bool(get_profile_dir()) and request.path in JOB_PROFILED_PATHS and _asked_for_profile()
+
+def _request_species():
+    body = request.get_json(silent=True)
+    species = request.args.get('species')
+    if species is None and isinstance(body, dict):
+        species = body.get('species')
+    return species
+
+def init_request_profiling(app):
+    """Register hooks that profile individual requests on demand"""
+
+    @app.before_request
+    def _start_request_profile():
+        if not get_profile_dir() or not _profile_requested():
+            return
+        if not _profile_lock.acquire(blocking=False):
+            print(f"Profile requested for {request.path} but another profile is running")
+            return
+
+        g.profiler = cProfile.Profile()
+        g.profile_start_time = time.perf_counter()
+        g.profile_metadata = {
+            'method': request.method,
+            'path': request.path,
+            'args': request.args.to_dict(),
+            'species': _request_species(),
+            'started_at': datetime.now().isoformat(),
+        }
+        g.profiler.enable()
+
+    @app.teardown_request
+    def _release_request_profile(exc):
+        # Only reached with a live profiler when the view raised before after_request
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+
+    @app.after_request
+    def _finish_request_profile(response):
+        profiler = g.get('profiler')
+        if profiler is None:
+            return response
+
+        profiler.disable()
+        g.pop('profiler')
+        try:
+            metadata = g.profile_metadata
+            metadata['status'] = response.status_code
+            metadata['duration_seconds'] = time.perf_counter() - g.profile_start_time
+            path = _write_profile(profiler, f'{request.method}-{request.path}', metadata)
+            response.headers['X-Fishy-Profile-File'] = os.path.basename(path)
+        except Exception as e:
+            print(f"Error writing request profile: {e}")
+        finally:
+            _profile_lock.release()
+        return response
@@ -0,0 +1,188 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.compact_model import MODEL_DIR
+from utils.covariates import sample_covariates
+from utils.metrics import timed_stage
+from utils.prediction import grid_features
+from utils.seeding import make_rng
+from utils.shoreline import LAT_MAX, LAT_MIN, LON_MAX, LON_MIN
+
+# Prediction rasters over the whole study area, one float32 .npy per species and
+# resolution next to the exported models. They are memory-mapped when read so
+# gunicorn workers share the pages and a request only touches the cells it returns.
+RASTER_DIR = os.path.join(MODEL_DIR, 'rasters')
+RESOLUTIONS = [
+    float(r) for r in os.environ.get('FISHY_RASTER_RESOLUTIONS', '0.5,0.25,0.1').split(',') if r.strip()
+]
+PREDICT_CHUNK_SIZE = 200000
+
+_rasters = {}
+_rasters_lock = threading.Lock()
+# Study-area coordinates and covariate samples per resolution, shared by every species
+_grids = {}
+_grids_lock = threading.Lock()
+
+def raster_axes(resolution):
+    n_lat = int(round((LAT_MAX - LAT_MIN) / resolution)) + 1
+    n_lon = int(round((LON_MAX - LON_MIN) / resolution)) + 1
+    return LAT_MIN + np.arange(n_lat) * resolution, LON_MIN + np.arange(n_lon) * resolution
+
+def resolution_key(resolution):
+    return f"{float(resolution):g}"
+
+def _raster_path(model_key, resolution):
+    return os.path.join(RASTER_DIR, f"{model_key}_{resolution_key(resolution)}.npy")
+
+def study_grid(resolution):
+    """Flattened cell coordinates and covariate samples for the study area, computed once per resolution"""
+    key = resolution_key(resolution)
+    with _grids_lock:
+        if key not in _grids:
+            lats, lons = raster_axes(resolution)
+            lat_mesh, lon_mesh = np.meshgrid(lats, lons, indexing='ij')
+            lat_flat, lon_flat = lat_mesh.ravel(), lon_mesh.ravel()
+            _grids[key] = (lat_mesh.shape, lat_flat, lon_flat, sample_covariates(lat_flat, lon_flat))
+        return _grids[key]
+
+def compute_raster(model, feature_columns, selected_species, resolution):
+    """Presence probability for every cell of the study area at one resolution (NaN without features)"""
+    shape, lat_flat, lon_flat, covariates = study_grid(resolution)
+    rng = make_rng('raster', selected_species, resolution_key(resolution))
+    features = grid_features(lat_flat, lon_flat, feature_columns, selected_species, rng, covariates)
+
+    X = features[feature_columns].to_numpy()
+    valid = np.flatnonzero(~np.isnan(X).any(axis=1))
+    raster = np.full(len(X), np.nan, dtype=np.float32)
+    for start in range(0, len(valid), PREDICT_CHUNK_SIZE):
+        rows = valid[start:start + PREDICT_CHUNK_SIZE]
+        raster[rows] = model.predict_proba(X[rows])[:, 1]
+    return raster.reshape(shape)
+
+def save_raster(model_key, resolution, raster, meta):
+    """Write the raster and its metadata atomically"""
+    os.makedirs(RASTER_DIR, exist_ok=True)
+    path = _raster_path(model_key, resolution)
+    with tempfile.NamedTemporaryFile(dir=RASTER_DIR, suffix='.npy', delete=False) as tmp:
+        np.save(tmp, raster.astype(np.float32))
+    os.chmod(tmp.name, 0o644)
+    os.replace(tmp.name, path)
+
+    meta_path = path[:-len('.npy')] + '.json'
+    with tempfile.NamedTemporaryFile('w', dir=RASTER_DIR, suffix='.json', delete=False) as tmp:
+        json.dump(meta, tmp)
+    os.chmod(tmp.name, 0o644)
+    os.replace(tmp.name, meta_path)
+    return path
+
+def load_raster(model_key, resolution):
+    """Memory-mapped raster and metadata, or (None, None) if it has not been computed"""
+    path = _raster_path(model_key, resolution)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None, None
+
+    with _rasters_lock:
+        cached = _rasters.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path[:-len('.npy')] + '.json') as f:
+                meta = json.load(f)
+            cached = (mtime, np.load(path, mmap_mode='r'), meta)
+            _rasters[path] = cached
+        return cached[1], cached[2]
+
+def precompute_rasters(model_key, model, feature_columns, selected_species, resolutions=None, model_version=None):
+    """Compute and store rasters for every configured resolution; returns a summary per resolution"""
+    summary = {}
+    for resolution in resolutions or RESOLUTIONS:
+        start = time.perf_counter()
+        with timed_stage('raster_precompute', species=model_key, resolution=resolution_key(resolution)):
+            raster = compute_raster(model, feature_columns, selected_species, resolution)
+        lats, lons = raster_axes(resolution)
+        save_raster(model_key, resolution, raster, {
+            'species': selected_species,
+            'resolution': float(resolution),
+            'lat_min': float(lats[0]),
+            'lon_min': float(lons[0]),
+            'shape': list(raster.shape),
+            'feature_columns': list(feature_columns),
+            'model_version': model_version,
+        })
+        summary[resolution_key(resolution)] = {
+            'shape': list(raster.shape),
+            'cells': int(raster.size),
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+    return summary
+
+def raster_window(raster, meta, lat_range=None, lon_range=None):
+    """Slice the raster (or a stack of rasters on leading axes) to a bounding box by index arithmetic
+
+    Returns (lats, lons, values).
+    """
+    resolution = meta['resolution']
+    n_lat, n_lon = raster.shape[-2:]
+    lat_range = lat_range or (meta['lat_min'], meta['lat_min'] + (n_lat - 1) * resolution)
+    lon_range = lon_range or (meta['lon_min'], meta['lon_min'] + (n_lon - 1) * resolution)
+
+    i0 = max(int(np.ceil((lat_range[0] - meta['lat_min']) / resolution - 1e-9)), 0)
+    i1 = min(int(np.floor((lat_range[1] - meta['lat_min']) / resolution + 1e-9)), n_lat - 1)
+    j0 = max(int(np.ceil((lon_range[0] - meta['lon_min']) / resolution - 1e-9)), 0)
+    j1 = min(int(np.floor((lon_range[1] - meta['lon_min']) / resolution + 1e-9)), n_lon - 1)
+
+    lats = meta['lat_min'] + np.arange(i0, i1 + 1) * resolution
+    lons = meta['lon_min'] + np.arange(j0, j1 + 1) * resolution
+    return lats, lons, np.asarray(raster[..., i0:i1 + 1, j0:j1 + 1])
+
+def window_axes(resolution, lat_range=None, lon_range=None):
+    """Study-grid lats and lons inside a bounding box, as raster_window returns them, without a raster"""
+    lats, lons = raster_axes(resolution)
+    tolerance = resolution * 1e-9
+    if lat_range:
+        lats = lats[(lats >= lat_range[0] - tolerance) & (lats <= lat_range[1] + tolerance)]
+    if lon_range:
+        lons = lons[(lons >= lon_range[0] - tolerance) & (lons <= lon_range[1] + tolerance)]
+    return lats, lons
+
+def raster_records(raster, meta, lat_range=None, lon_range=None):
+    """Raster cells with a prediction as a frame shaped like the training grid predictions"""
+    lats, lons, values = raster_window(raster, meta, lat_range, lon_range)
+    lat_mesh, lon_mesh = np.meshgrid(lats, lons, indexing='ij')
+    has_value = ~np.isnan(values)
+    return pd.DataFrame({
+        'decimalLatitude': np.round(lat_mesh[has_value], 6),
+        'decimalLongitude': np.round(lon_mesh[has_value], 6),
+        'prediction': values[has_value].astype(float),
+        'species': meta.get('species') or 'unknown'
+    })
+
+def richness_layers(cube, threshold=0.5):
+    """Derived layers of a species x lat x lon probability cube
+
+    richness counts species at or above the threshold in each cell, expected
+    richness sums the probabilities, and argmax is the index of the most probable
+    species (-1 where no species has a prediction).
+    """
+    has_value = ~np.isnan(cube)
+    filled = np.where(has_value, cube, -np.inf)
+    return {
+        'richness': (np.where(has_value, cube, 0) >= threshold).sum(axis=0),
+        'expected_richness': np.nansum(cube, axis=0),
+        'argmax': np.where(has_value.any(axis=0), filled.argmax(axis=0), -1)
+    }
+
+def nested_list(values, decimals=4):
+    """Array as nested lists for JSON, rounded, with None in place of NaN"""
+    values = np.asarray(values)
+    if not np.issubdtype(values.dtype, np.floating):
+        return values.tolist()
+    rounded = np.round(values.astype(float), decimals).astype(object)
+    rounded[np.isnan(values)] = None
+    return rounded.tolist()
@@ -0,0 +1,31 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+FINGERPRINT_COLUMNS = ['decimalLatitude', 'decimalLongitude', 'species', 'scientificName', 'year']
+
+def _key_part(part):
+    # numpy scalars repr differently across numpy versions, so unwrap them first
+    if isinstance(part, (tuple, list)):
+        return '(' + ','.join(_key_part(p) for p in part) + ')'
+    if isinstance(part, np.generic):
+        part = part.item()
+    return '' if part is None else str(part)
+
+def derive_seed(*parts):
+    """Derive a stable 64-bit seed from key parts such as (species, dataset version, params)"""
+    key = '|'.join(_key_part(part) for part in parts)
+    return int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'little')
+
+def make_rng(*parts):
+    """Create a numpy Generator seeded from the given key parts"""
+    return np.random.default_rng(derive_seed(*parts))
+
+def dataset_fingerprint(df):
+    """Short content hash identifying a version of an occurrence frame"""
+    if df is None or len(df) == 0:
+        return 'empty'
+    columns = [c for c in FINGERPRINT_COLUMNS if c in df.columns]
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=False).values
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()[:16]
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from utils.geo import EARTH_RADIUS_KM, nearest_haversine_km
+
+# Distance-to-shore raster (km, float32) over the Indonesian study area, built
+# once and memory-mapped so every process shares the same pages.
+LAT_MIN, LAT_MAX = -11.0, 6.0
+LON_MIN, LON_MAX = 95.0, 141.0
+RESOLUTION = 0.05  # degrees
+# Bump when the way the raster is computed changes so stale files are rebuilt
+RASTER_VERSION = 2
+N_LAT = int(round((LAT_MAX - LAT_MIN) / RESOLUTION)) + 1
+N_LON = int(round((LON_MAX - LON_MIN) / RESOLUTION)) + 1
+
+SHORE_DISTANCE_PATH = os.environ.get(
+    'FISHY_SHORE_DISTANCE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', f'distance_to_shore_v{RASTER_VERSION}.npy')
+)
+
+# Indonesian coastline approximation, used when no bathymetry layer is available
+COASTLINE_POINTS = np.array([
+    (-6.2, 106.8), (-7.8, 110.4), (-8.1, 115.2), (-8.7, 116.3),
+    (-2.5, 140.7), (1.3, 124.8), (3.6, 125.7), (0.8, 127.4),
+    (-0.9, 131.3), (-3.7, 128.2), (5.5, 95.3), (3.1, 98.7)
+])
+
+_grid = None
+_grid_lock = threading.Lock()
+
+def grid_coordinates():
+    lats = LAT_MIN + np.arange(N_LAT) * RESOLUTION
+    lons = LON_MIN + np.arange(N_LON) * RESOLUTION
+    return lats, lons
+
+def distance_to_coastline_points(lats, lons):
+    """Great-circle distance (km) to the nearest hard-coded coastline point"""
+    return nearest_haversine_km(lats, lons, COASTLINE_POINTS[:, 0], COASTLINE_POINTS[:, 1])
+
+def _land_mask(lats, lons):
+    """Land cells from the bathymetry covariate layer, or None if it is unavailable"""
+    from utils.covariates import load_covariate_layers, sample_covariates
+
+    if 'depth' not in load_covariate_layers():
+        return None
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+    depth = sample_covariates(lat_grid.ravel(), lon_grid.ravel(), features=['depth'])['depth']
+    land = (depth <= 0).reshape(lat_grid.shape)
+    return land if land.any() and not land.all() else None
+
+def build_distance_to_shore_grid(path=SHORE_DISTANCE_PATH):
+    """Compute the distance-to-shore raster and write it to path as a .npy file"""
+    lats, lons = grid_coordinates()
+    land = _land_mask(lats, lons)
+
+    if land is not None:
+        from scipy.ndimage import distance_transform_edt
+
+        # Euclidean distance transform from every sea cell to the nearest land cell,
+        # with cell sizes in km at the mean latitude of the study area
+        km_per_degree = np.radians(1.0) * EARTH_RADIUS_KM
+        cell_km = (RESOLUTION * km_per_degree, RESOLUTION * km_per_degree * np.cos(np.radians((LAT_MIN + LAT_MAX) / 2)))
+        grid = distance_transform_edt(~land, sampling=cell_km)
+        print("Built distance-to-shore raster from bathymetry land mask")
+    else:
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing='ij')
+        grid = distance_to_coastline_points(lat_grid, lon_grid)
+        print("Built distance-to-shore raster from coastline points")
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Write atomically so concurrent workers never map a half-written file
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.npy', delete=False) as tmp:
+        np.save(tmp, grid.astype(np.float32))
+    os.chmod(tmp.name, 0o644)
+    os.replace(tmp.name, path)
+    return path
+
+def load_distance_to_shore_grid():
+    """Memory-map the raster, building it first if it does not exist yet"""
+    global _grid
+
+    with _grid_lock:
+        if _grid is None:
+            if not os.path.exists(SHORE_DISTANCE_PATH):
+                build_distance_to_shore_grid()
+            grid = np.load(SHORE_DISTANCE_PATH, mmap_mode='r')
+            if grid.shape != (N_LAT, N_LON):
+                build_distance_to_shore_grid()
+                grid = np.load(SHORE_DISTANCE_PATH, mmap_mode='r')
+            _grid = grid
+        return _grid
+
+def distance_to_shore(lats, lons):
+    """Vectorized distance-to-shore lookup (km) by nearest raster cell"""
+    grid = load_distance_to_shore_grid()
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+
+    lat_idx = np.rint((lats - LAT_MIN) / RESOLUTION).astype(np.int64)
+    lon_idx = np.rint((lons - LON_MIN) / RESOLUTION).astype(np.int64)
+    inside = (lat_idx >= 0) & (lat_idx < N_LAT) & (lon_idx >= 0) & (lon_idx < N_LON)
+
+    distances = grid[np.clip(lat_idx, 0, N_LAT - 1), np.clip(lon_idx, 0, N_LON - 1)].astype(float)
+    if not np.all(inside):
+        distances = np.where(inside, distances, distance_to_coastline_points(lats, lons))
+    return distances
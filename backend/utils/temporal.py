@@ -0,0 +1,104 @@
+import numpy as np
+
+from utils.metrics import timed_stage
+from utils.prediction import fit_model, grid_features
+from utils.rasters import raster_axes, raster_window, resolution_key, save_raster, study_grid
+from utils.seeding import dataset_fingerprint, make_rng
+
+# Year-aware models add the observation year as a feature. Synthetic absences
+# carry uniformly drawn years, so they are re-drawn from the presence years:
+# the model then learns where a species was seen in which years rather than how
+# survey effort grew over time.
+YEAR_FEATURE = 'year'
+DEFAULT_TIMELINE_RESOLUTION = 0.5
+PREDICT_CHUNK_SIZE = 200000
+
+def timeline_key(model_key):
+    return f"{model_key}.timeline"
+
+def add_year_feature(full_df, rng):
+    """Training frame with numeric years, absence years drawn from the presence years"""
+    df = full_df.copy()
+    years = df[YEAR_FEATURE].to_numpy(dtype=float, copy=True)
+    presence = (df['label'] == 1).to_numpy() & ~np.isnan(years)
+    if presence.any():
+        absence = ~presence
+        years[absence] = rng.choice(years[presence], size=int(absence.sum()))
+    df[YEAR_FEATURE] = years
+    return df
+
+def fit_temporal_model(full_df, feature_columns, selected_species=None, backend=None):
+    """Fit a year-aware model on an already prepared training frame"""
+    rng = make_rng('temporal', selected_species, dataset_fingerprint(full_df))
+    df = add_year_feature(full_df, rng)
+    temporal_columns = list(feature_columns) + [YEAR_FEATURE]
+    with timed_stage('temporal_training', species=selected_species, rows=len(df)):
+        model, imputer, accuracy, stats = fit_model(df, temporal_columns, selected_species, backend=backend)
+
+    years = df.loc[df['label'] == 1, YEAR_FEATURE].dropna()
+    return {
+        'model': model,
+        'feature_columns': temporal_columns,
+        'imputer': imputer,
+        'accuracy': accuracy,
+        'model_stats': stats,
+        'year_range': (int(years.min()), int(years.max())) if len(years) else (1990, 2024)
+    }
+
+def compute_timeline(model, feature_columns, selected_species, resolution, years):
+    """Year x lat x lon presence probabilities from one batched pass over the study grid
+
+    The static features are built once and tiled across the years, so the only
+    per-year work is the model evaluation itself.
+    """
+    shape, lat_flat, lon_flat, covariates = study_grid(resolution)
+    static_columns = [c for c in feature_columns if c != YEAR_FEATURE]
+    # Same noise as the static raster so both views agree for the same cell
+    rng = make_rng('raster', selected_species, resolution_key(resolution))
+    features = grid_features(lat_flat, lon_flat, static_columns, selected_species, rng, covariates)
+
+    base = features.reindex(columns=feature_columns).to_numpy()
+    year_index = feature_columns.index(YEAR_FEATURE)
+    valid = np.flatnonzero(~np.isnan(np.delete(base, year_index, axis=1)).any(axis=1))
+    years = np.asarray(years, dtype=float)
+
+    n_cells = len(base)
+    cube = np.full(len(years) * n_cells, np.nan, dtype=np.float32)
+    X = np.tile(base[valid], (len(years), 1))
+    X[:, year_index] = np.repeat(years, len(valid))
+    rows = (np.arange(len(years))[:, None] * n_cells + valid).ravel()
+    for start in range(0, len(X), PREDICT_CHUNK_SIZE):
+        stop = start + PREDICT_CHUNK_SIZE
+        cube[rows[start:stop]] = model.predict_proba(X[start:stop])[:, 1]
+    return cube.reshape((len(years),) + tuple(shape))
+
+def precompute_timeline(model_key, temporal, selected_species, resolution, model_version=None):
+    """Compute the full year range once and store it as a memory-mapped cube"""
+    years = np.arange(temporal['year_range'][0], temporal['year_range'][1] + 1)
+    with timed_stage('timeline_precompute', species=model_key, resolution=resolution_key(resolution), years=len(years)):
+        cube = compute_timeline(temporal['model'], temporal['feature_columns'], selected_species, resolution, years)
+    lats, lons = raster_axes(resolution)
+    meta = {
+        'species': selected_species,
+        'resolution': float(resolution),
+        'lat_min': float(lats[0]),
+        'lon_min': float(lons[0]),
+        'shape': list(cube.shape),
+        'years': [int(y) for y in years],
+        'feature_columns': list(temporal['feature_columns']),
+        'model_version': model_version,
+    }
+    save_raster(timeline_key(model_key), resolution, cube, meta)
+    return meta
+
+def timeline_window(cube, meta, start_year=None, end_year=None, lat_range=None, lon_range=None):
+    """Years and the (lats, lons, values) window of a timeline cube
+
+    The year range becomes a slice (years are consecutive), so the memory-mapped
+    cube stays a view until the spatial window is read.
+    """
+    years = np.array(meta['years'])
+    first = int(np.searchsorted(years, start_year, side='left')) if start_year else 0
+    last = int(np.searchsorted(years, end_year, side='right')) if end_year else len(years)
+    lats, lons, values = raster_window(cube[first:last], meta, lat_range, lon_range)
+    return years[first:last], lats, lons, values
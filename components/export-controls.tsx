@@ -9,6 +9,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@
 import { Checkbox } from "@/components/ui/checkbox"
 import { Input } from "@/components/ui/input"
 import { Download, FileImage, FileText, Database, Loader2 } from "lucide-react"
+import { apiService } from "@/lib/api-service"
 
 interface ExportControlsProps {
   isVisible: boolean
@@ -416,6 +417,23 @@ export function ExportControls({
     }
   }
 
+  // Rasters and full occurrence sets are streamed by the backend instead of built here
+  const exportFromServer = (format: string) => {
+    const link = document.createElement("a")
+    link.href =
+      format === "occurrences-csv"
+        ? apiService.getExportUrl({
+            dataset: "occurrences",
+            format: "csv",
+            species: selectedSpecies?.id,
+            region: selectedRegion?.id,
+            year: currentYear,
+            gzip: true,
+          })
+        : apiService.getExportUrl({ format: format as "geotiff" | "netcdf", species: selectedSpecies?.id })
+    link.click()
+  }
+
   const handleExport = () => {
     switch (exportFormat) {
       case "png":
@@ -432,6 +450,11 @@ export function ExportControls({
       case "geojson":
         exportAsGeoJSON()
         break
+      case "geotiff":
+      case "netcdf":
+      case "occurrences-csv":
+        exportFromServer(exportFormat)
+        break
     }
   }
 
@@ -508,6 +531,24 @@ export function ExportControls({
                   GeoJSON
                 </div>
               </SelectItem>
+              <SelectItem value="geotiff">
+                <div className="flex items-center gap-2">
+                  <FileImage className="w-4 h-4" />
+                  GeoTIFF Predictions
+                </div>
+              </SelectItem>
+              <SelectItem value="netcdf">
+                <div className="flex items-center gap-2">
+                  <Database className="w-4 h-4" />
+                  NetCDF Predictions
+                </div>
+              </SelectItem>
+              <SelectItem value="occurrences-csv">
+                <div className="flex items-center gap-2">
+                  <FileText className="w-4 h-4" />
+                  All Occurrences (CSV.gz)
+                </div>
+              </SelectItem>
             </SelectContent>
           </Select>
         </div>
@@ -7,7 +7,7 @@ import { useSpecies } from "@/contexts/species-context"
 import { dataLoader, type OccurrenceRecord } from "@/lib/data-loader"
 import { HeatmapControls } from "@/components/heatmap-controls"
 import { ExportControls } from "@/components/export-controls"
-import { apiService } from "@/lib/api-service"
+import { apiService, type PredictionResult } from "@/lib/api-service"
 
 import L from 'leaflet'
 import 'leaflet/dist/leaflet.css'
@@ -16,6 +16,7 @@ interface MapProps {
   currentYear: number
   isPlaying: boolean
   showHeatmap?: boolean
+  timelinePredictions?: PredictionResult[] | null
   onHeatmapToggle?: () => void
 }
 
@@ -28,7 +29,7 @@ interface PredictionData {
   temperature?: number
 }
 
-export function MainMap({ currentYear, isPlaying, showHeatmap = false, onHeatmapToggle }: MapProps) {
+export function MainMap({ currentYear, isPlaying, showHeatmap = false, timelinePredictions, onHeatmapToggle }: MapProps) {
   const mapRef = useRef<HTMLDivElement>(null)
   const leafletMapRef = useRef<L.Map | null>(null)
   const markersLayerRef = useRef<L.LayerGroup | null>(null)
@@ -55,6 +56,8 @@ export function MainMap({ currentYear, isPlaying, showHeatmap = false, onHeatmap
   const [predictions, setPredictions] = useState<PredictionData[]>([])
   const [predictionLoading, setPredictionLoading] = useState(false)
   const [showPredictions, setShowPredictions] = useState(false)
+  // The timeline frame for the current year takes over from the static predictions once loaded
+  const displayedPredictions: PredictionData[] = timelinePredictions?.length ? timelinePredictions : predictions
 
   useEffect(() => {
     if (!mapRef.current || leafletMapRef.current) return
@@ -223,7 +226,7 @@ export function MainMap({ currentYear, isPlaying, showHeatmap = false, onHeatmap
 
     predictionLayerRef.current.clearLayers()
 
-    if (!showPredictions || !predictions.length) return
+    if (!showPredictions || !displayedPredictions.length) return
 
      const canvas = document.createElement('canvas')
     const bounds = leafletMapRef.current.getBounds()
@@ -235,16 +238,13 @@ export function MainMap({ currentYear, isPlaying, showHeatmap = false, onHeatmap
     const ctx = canvas.getContext('2d')
     if (!ctx) return
 
-    const records = predictions[currentYear] ;
-
-    const point = leafletMapRef.current!.latLngToContainerPoint([
-      records.decimalLatitude,
-      records.decimalLongitude,
-    ]);
-    
-    const heatmapPoints = [{ x: point.x, y: point.y, intensity: 1 }];
+    const heatmapPoints = displayedPredictions
+      .filter(record => Number.isFinite(record.prediction))
+      .map(record => {
+        const point = leafletMapRef.current!.latLngToContainerPoint([record.decimalLatitude, record.decimalLongitude])
+        return { x: point.x, y: point.y, intensity: record.prediction }
+      })
 
-    console.log(heatmapPoints, records)
     drawPredictionHeatmap(ctx, heatmapPoints, canvas.width, canvas.height)
 
     const imageUrl = canvas.toDataURL()
@@ -254,15 +254,15 @@ export function MainMap({ currentYear, isPlaying, showHeatmap = false, onHeatmap
     })
 
     imageOverlay.addTo(predictionLayerRef.current)
-  }, [showPredictions, predictions, heatmapIntensity, heatmapColorScheme])
+  }, [showPredictions, displayedPredictions, heatmapIntensity, heatmapColorScheme])
 
   useEffect(() => {
-    if (predictions.length > 0 && selectedSpecies) {
+    if (displayedPredictions.length > 0 && selectedSpecies) {
       setShowPredictions(true)
     } else {
       setShowPredictions(false)
     }
-  }, [predictions, selectedSpecies])
+  }, [displayedPredictions, selectedSpecies])
 
   const drawHeatmap = (ctx: CanvasRenderingContext2D, points: Array<{x: number, y: number, intensity: number}>, width: number, height: number) => {
     ctx.clearRect(0, 0, width, height)
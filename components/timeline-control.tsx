@@ -6,17 +6,22 @@ import { Play, Pause, SkipBack, SkipForward } from "lucide-react"
 import { Button } from "@/components/ui/button"
 import { Slider } from "@/components/ui/slider"
 import { dataLoader } from "@/lib/data-loader"
+import { apiService, timelineFrame, type PredictionResult, type PredictionTimeline } from "@/lib/api-service"
+import { useSpecies } from "@/contexts/species-context"
 
 interface TimelineControlProps {
   currentYear: number
   onYearChange: (year: number) => void
   isPlaying: boolean
   onPlayToggle: () => void
+  onFrameChange?: (year: number, predictions: PredictionResult[]) => void
 }
 
-export function TimelineControl({ currentYear, onYearChange, isPlaying, onPlayToggle }: TimelineControlProps) {
+export function TimelineControl({ currentYear, onYearChange, isPlaying, onPlayToggle, onFrameChange }: TimelineControlProps) {
+  const { selectedSpecies } = useSpecies()
   const [yearRange, setYearRange] = useState<[number, number]>([1990, 2024])
   const [playbackSpeed, setPlaybackSpeed] = useState(1000) // ms per year
+  const [timeline, setTimeline] = useState<PredictionTimeline | null>(null)
 
   useEffect(() => {
     // Load year range from data
@@ -32,6 +37,38 @@ export function TimelineControl({ currentYear, onYearChange, isPlaying, onPlayTo
     loadYearRange()
   }, [])
 
+  useEffect(() => {
+    // One request per species: every year is read from the same cube
+    setTimeline(null)
+    if (!selectedSpecies) return
+
+    let cancelled = false
+    const loadTimeline = async () => {
+      try {
+        const cube = await apiService.getPredictionTimeline(selectedSpecies.id)
+        if (cancelled) return
+        setTimeline(cube)
+        if (cube.years.length > 0) {
+          setYearRange([cube.years[0], cube.years[cube.years.length - 1]])
+        }
+      } catch (error) {
+        console.error("Error loading prediction timeline:", error)
+      }
+    }
+    loadTimeline()
+
+    return () => {
+      cancelled = true
+    }
+  }, [selectedSpecies])
+
+  useEffect(() => {
+    // An empty frame while no cube is loaded, so the previous species' frame is not left on the map
+    if (onFrameChange) {
+      onFrameChange(currentYear, timeline ? timelineFrame(timeline, currentYear) : [])
+    }
+  }, [timeline, currentYear, onFrameChange])
+
   useEffect(() => {
     let interval: NodeJS.Timeout
 
@@ -24,6 +24,77 @@ export interface PredictionResult {
   depth?: number
 }
 
+export interface PredictionCube {
+  species: string[]
+  failed_species: string[]
+  resolution: number
+  threshold: number
+  shape: [number, number, number]
+  lats: number[]
+  lons: number[]
+  // species x lat x lon, null where there is no prediction
+  probabilities: Array<Array<Array<number | null>>>
+  richness: number[][]
+  expected_richness: number[][]
+  argmax: number[][]
+}
+
+export interface PredictionTimeline {
+  species: string
+  resolution: number
+  years: number[]
+  shape: [number, number, number]
+  lats: number[]
+  lons: number[]
+  // year x lat x lon, null where there is no prediction
+  probabilities: Array<Array<Array<number | null>>>
+}
+
+// Header of a minimized /predict response: constant columns are hoisted out of
+// the rows and probabilities may be quantized to integers of 1/probability_scale
+export interface PayloadEncoding {
+  layout: "records" | "columns"
+  precision: number | null
+  probability: "float" | "uint8"
+  probability_scale: number
+  columns: string[]
+  constants: Record<string, unknown>
+}
+
+// Rows of a minimized /predict response in the usual PredictionResult shape
+export function decodePredictions(encoding: PayloadEncoding, predictions: any): PredictionResult[] {
+  const columns: Record<string, any[]> =
+    encoding.layout === "columns"
+      ? predictions
+      : Object.fromEntries(encoding.columns.map((c) => [c, predictions.map((row: any) => row[c])]))
+  const length = columns[encoding.columns[0]]?.length ?? 0
+
+  const rows: PredictionResult[] = []
+  for (let i = 0; i < length; i++) {
+    const row: any = { ...encoding.constants }
+    for (const column of encoding.columns) row[column] = columns[column][i]
+    if (row.prediction !== null) row.prediction = row.prediction / encoding.probability_scale
+    rows.push(row)
+  }
+  return rows
+}
+
+// Predictions for one year of a timeline cube, without another request
+export function timelineFrame(timeline: PredictionTimeline, year: number): PredictionResult[] {
+  const index = timeline.years.indexOf(year)
+  if (index === -1) return []
+
+  const frame: PredictionResult[] = []
+  timeline.probabilities[index].forEach((row, i) => {
+    row.forEach((prediction, j) => {
+      if (prediction !== null) {
+        frame.push({ decimalLatitude: timeline.lats[i], decimalLongitude: timeline.lons[j], prediction })
+      }
+    })
+  })
+  return frame
+}
+
 export interface EnvironmentalData {
   temperature: number
   salinity: number
@@ -40,15 +111,24 @@ export interface RegionalAnalysis {
   timespan: number
 }
 
+// The backend answers 503 with Retry-After while the occurrence dataset loads
+const MAX_LOADING_RETRIES = 24
+
 class ApiService {
   private async fetchApi(endpoint: string, options?: RequestInit) {
-    const response = await fetch(`${API_BASE_URL}${endpoint}`, {
-      headers: {
-        "Content-Type": "application/json",
-        ...options?.headers,
-      },
-      ...options,
-    })
+    let response: Response
+    for (let attempt = 0; ; attempt++) {
+      response = await fetch(`${API_BASE_URL}${endpoint}`, {
+        headers: {
+          "Content-Type": "application/json",
+          ...options?.headers,
+        },
+        ...options,
+      })
+      if (response.status !== 503 || attempt >= MAX_LOADING_RETRIES) break
+      const retryAfter = Number(response.headers.get("Retry-After")) || 5
+      await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000))
+    }
 
     if (!response.ok) {
       throw new Error(`API Error: ${response.status} ${response.statusText}`)
@@ -58,11 +138,66 @@ class ApiService {
   }
 
   async getPredictions(speciesId: string, region?: string): Promise<PredictionResult[]> {
-    const params = new URLSearchParams({ species: speciesId })
+    // 4 decimals is ~11 m, well below the prediction grid spacing
+    const params = new URLSearchParams({ species: speciesId, precision: "4", probability: "uint8", layout: "columns" })
     if (region) params.append("region", region)
 
     const response = await this.fetchApi(`/predict?${params}`)
-    return response.predictions || []
+    if (!response.predictions) return []
+    return response.encoding ? decodePredictions(response.encoding, response.predictions) : response.predictions
+  }
+
+  async getPredictionCube(
+    speciesIds: string[],
+    options?: {
+      latRange?: [number, number]
+      lonRange?: [number, number]
+      resolution?: number
+      threshold?: number
+    },
+  ): Promise<PredictionCube> {
+    return this.fetchApi("/predict/batch", {
+      method: "POST",
+      body: JSON.stringify({
+        species: speciesIds,
+        lat_range: options?.latRange,
+        lon_range: options?.lonRange,
+        resolution: options?.resolution,
+        threshold: options?.threshold,
+      }),
+    })
+  }
+
+  async getPredictionTimeline(
+    speciesId: string,
+    options?: { startYear?: number; endYear?: number; resolution?: number },
+  ): Promise<PredictionTimeline> {
+    const params = new URLSearchParams({ species: speciesId })
+    if (options?.startYear) params.append("start_year", String(options.startYear))
+    if (options?.endYear) params.append("end_year", String(options.endYear))
+    if (options?.resolution) params.append("resolution", String(options.resolution))
+
+    return this.fetchApi(`/predict/timeline?${params}`)
+  }
+
+  // Download URL for a file streamed by the backend; used as a link target, not fetched as JSON
+  getExportUrl(options: {
+    dataset?: "predictions" | "timeline" | "occurrences"
+    format: "csv" | "geojson" | "geotiff" | "netcdf"
+    species?: string
+    region?: string
+    year?: number
+    resolution?: number
+    gzip?: boolean
+  }): string {
+    const params = new URLSearchParams({ dataset: options.dataset || "predictions", format: options.format })
+    if (options.species) params.append("species", options.species)
+    if (options.region) params.append("region", options.region)
+    if (options.year) params.append("year", String(options.year))
+    if (options.resolution) params.append("resolution", String(options.resolution))
+    if (options.gzip) params.append("gzip", "1")
+
+    return `${API_BASE_URL}/export?${params}`
   }
 
   async getEnvironmentalData(region: string, species: string): Promise<EnvironmentalData> {